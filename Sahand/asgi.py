@@ -9,17 +9,23 @@ https://docs.djangoproject.com/en/4.2/howto/deployment/asgi/
 
 import os
 
-from channels.auth import AuthMiddlewareStack
 from channels.routing import ProtocolTypeRouter, URLRouter
 from django.core.asgi import get_asgi_application
-import chat.routing
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'Sahand.settings')
 
+# the apps have to be loaded before the consumers import their models
+django_asgi_application = get_asgi_application()
+
+import chat.routing  # noqa: E402
+import task_manager.routing  # noqa: E402
+from chat.middleware import JWTAuthMiddlewareStack  # noqa: E402
+
 application = ProtocolTypeRouter({
-    "http": get_asgi_application(),
-    "websocket": AuthMiddlewareStack(
+    "http": django_asgi_application,
+    "websocket": JWTAuthMiddlewareStack(
         URLRouter(
             chat.routing.websocket_urlpatterns  # This links to your routing.py file
+            + task_manager.routing.websocket_urlpatterns
         )
     ),
 })
@@ -0,0 +1,11 @@
+from django.core.cache import caches
+from django.core.cache.backends.dummy import DummyCache
+from django.core.cache.backends.locmem import LocMemCache
+
+
+def is_shared_cache(alias='default'):
+    """
+    True when the cache is seen by every worker (CACHE_REDIS_URL), False for the per-process default. An entry
+    deleted or updated on commit is then only gone from the cache of the process that saved the row.
+    """
+    return not isinstance(caches[alias], (LocMemCache, DummyCache))
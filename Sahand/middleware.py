@@ -2,21 +2,34 @@ from django.utils.timezone import now
 from security.models import UserLog, Operation  # Import your model
 from django.utils.deprecation import MiddlewareMixin
 
+from Sahand import settings
+from Sahand.user_log_buffer import user_log_buffer, should_log
+
+
 class UserLogMiddleware(MiddlewareMixin):
     def process_response(self, request, response):
+        if not should_log(request.path):
+            return response
+
         user = request.user if request.user.is_authenticated else None
         ip = self.get_client_ip(request)
         # operation = Operation.objects.filter(url=request.path.rstrip(request.path[-1]))
-        UserLog.objects.create(
+        entry = dict(
             method=request.method,
             path=request.path,
             status_code=response.status_code,
             timestamp=now(),
-            user=user,
+            user_id=user.id if user else None,
             # operation= operation if operation else None,
             ip_address=ip,
+            # headers are stringified by the flushing thread, not on the request thread
             headers=dict(request.headers)
         )
+        if getattr(settings, 'USER_LOG_BUFFERED', True):
+            user_log_buffer.add(entry, essential=response.status_code >= 400)
+        else:
+            entry['headers'] = str(entry['headers'])
+            UserLog.objects.create(**entry)
         return response
 
     def get_client_ip(self, request):
@@ -11,6 +11,7 @@ https://docs.djangoproject.com/en/4.2/ref/settings/
 """
 
 import os
+import sys
 from datetime import timedelta
 from pathlib import Path
 
@@ -67,11 +68,12 @@ INSTALLED_APPS = [
     'task_manager',
     'chat',
     'dashboard',
-    'payment'
+    'payment',
+    'search'
 
 ]
 
-# ASGI_APPLICATION = "Sahand.asgi.application"
+ASGI_APPLICATION = "Sahand.asgi.application"
 
 MIDDLEWARE = [
     'corsheaders.middleware.CorsMiddleware',  # Should be at the top
@@ -226,10 +228,138 @@ CORS_ALLOW_HEADERS = list(default_headers) + [
     'roleId',
 ]
 
+# region cache
+
+# the cached dashboards and unread notification counters are shared by all the workers through Redis, without a url
+# every process keeps its own (tests and a single worker) (see Sahand/cache_backend.py): the role permission indexes and
+# panel menus are then checked against the role's update_row_date on every request and the unread counters are counted
+# live
+CACHE_REDIS_URL = config('CACHE_REDIS_URL', default='')
+if CACHE_REDIS_URL:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+            'LOCATION': CACHE_REDIS_URL,
+        },
+    }
+
+# endregion
+
+# region notifications
+
+# unread counters are counted live on the per-process default cache, with CACHE_REDIS_URL they are cached this long
+# (seconds) and recounted after every committed change
+NOTIFICATION_UNREAD_CACHE_TIMEOUT = 300
+# new notifications and unread counts are pushed to ws/notifications/ through the channel layer (see chat region),
+# a reconnecting socket gets the ones it missed this many at a time
+NOTIFICATION_RESUME_PAGE_SIZE = 50
+
+# endregion
+
+# region sms
+
+# messages go through an outbox (communicating.SmsOutbox) delivered by a pool of worker threads (see utilities/sms.py),
+# SMS_PROVIDER = 'fake' keeps them in memory instead of sending them
+SMS_PROVIDER = config('SMS_PROVIDER', default='msgway')
+SMS_WORKERS = 4
+SMS_TIMEOUT = (3, 10)  # connect and read timeout, seconds
+SMS_MAX_ATTEMPTS = 5
+SMS_RETRY_BACKOFF = 2.0  # seconds before the first retry, doubled for every next one
+
+# endregion
+
 # region payment
 
 MERCHANT = "f35a1461-5313-4056-b165-c912609056d2"
 SANDBOX = True
+# the gateway is called through payment.gateway.ZarinpalClient, point ZARINPAL_BASE_URL to the fake gateway
+# (manage.py run_fake_zarinpal) to run checkouts offline
+ZARINPAL_BASE_URL = config('ZARINPAL_BASE_URL', default='https://www.zarinpal.com')
+ZARINPAL_CALLBACK_URL = config('ZARINPAL_CALLBACK_URL', default='http://localhost:3000/PayMent')
+ZARINPAL_TIMEOUT = (3, 10)  # connect and read timeout, seconds
+ZARINPAL_FAILURE_THRESHOLD = 5  # consecutive failures that open the circuit
+ZARINPAL_RESET_TIMEOUT = 30  # seconds the open circuit refuses requests before a trial one
+
+# endregion
+
+# region file manager
+
+# FileManager content lives in a content-addressed blob storage, the rows only keep its SHA-256
+FILE_MANAGER_STORAGE = 'file_manager.storage.LocalBlobStorage'
+FILE_MANAGER_STORAGE_ROOT = config('FILE_MANAGER_STORAGE_ROOT', default=os.path.join(BASE_DIR, 'media', 'blobs'))
+# legacy file_data rows are moved to the blob storage by the migrate_file_blobs command, the blobs no row refers to are
+# removed by the sweep_file_blobs command once they have not been saved for this long (seconds)
+FILE_MANAGER_BLOB_GRACE_PERIOD = 24 * 60 * 60
+# storage quota shown by the file manager, in bytes
+FILE_MANAGER_QUOTA = config('FILE_MANAGER_QUOTA', default=50 * 1024 ** 3, cast=int)
+
+# endregion
+
+# region search
+
+# a listing search returns the SEARCH_MAX_RESULTS most relevant documents at most, its totalCount is capped the same way
+SEARCH_MAX_RESULTS = 500
+# a query of several terms only checks this many best postings of its rarest term
+SEARCH_MAX_CANDIDATES = 5000
+
+# endregion
+
+# region user log
+
+# requests are logged through an in-process buffer flushed with bulk_create (see Sahand/user_log_buffer.py)
+# off under `manage.py test`: the flushing thread would write rows outside the test transactions
+TESTING = len(sys.argv) > 1 and sys.argv[1] == 'test'
+USER_LOG_BUFFERED = config('USER_LOG_BUFFERED', default=not TESTING, cast=bool)
+USER_LOG_BUFFER_MAX_SIZE = 10000
+USER_LOG_BATCH_SIZE = 500
+USER_LOG_FLUSH_INTERVAL = 2.0  # seconds
+# path prefixes that are never logged
+USER_LOG_EXCLUDED_PATHS = [
+    '/static/',
+    '/captcha/',
+]
+# path prefix -> fraction of requests logged, the longest matching prefix wins
+USER_LOG_SAMPLE_RATES = {
+    '/Site/Index/': 0.05,
+}
+
+# endregion
+
+# region engagement counters
+
+# count_view, count_like, ... increments are buffered in memory and flushed as one UPDATE per object
+# (see activity/counters.py), turned off they are written immediately
+ENGAGEMENT_COUNTERS_BUFFERED = config('ENGAGEMENT_COUNTERS_BUFFERED', default=True, cast=bool)
+ENGAGEMENT_COUNTER_FLUSH_INTERVAL = 5.0  # seconds
+
+# endregion
+
+# region chat
+
+# with a Redis url the channel layer and the presence of the chat rooms are shared by all the ASGI workers,
+# without one they only live inside the process (tests and a single worker)
+CHAT_REDIS_URL = config('CHAT_REDIS_URL', default='')
+if CHAT_REDIS_URL:
+    CHANNEL_LAYERS = {
+        'default': {
+            'BACKEND': 'channels_redis.core.RedisChannelLayer',
+            'CONFIG': {'hosts': [CHAT_REDIS_URL]},
+        },
+    }
+else:
+    CHANNEL_LAYERS = {
+        'default': {
+            'BACKEND': 'channels.layers.InMemoryChannelLayer',
+        },
+    }
+CHAT_PRESENCE_TTL = 60  # seconds without any frame (e.g. {"type": "heartbeat"}) before a socket counts as gone
+CHAT_TYPING_TTL = 5  # seconds a {"type": "typing"} frame is shown
+# messages are broadcast first and stored by an in-process buffer with bulk_create (see chat/message_buffer.py),
+# turned off every message is written before the next frame is read
+CHAT_MESSAGES_BUFFERED = config('CHAT_MESSAGES_BUFFERED', default=True, cast=bool)
+CHAT_MESSAGE_BATCH_SIZE = 200
+CHAT_MESSAGE_FLUSH_INTERVAL = 0.5  # seconds, doubled after every failed attempt
+CHAT_MESSAGE_MAX_ATTEMPTS = 5
 
 # endregion
 CAPTCHA_IMAGE_SIZE = (150, 50)
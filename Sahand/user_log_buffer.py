@@ -0,0 +1,142 @@
+import atexit
+import queue
+import random
+import threading
+
+from django.db import close_old_connections, transaction, DatabaseError, IntegrityError
+
+from Sahand import settings
+
+
+class UserLogBuffer:
+    """In-process queue of pending UserLog rows, flushed with bulk_create by a background thread."""
+
+    def __init__(self, max_size=10000, batch_size=500, flush_interval=2.0, start_thread=True):
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.high_water = int(max_size * 0.8)
+        self.dropped = 0
+        self._queue = queue.Queue(maxsize=max_size)
+        self._wakeup = threading.Event()
+        self._lock = threading.Lock()
+        self.start_thread = start_thread
+        self._thread = None
+
+    def add(self, entry, essential=False):
+        # never block the request thread: when the queue is full the entry is dropped, and past the
+        # high-water mark only essential entries (failed requests) are still accepted
+        if not essential and self._queue.qsize() >= self.high_water:
+            self.dropped += 1
+            return False
+        try:
+            self._queue.put_nowait(entry)
+        except queue.Full:
+            self.dropped += 1
+            return False
+
+        self._ensure_started()
+        if self._queue.qsize() >= self.batch_size:
+            self._wakeup.set()
+        return True
+
+    def flush(self):
+        from security.models import UserLog
+
+        written = 0
+        while True:
+            batch = self._drain()
+            if not batch:
+                return written
+            rows = [UserLog(headers=str(entry.pop('headers')), **entry) for entry in batch]
+            try:
+                with transaction.atomic():
+                    UserLog.objects.bulk_create(rows, batch_size=self.batch_size)
+                written += len(rows)
+            except DatabaseError as e:
+                print(f"UserLog batch failed, writing it row by row: {e}")
+                written += self._write_rows(rows)
+
+    def _write_rows(self, rows):
+        # one bad row (e.g. the user was deleted meanwhile) must not take the rest of the batch with it
+        written = 0
+        for row in rows:
+            try:
+                try:
+                    with transaction.atomic():
+                        row.save(force_insert=True)
+                except IntegrityError:
+                    if row.user_id is None:
+                        raise
+                    # the user is gone, kept like on_delete=SET_NULL would have
+                    row.user_id = None
+                    with transaction.atomic():
+                        row.save(force_insert=True)
+                written += 1
+            except DatabaseError as e:
+                print(f"UserLog row dropped: {e}")
+        return written
+
+    def _flush_at_exit(self):
+        # the database may already be gone at interpreter exit, a traceback there helps nobody
+        try:
+            self.flush()
+        except Exception as e:
+            print(f"UserLog flush at exit failed: {e}")
+
+    def _drain(self):
+        batch = []
+        while len(batch) < self.batch_size:
+            try:
+                batch.append(self._queue.get_nowait())
+            except queue.Empty:
+                break
+        return batch
+
+    def _ensure_started(self):
+        # without the thread the entries stay queued until flush() is called
+        if not self.start_thread or self._thread is not None:
+            return
+        with self._lock:
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name='user-log-buffer', daemon=True)
+                self._thread.start()
+                atexit.register(self._flush_at_exit)
+
+    def _run(self):
+        while True:
+            self._wakeup.wait(self.flush_interval)
+            self._wakeup.clear()
+            try:
+                self.flush()
+            except Exception as e:
+                # a failed batch is lost, the logger must keep running for the next ones
+                print(f"UserLog flush failed: {e}")
+            finally:
+                close_old_connections()
+
+
+def get_sample_rate(path):
+    # excluded paths are never logged, otherwise the longest matching prefix decides the rate
+    for prefix in getattr(settings, 'USER_LOG_EXCLUDED_PATHS', []):
+        if path.startswith(prefix):
+            return 0.0
+    rates = getattr(settings, 'USER_LOG_SAMPLE_RATES', {})
+    matches = [prefix for prefix in rates if path.startswith(prefix)]
+    if not matches:
+        return 1.0
+    return rates[max(matches, key=len)]
+
+
+def should_log(path):
+    rate = get_sample_rate(path)
+    if rate >= 1:
+        return True
+    return rate > 0 and random.random() < rate
+
+
+user_log_buffer = UserLogBuffer(
+    max_size=getattr(settings, 'USER_LOG_BUFFER_MAX_SIZE', 10000),
+    batch_size=getattr(settings, 'USER_LOG_BATCH_SIZE', 500),
+    flush_interval=getattr(settings, 'USER_LOG_FLUSH_INTERVAL', 2.0),
+    start_thread=getattr(settings, 'USER_LOG_BUFFERED', True),
+)
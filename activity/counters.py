@@ -0,0 +1,101 @@
+import atexit
+import threading
+import time
+from collections import Counter
+
+from django.db import close_old_connections
+from django.db.models import F, Value
+from django.db.models.functions import Coalesce
+
+from Sahand import settings
+
+COUNTER_FIELDS = ('count_view', 'count_like', 'count_dislike', 'count_share', 'count_comment')
+
+
+class EngagementCounterBuffer:
+    """
+    Pending increments of the denormalized engagement counters (count_view, count_like, ...). Increments are
+    added up in memory and written by a background thread as one UPDATE per object and interval, so a popular
+    row is not locked by every single view.
+    """
+
+    def __init__(self, flush_interval=5.0):
+        self.flush_interval = flush_interval
+        self._pending = {}
+        self._lock = threading.Lock()
+        self._thread = None
+
+    def increment(self, model, pk, field, amount=1):
+        if field not in COUNTER_FIELDS or field not in {f.name for f in model._meta.concrete_fields}:
+            raise ValueError(f"{model._meta.label} has no counter named {field}")
+        with self._lock:
+            self._pending.setdefault((model, pk), Counter())[field] += amount
+        self._ensure_started()
+
+    def pending(self, model, pk):
+        with self._lock:
+            return dict(self._pending.get((model, pk), {}))
+
+    def flush(self):
+        with self._lock:
+            pending, self._pending = self._pending, {}
+
+        written = 0
+        for (model, pk), deltas in pending.items():
+            deltas = {field: delta for field, delta in deltas.items() if delta}
+            if not deltas:
+                continue
+            try:
+                model.objects.filter(pk=pk).update(
+                    **{field: Coalesce(F(field), Value(0)) + delta for field, delta in deltas.items()}
+                )
+                written += 1
+            except Exception as e:
+                # keep the deltas for the next flush
+                print(f"Counter flush of {model._meta.label} {pk} failed: {e}")
+                with self._lock:
+                    self._pending.setdefault((model, pk), Counter()).update(deltas)
+        return written
+
+    def _ensure_started(self):
+        if self._thread is not None or not getattr(settings, 'ENGAGEMENT_COUNTERS_BUFFERED', True):
+            return
+        with self._lock:
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name='engagement-counters', daemon=True)
+                self._thread.start()
+                atexit.register(self.flush)
+
+    def _run(self):
+        while True:
+            time.sleep(self.flush_interval)
+            try:
+                self.flush()
+            finally:
+                close_old_connections()
+
+
+counter_buffer = EngagementCounterBuffer(flush_interval=getattr(settings, 'ENGAGEMENT_COUNTER_FLUSH_INTERVAL', 5.0))
+
+
+def increment_counter(instance, field, amount=1):
+    counter_buffer.increment(type(instance), instance.pk, field, amount)
+    if not getattr(settings, 'ENGAGEMENT_COUNTERS_BUFFERED', True):
+        counter_buffer.flush()
+
+
+def get_counters(instance):
+    """
+    Counters of `instance`: the persisted values plus the increments not flushed yet.
+    """
+    pending = counter_buffer.pending(type(instance), instance.pk)
+    return {field: (getattr(instance, field) or 0) + pending.get(field, 0)
+            for field in COUNTER_FIELDS if hasattr(instance, field)}
+
+
+def apply_pending_counters(instances):
+    # merges the pending increments into freshly loaded instances before they are serialized
+    for instance in instances:
+        for field, value in get_counters(instance).items():
+            setattr(instance, field, value)
+    return instances
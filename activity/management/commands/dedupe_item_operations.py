@@ -0,0 +1,27 @@
+from django.db import transaction
+from django.db.models import Count, Min
+from django.core.management.base import BaseCommand
+
+from activity.models import ItemOperation
+
+
+class Command(BaseCommand):
+    help = "Remove duplicate likes, dislikes and saves before the unique reaction constraint is applied"
+
+    def handle(self, *args, **options):
+        duplicates = ItemOperation.objects.values(
+            'user_id', 'object_type', 'related_id', 'item_operation_type'
+        ).annotate(rows=Count('id'), keep_id=Min('id')).filter(rows__gt=1)
+
+        removed = 0
+        with transaction.atomic():
+            for row in duplicates:
+                rows = ItemOperation.objects.filter(
+                    user_id=row['user_id'], object_type=row['object_type'], related_id=row['related_id'],
+                    item_operation_type=row['item_operation_type']
+                )
+                # the kept row is active when any of the duplicates was
+                active = rows.filter(is_deleted=False).exists()
+                ItemOperation.objects.filter(id=row['keep_id']).update(is_deleted=not active)
+                removed += rows.exclude(id=row['keep_id']).delete()[0]
+        self.stdout.write(self.style.SUCCESS(f"{removed} duplicate operation(s) removed"))
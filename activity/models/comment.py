@@ -35,6 +35,10 @@ class Comment(models.Model):
     class Meta:
         db_table = 'activity_comment'  # Specify the database table name
         verbose_name_plural = 'Comments'  # Optional: For admin display
+        indexes = [
+            # comments of a user on the dashboard, newest first
+            models.Index(fields=['user', '-create_row_date'], name='activity_comment_user_idx'),
+        ]
 
     def __str__(self):
         return f'Comment {self.id} by User {self.user_id}'
@@ -31,4 +31,9 @@ class ItemOperation(models.Model):
 
     class Meta:
         db_table = 'activity_item_operation'  # Specify the database table name
-        verbose_name_plural = 'ItemOperations'  # Optional: For admin display
\ No newline at end of file
+        verbose_name_plural = 'ItemOperations'  # Optional: For admin display
+        constraints = [
+            # one row per reaction, toggled through is_deleted (see activity/reactions.py)
+            models.UniqueConstraint(fields=['user', 'object_type', 'related_id', 'item_operation_type'],
+                                    name='activity_item_operation_unique_reaction'),
+        ]
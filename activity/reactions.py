@@ -0,0 +1,99 @@
+from django.apps import apps
+from django.db import transaction, IntegrityError
+from django.db.models import F, Value
+from django.db.models.functions import Coalesce
+from django.utils import timezone
+
+LIKE = 1
+DISLIKE = 2
+SAVE = 3
+
+REACTION_NAMES = {LIKE: 'like', DISLIKE: 'dislike', SAVE: 'save'}
+# counter of the target object kept in step with each reaction
+REACTION_COUNTERS = {LIKE: 'count_like', DISLIKE: 'count_dislike'}
+# a like replaces a dislike and the other way around
+EXCLUSIVE_REACTIONS = {LIKE: DISLIKE, DISLIKE: LIKE}
+
+# ItemOperation.object_type -> model of the target
+OBJECT_MODELS = {
+    1: 'course.Course',
+    2: 'cms.Blog',
+    3: 'cms.WorkSample',
+    4: 'cms.Post',
+    5: 'cms.Story',
+    6: 'cms.Service',
+}
+
+
+def get_object_model(object_type):
+    label = OBJECT_MODELS.get(object_type)
+    return apps.get_model(label) if label else None
+
+
+def _set_reaction(user, object_type, related_id, operation_type, active):
+    """
+    Puts one reaction in the requested state and returns True when it changed. Rows are never duplicated:
+    an existing row is switched with a conditional UPDATE, a missing one is inserted under the
+    (user, object_type, related_id, item_operation_type) unique index.
+    """
+    from activity.models import ItemOperation
+
+    now = timezone.now()
+    changed = ItemOperation.objects.filter(
+        user=user, object_type=object_type, related_id=related_id, item_operation_type=operation_type,
+        is_deleted=active
+    ).update(is_deleted=not active, operation_date=now, update_row_date=now)
+    if changed or not active:
+        return bool(changed)
+
+    try:
+        with transaction.atomic():
+            ItemOperation.objects.create(user=user, object_type=object_type, related_id=related_id,
+                                         item_operation_type=operation_type, status=1)
+        return True
+    except IntegrityError:
+        # already active, e.g. a concurrent click of the same user
+        return False
+
+
+def set_reaction(user, object_type, related_id, operation_type, active):
+    """
+    Idempotent like/dislike/save of `user` on the target, with the target's count_like/count_dislike
+    updated in the same transaction. Returns the reactions of the user on the target afterwards.
+    """
+    from dashboard.utils import invalidate_saved_items
+
+    model = get_object_model(object_type)
+    with transaction.atomic():
+        deltas = {}
+        if _set_reaction(user, object_type, related_id, operation_type, active):
+            if operation_type in REACTION_COUNTERS:
+                deltas[REACTION_COUNTERS[operation_type]] = 1 if active else -1
+            elif operation_type == SAVE:
+                # the rows are switched with update(), no post_save reaches the dashboard
+                invalidate_saved_items(user.id)
+        exclusive = EXCLUSIVE_REACTIONS.get(operation_type)
+        if active and exclusive and _set_reaction(user, object_type, related_id, exclusive, False):
+            deltas[REACTION_COUNTERS[exclusive]] = -1
+
+        if deltas:
+            model.objects.filter(pk=related_id).update(
+                **{field: Coalesce(F(field), Value(0)) + delta for field, delta in deltas.items()}
+            )
+    return get_user_reactions(user, object_type, [related_id])[related_id]
+
+
+def get_user_reactions(user, object_type, related_ids):
+    """
+    {related_id: {'like': bool, 'dislike': bool, 'save': bool}} of `user` for a page of objects, in one query.
+    """
+    from activity.models import ItemOperation
+
+    reactions = {related_id: {name: False for name in REACTION_NAMES.values()} for related_id in related_ids}
+    rows = ItemOperation.objects.filter(
+        user=user, object_type=object_type, related_id__in=related_ids, is_deleted=False,
+        item_operation_type__in=REACTION_NAMES
+    ).values_list('related_id', 'item_operation_type')
+    for related_id, operation_type in rows:
+        reactions[related_id][REACTION_NAMES[operation_type]] = True
+    return reactions
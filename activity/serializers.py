@@ -133,6 +133,25 @@ class ItemOperationListSerializer(serializers.Serializer):
     propertiesAttribute = serializers.ListField(child=ListPropertiesAttributeSerializer())
 
 
+class ItemOperationToggleSerializer(serializers.Serializer):
+    object_type = serializers.ChoiceField(choices=ItemOperation.OBJECT_TYPE_CHOICES)
+    related_id = serializers.IntegerField()
+    item_operation_type = serializers.ChoiceField(choices=ItemOperation.ITEM_OPERATION_TYPE_CHOICES)
+    # the requested state, sending the same state twice changes nothing
+    active = serializers.BooleanField()
+
+
+class ItemOperationReactionsRequestSerializer(serializers.Serializer):
+    object_type = serializers.ChoiceField(choices=ItemOperation.OBJECT_TYPE_CHOICES)
+    related_ids = serializers.ListField(child=serializers.IntegerField(), max_length=500)
+
+
+class ReactionSerializer(serializers.Serializer):
+    like = serializers.BooleanField()
+    dislike = serializers.BooleanField()
+    save = serializers.BooleanField()
+
+
 # event
 class RevisionSerializer(serializers.ModelSerializer):
     id = serializers.IntegerField()
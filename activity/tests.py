@@ -1,3 +1,101 @@
+from django.db import connection
 from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from rest_framework.test import APIClient
 
-# Create your tests here.
+from activity.counters import EngagementCounterBuffer
+from activity.models import ItemOperation
+from activity.reactions import set_reaction, get_user_reactions, LIKE, DISLIKE, SAVE
+from cms.models import Blog, Topic
+from security.models import User
+
+
+class EngagementCounterBufferTest(TestCase):
+    def setUp(self):
+        # flushed by hand, the background thread never wakes up during the test
+        self.buffer = EngagementCounterBuffer(flush_interval=3600)
+        self.blogs = [Blog.objects.create(title=f'blog {i}', english_title=f'blog-{i}', time=5, status=1, count_view=10)
+                      for i in range(2)]
+
+    def test_increments_are_coalesced_per_object(self):
+        for _ in range(1000):
+            self.buffer.increment(Blog, self.blogs[0].pk, 'count_view')
+        self.buffer.increment(Blog, self.blogs[0].pk, 'count_like', 3)
+        self.buffer.increment(Blog, self.blogs[1].pk, 'count_share')
+
+        with CaptureQueriesContext(connection) as queries:
+            self.assertEqual(self.buffer.flush(), 2)
+        self.assertEqual(len(queries.captured_queries), 2)
+
+        blog = Blog.objects.get(pk=self.blogs[0].pk)
+        self.assertEqual((blog.count_view, blog.count_like), (1010, 3))
+        self.assertEqual(Blog.objects.get(pk=self.blogs[1].pk).count_share, 1)
+        self.assertEqual(self.buffer.flush(), 0)
+
+    def test_pending_deltas_are_merged_on_read(self):
+        self.buffer.increment(Blog, self.blogs[0].pk, 'count_view', 5)
+        self.assertEqual(self.buffer.pending(Blog, self.blogs[0].pk), {'count_view': 5})
+        self.buffer.flush()
+        self.assertEqual(self.buffer.pending(Blog, self.blogs[0].pk), {})
+
+    def test_null_counters_and_unknown_fields(self):
+        topic = Topic.objects.create(is_user=False, is_verify=True, title='topic', last_update_date=timezone.now())
+        self.buffer.increment(Topic, topic.pk, 'count_view', 2)
+        self.buffer.flush()
+        self.assertEqual(Topic.objects.get(pk=topic.pk).count_view, 2)
+        with self.assertRaises(ValueError):
+            self.buffer.increment(Blog, self.blogs[0].pk, 'rate')
+
+
+class ReactionToggleTest(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username='reader', password='secret')
+        self.blog = Blog.objects.create(title='blog', english_title='blog', time=5, status=1)
+
+    def counters(self):
+        blog = Blog.objects.get(pk=self.blog.pk)
+        return blog.count_like or 0, blog.count_dislike or 0
+
+    def test_repeated_like_is_idempotent(self):
+        for _ in range(3):
+            reactions = set_reaction(self.user, 2, self.blog.pk, LIKE, True)
+        self.assertEqual(reactions, {'like': True, 'dislike': False, 'save': False})
+        self.assertEqual(ItemOperation.objects.filter(user=self.user, related_id=self.blog.pk).count(), 1)
+        self.assertEqual(self.counters(), (1, 0))
+
+        for _ in range(2):
+            set_reaction(self.user, 2, self.blog.pk, LIKE, False)
+        self.assertEqual(self.counters(), (0, 0))
+        set_reaction(self.user, 2, self.blog.pk, LIKE, True)
+        self.assertEqual(ItemOperation.objects.filter(user=self.user, related_id=self.blog.pk).count(), 1)
+
+    def test_dislike_replaces_like(self):
+        set_reaction(self.user, 2, self.blog.pk, LIKE, True)
+        set_reaction(self.user, 2, self.blog.pk, SAVE, True)
+        reactions = set_reaction(self.user, 2, self.blog.pk, DISLIKE, True)
+        self.assertEqual(reactions, {'like': False, 'dislike': True, 'save': True})
+        self.assertEqual(self.counters(), (0, 1))
+
+    def test_reactions_of_a_page_in_one_query(self):
+        other = Blog.objects.create(title='other', english_title='other', time=5, status=1)
+        set_reaction(self.user, 2, other.pk, SAVE, True)
+        with CaptureQueriesContext(connection) as queries:
+            reactions = get_user_reactions(self.user, 2, [self.blog.pk, other.pk])
+        self.assertEqual(len(queries.captured_queries), 1)
+        self.assertFalse(any(reactions[self.blog.pk].values()))
+        self.assertTrue(reactions[other.pk]['save'])
+
+    def test_toggle_endpoint(self):
+        client = APIClient()
+        client.force_authenticate(self.user)
+        response = client.post('/activity/ItemOperationToggle/', {
+            'object_type': 2, 'related_id': self.blog.pk, 'item_operation_type': LIKE, 'active': True
+        }, format='json')
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.data['like'])
+
+        response = client.post('/activity/ItemOperationToggle/', {
+            'object_type': 2, 'related_id': self.blog.pk + 100, 'item_operation_type': LIKE, 'active': True
+        }, format='json')
+        self.assertEqual(response.status_code, 400)
@@ -3,7 +3,8 @@ from django.urls import path
 from activity.views import (CommentAddOrUpdateView, CommentGetListView, CommentGetView, CommentDeleteView,
                             CommentUndeleteView,
                             ItemOperationAddOrUpdateView, ItemOperationGetListView, ItemOperationGetView,
-                            ItemOperationDeleteView, ItemOperationUndeleteView,
+                            ItemOperationDeleteView, ItemOperationUndeleteView, ItemOperationToggleView,
+                            ItemOperationReactionsView,
                             RevisionAddOrUpdateView, RevisionGetListView, RevisionGetView, RevisionDeleteView,
                             RevisionUndeleteView,
                             UserLogAddOrUpdateView, UserLogGetListView, UserLogGetView, UserLogDeleteView,
@@ -26,6 +27,8 @@ urlpatterns = [
     path('ItemOperationGet/', ItemOperationGetView.as_view(), name="item_operation_get"),
     path('ItemOperationDelete/', ItemOperationDeleteView.as_view(), name="item_operation_delete"),
     path('ItemOperationUnDelete/', ItemOperationUndeleteView.as_view(), name="item_operation_undelete"),
+    path('ItemOperationToggle/', ItemOperationToggleView.as_view(), name="item_operation_toggle"),
+    path('ItemOperationReactions/', ItemOperationReactionsView.as_view(), name="item_operation_reactions"),
 
     # Revision
     path('RevisionAddOrUpdate/', RevisionAddOrUpdateView.as_view(), name="revision_add_or_update"),
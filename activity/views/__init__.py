@@ -1,5 +1,5 @@
 from .comment_api import CommentAddOrUpdateView, CommentGetListView, CommentGetView, CommentDeleteView, CommentUndeleteView
-from .item_operation_api import ItemOperationAddOrUpdateView, ItemOperationGetListView, ItemOperationGetView, ItemOperationDeleteView, ItemOperationUndeleteView
+from .item_operation_api import ItemOperationAddOrUpdateView, ItemOperationGetListView, ItemOperationGetView, ItemOperationDeleteView, ItemOperationUndeleteView, ItemOperationToggleView, ItemOperationReactionsView
 from .revision_api import RevisionAddOrUpdateView, RevisionGetListView, RevisionGetView, RevisionDeleteView, RevisionUndeleteView
 from .user_log_api import UserLogAddOrUpdateView, UserLogGetListView, UserLogGetView, UserLogDeleteView, UserLogUndeleteView
 from .user_survey_api import UserSurveyAddOrUpdateView, UserSurveyGetListView, UserSurveyGetView, UserSurveyDeleteView, UserSurveyUndeleteView
\ No newline at end of file
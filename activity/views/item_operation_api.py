@@ -8,7 +8,9 @@ from activity.models import ItemOperation
 from course.models import Course
 from course.serializers import CourseSerializer
 from serializers import MessageAndIdSerializer, DeleteSerializer, ListRequestSerializer, IdSerializer
-from activity.serializers import ItemOperationSerializer, ItemOperationListSerializer, ItemOperationGetSerializer
+from activity.serializers import ItemOperationSerializer, ItemOperationListSerializer, ItemOperationGetSerializer, \
+    ItemOperationToggleSerializer, ItemOperationReactionsRequestSerializer, ReactionSerializer
+from activity.reactions import set_reaction, get_user_reactions, get_object_model
 from rest_framework.pagination import PageNumberPagination
 from drf_spectacular.utils import extend_schema, OpenApiResponse
 
@@ -782,3 +784,40 @@ class ItemOperationUndeleteView(APIView):
             # If the cms was not soft-deleted
             return Response({"message": "عملیات آیتم مورد عملیات آیتم حذف نشده است."},
                             status=status.HTTP_400_BAD_REQUEST)
+
+
+class ItemOperationToggleView(APIView):
+    @extend_schema(
+        request=ItemOperationToggleSerializer,
+        responses={200: OpenApiResponse(response=ReactionSerializer)},
+        description="Like, dislike or save an item for the current user"
+    )
+    def post(self, request):
+        serializer = ItemOperationToggleSerializer(data=request.data)
+        if not serializer.is_valid():
+            return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+        data = serializer.validated_data
+
+        model = get_object_model(data['object_type'])
+        if not model.objects.filter(pk=data['related_id'], is_deleted=False).exists():
+            return Response({'message': 'آیتم مورد نظر یافت نشد.'}, status=status.HTTP_400_BAD_REQUEST)
+
+        reactions = set_reaction(request.user, data['object_type'], data['related_id'],
+                                 data['item_operation_type'], data['active'])
+        return Response(reactions, status=status.HTTP_200_OK)
+
+
+class ItemOperationReactionsView(APIView):
+    @extend_schema(
+        request=ItemOperationReactionsRequestSerializer,
+        responses={200: OpenApiResponse(description="{related_id: {like, dislike, save}}")},
+        description="Reactions of the current user on a list of items"
+    )
+    def post(self, request):
+        serializer = ItemOperationReactionsRequestSerializer(data=request.data)
+        if not serializer.is_valid():
+            return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+        data = serializer.validated_data
+
+        reactions = get_user_reactions(request.user, data['object_type'], data['related_ids'])
+        return Response(reactions, status=status.HTTP_200_OK)
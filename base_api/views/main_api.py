@@ -10,9 +10,10 @@ from base.models import SiteInfo, PageSeo, Menu, Photo, ContactInfo, StaticConte
 from base.serializers import ContactInfoSerializer
 from base_api.serializers import ServerTimeSerializer, PanelInfoResponseSerializer, AppInfoResponseSerializer, \
     AppAuthorizeResponseSerializer, GetSiteInfoRequestSerializer, SearchPanelRequestSerializer
-from security.models import Operation, Role
+from security.models import Operation
+from security.role_navigation import get_role_navigation, search_navigation
 from security.serializers import OperationSerializer
-from task_manager.models import Notification
+from task_manager.notifications import get_unread_count
 
 
 class ShowServerTimeView(APIView):
@@ -86,35 +87,6 @@ class GetPanelInfoView(APIView):
 
         # Prepare the user profile
 
-        role = Role.objects.filter(id=role_id).first()
-        features_selected = role.features_selected if role else []
-
-        # Function to build tree-like structure with nested children
-        def build_feature_tree(features):
-            nodes = {}
-            tree = []
-
-            # Create a dictionary of nodes
-            for feature in features:
-                nodes[feature['id']] = {**feature, 'children': []}
-
-            # Organize features into a tree structure
-            for feature in features:
-                if feature['parent'] is not None:
-                    # Add to parent's children if the feature has a parent
-                    nodes[feature['parent']]['children'].append(nodes[feature['id']])
-                else:
-                    # If no parent, it's a root node, so add it to the tree
-                    tree.append(nodes[feature['id']])
-
-            return tree
-
-        # Build the nested features
-        filtered_features = [feature for feature in features_selected if not feature.get('isSubMenu', False)]
-
-        # Build the nested features tree
-        nested_features = build_feature_tree(filtered_features)
-
         # Prepare developer info, handling missing attributes
         developer_data = {
             'logo': getattr(site_info.developer_logo, 'id', None) if site_info and site_info.developer_logo else None,
@@ -152,11 +124,11 @@ class GetPanelInfoView(APIView):
             }
             return Response(response_data, status=status.HTTP_200_OK)
         user = request.user  # Get the logged-in user from the request
+        # the nested menu of the role, built once per role version
+        navigation = get_role_navigation(role_id)
         count_not_read_message = 0
         if is_authorized:
-            count_not_read_message = Notification.objects.filter(
-                send_to__contains=[user.id], is_read=False
-            ).count()
+            count_not_read_message = get_unread_count(user.id)
         profile_data = {
             'userName': getattr(user, 'username', None),
             'fullName': getattr(user, 'full_name', None),
@@ -173,7 +145,7 @@ class GetPanelInfoView(APIView):
             'appVersion': app_version_data,
             'appColor': app_color_data,
             'profile': profile_data,
-            'features_selected': nested_features or [],  # Ensure it's an empty list if no menus
+            'features_selected': navigation['tree'] if navigation else [],  # Ensure it's an empty list if no menus
             'developer': developer_data,
             'serverTime': {
                 'time': current_datetime.time(),  # Get the time part
@@ -572,14 +544,9 @@ class SearchPanelMenuView(APIView):
         if not title:
             return Response({"message": "عنوان را وارد کنید!"}, status=status.HTTP_400_BAD_REQUEST)
 
-        role = Role.objects.get(id=role_id)
-        features_selected = []
-        if role:
-            for item in role.features_selected:
-                if item.get('operation_type') != 2 and title in item.get('title', ''):
-                    features_selected.append(item)
-        else:
+        navigation = get_role_navigation(role_id)
+        if navigation is None:
             return Response({"message": "نقش یافت نشد!"}, status=status.HTTP_400_BAD_REQUEST)
 
-        return Response(features_selected, status=status.HTTP_200_OK)
+        return Response(search_navigation(navigation, title), status=status.HTTP_200_OK)
 
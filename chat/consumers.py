@@ -1,192 +1,191 @@
 import json
-
-import jwt
-from channels.db import database_sync_to_async
-from channels.exceptions import DenyConnection
-from channels.generic.websocket import WebsocketConsumer
-from asgiref.sync import async_to_sync
+import re
+import uuid
 from datetime import datetime
-import os
 
-from jwt import ExpiredSignatureError, InvalidTokenError
+from channels.db import database_sync_to_async
+from channels.generic.websocket import AsyncWebsocketConsumer
 
-import Sahand.settings
 from Sahand import settings
+from chat import presence
+from chat.history import get_history, InvalidCursor
+from chat.message_buffer import message_buffer
 from chat.models import Message
-from security.models import User
 from task_manager.models import TaskProject
 
-CHAT_HISTORY_FILE = 'chat_history.json'
+ROOM_TASK_PATTERN = re.compile(r'(\d+)$')
+
+
+def get_room_task_id(room_name):
+    # rooms are named after their task project, e.g. "task12" or "12"
+    match = ROOM_TASK_PATTERN.search(room_name)
+    return int(match.group(1)) if match else None
 
 
-class ChatConsumer(WebsocketConsumer):
-    def connect(self):
+class ChatConsumer(AsyncWebsocketConsumer):
+    """
+    Chat of a task project. The user is authenticated once by chat.middleware.JWTAuthMiddleware, the ORM is
+    only used through database_sync_to_async so a socket does not hold a thread between messages.
+    """
+
+    async def connect(self):
         self.room_name = self.scope['url_route']['kwargs']['room_name']
         self.room_group_name = f"chat_{self.room_name}"
-
-        # Decode the token to get user information
-        token = self.scope['query_string'].decode('utf-8').split('=')[-1]
-        try:
-            decoded_token = jwt.decode(
-                token,
-                settings.SECRET_KEY,
-                algorithms=["HS256"]
-            )
-            self.user_id = decoded_token.get("user_id")
-            self.user = User.objects.get(id=self.user_id)  # Assign the User object to self.user
-            self.username = self.user.username
-        except ExpiredSignatureError:
-            print("Token has expired")
-            self.close()
-        except InvalidTokenError:
-            print("Invalid token")
-            self.close()
-        except User.DoesNotExist:
-            print("User not found")
-            self.close()
+        self.task_id = get_room_task_id(self.room_name)
+
+        self.user = self.scope.get('user')
+        if self.user is None or not self.user.is_authenticated or self.task_id is None:
+            await self.close()
+            return
+        # checked once here, the buffered messages of the socket are written without another lookup
+        if not await TaskProject.objects.filter(id=self.task_id).aexists():
+            await self.close()
+            return
+        self.username = self.user.username
+        self.user_detail = {
+            "id": self.user.id,
+            "photo": self.user.photo_id,
+            "fullname": self.user.full_name
+        }
 
         # Add the WebSocket to the group
-        async_to_sync(self.channel_layer.group_add)(
+        await self.channel_layer.group_add(
             self.room_group_name,
             self.channel_name
         )
 
         print(f"User {self.username} connected!")
-        self.accept()
-        self.send_previous_messages()
-
-    def receive(self, text_data):
-        self.room_name = self.scope['url_route']['kwargs']['room_name']
-        self.room_group_name = f"chat_{self.room_name}"
-        tsk_id = self.room_group_name[-1]
+        await self.accept()
+        await self.send_previous_messages()
+        await self.call_presence(presence.join, self.room_name, self.user.id, self.channel_name)
+        await self.broadcast_presence()
+
+    async def disconnect(self, code):
+        if hasattr(self, 'username'):
+            await self.channel_layer.group_discard(self.room_group_name, self.channel_name)
+            await self.call_presence(presence.leave, self.room_name, self.user.id, self.channel_name)
+            await self.broadcast_presence()
+
+    async def receive(self, text_data=None, bytes_data=None):
         text_data_json = json.loads(text_data)
+        frame_type = text_data_json.get('type')
+        # any frame keeps the socket online, idle clients send {"type": "heartbeat"}
+        await self.call_presence(presence.join, self.room_name, self.user.id, self.channel_name)
+        if frame_type == 'heartbeat':
+            return
+        if frame_type == 'typing':
+            await self.call_presence(presence.start_typing, self.room_name, self.user.id)
+            await self.broadcast_typing()
+            return
+        if frame_type == 'load_older':
+            await self.send_previous_messages(text_data_json.get('cursor'))
+            return
         message = text_data_json['text']
+        # a resent message keeps the id of the first attempt
+        client_id = str(text_data_json.get('clientId') or uuid.uuid4().hex)[:64]
 
         # Get the current timestamp
         timestamp = datetime.now()
 
         # Save the message along with the user's info and timestamp
-        self.save_message(self.username, message, timestamp, task_id=tsk_id)
-        print(self.username, message, timestamp, tsk_id)
-
-        # User details
-        user_detail = {
-            "id": self.user_id,
-            "photo": self.user.photo.id if self.user.photo else None,
-            "fullname": self.user.full_name
-        }
+        await self.save_message(message, timestamp, client_id)
+        # clients hide the typing indicator of a user when the message arrives
+        await self.call_presence(presence.stop_typing, self.room_name, self.user.id)
 
         # Broadcast the message to the group
-        async_to_sync(self.channel_layer.group_send)(
+        await self.channel_layer.group_send(
             self.room_group_name,
             {
                 'type': 'chat_message',
                 'client': self.username,  # Username
-                'user_detail': user_detail,  # Include user details
+                'user_detail': self.user_detail,  # Include user details
                 'message': message,
-                'timestamp': timestamp
+                'client_id': client_id,
+                # the channel layer only carries serializable values
+                'timestamp': timestamp.isoformat()
             }
         )
 
-    def chat_message(self, event):
+    async def chat_message(self, event):
         # Receive message from the group and send it to the WebSocket
-        self.send(text_data=json.dumps({
+        await self.send(text_data=json.dumps({
             'type': 'chat',
             'client': event['client'],  # Username
             'user_detail': event['user_detail'],  # Include user details here
             'message': event['message'],
-            'timestamp': event['timestamp'].isoformat()  # Convert datetime to ISO string
+            'clientId': event['client_id'],
+            'timestamp': event['timestamp']
         }))
 
-    def save_message(self, client, message, timestamp, task_id, message_status=1, file=None, status=1, voice=None):
-        user_id = None
-        token = self.scope['query_string'].decode('utf-8').split('=')[-1]
+    async def message_status(self, event):
+        # sent by the message buffer to the sender once its messages are stored (1) or given up (3)
+        await self.send(text_data=json.dumps({
+            'type': 'message_status',
+            'clientIds': event['client_ids'],
+            'message_status': event['message_status']
+        }))
+
+    async def presence_update(self, event):
+        await self.send(text_data=json.dumps({'type': 'presence', 'users': event['users']}))
+
+    async def typing_update(self, event):
+        await self.send(text_data=json.dumps({'type': 'typing', 'users': event['users']}))
+
+    async def call_presence(self, func, *args):
+        # presence is best effort, the chat keeps working without it
         try:
-            # Decode the token
-            decoded_token = jwt.decode(
-                token,
-                settings.SECRET_KEY,  # Use your Django secret key for decoding
-                algorithms=["HS256"]  # Match the algorithm used to sign the token
-            )
-            user_id = decoded_token.get("user_id")  # Extract the user ID
-        except ExpiredSignatureError:
-            print("Token has expired")
-            self.close()
-        except InvalidTokenError:
-            print("Invalid token")
-            self.close()
+            return await func(*args)
+        except Exception as e:
+            print(f"Error updating presence: {e}")
+
+    async def broadcast_presence(self):
+        users = await self.call_presence(presence.online_users, self.room_name)
+        if users is not None:
+            await self.channel_layer.group_send(self.room_group_name, {'type': 'presence_update', 'users': users})
+
+    async def broadcast_typing(self):
+        users = await self.call_presence(presence.typing_users, self.room_name)
+        if users is not None:
+            await self.channel_layer.group_send(self.room_group_name, {'type': 'typing_update', 'users': users})
+
+    async def save_message(self, message, timestamp, client_id, message_status=1, file=None, status=1,
+                           voice=None):
         """
-        Save the message to the Message model.
+        Queue the message in the message buffer, it is stored with the next bulk insert.
 
         Args:
-            client (str): Client information.
             message (str): The message text.
             timestamp (datetime): The timestamp of the message.
-            user (User): The user sending/receiving the message.
-            task_id (id): The associated task project.
+            client_id (str): Id given by the client, a resent message is stored once.
             message_status (int): Status of the message (default is 'Send').
             file (FileManager): Optional file attachment.
             status (int): Status of the message (default is 'Active').
         """
+        message_buffer.add(Message(
+            text=message,
+            send_time=timestamp,
+            user_id=self.user.id,
+            task_project_id=self.task_id,
+            message_status=message_status,
+            file_id=file,
+            status=status,
+            voice_id=voice,
+            client_id=client_id
+        ), self.channel_name)
+        if not getattr(settings, 'CHAT_MESSAGES_BUFFERED', True):
+            await message_buffer.flush()
+
+    async def send_previous_messages(self, cursor=None):
+        """
+        Send the latest messages when a user connects, and older pages on {"type": "load_older", "cursor": ...},
+        each page as a single frame.
+        """
         try:
-            # Save the message instance to the database
-            tp = TaskProject.objects.get(id=task_id)
-            Message.objects.create(
-                text=message,
-                send_time=timestamp,
-                user_id=user_id,
-                task_project=tp,
-                message_status=message_status,
-                file_id=file,
-                status=status,
-                voice_id=voice
-            )
-            print(f"Message from saved {client} successfully.")
-        except Exception as e:
-            print(f"Error saving message: {e}")
-
-    def send_previous_messages(self):
-        user_id = None
-        token = self.scope['query_string'].decode('utf-8').split('=')[-1]
-        try:
-            # Decode the token
-            decoded_token = jwt.decode(
-                token,
-                settings.SECRET_KEY,  # Use your Django secret key for decoding
-                algorithms=["HS256"]  # Match the algorithm used to sign the token
-            )
-            user_id = decoded_token.get("user_id")  # Extract the user ID
-        except ExpiredSignatureError:
-            print("Token has expired")
-            self.close()
-        except InvalidTokenError:
-            print("Invalid token")
-            self.close()
-
-        self.room_name = self.scope['url_route']['kwargs']['room_name']
-        self.room_group_name = f"chat_{self.room_name}"
-        tsk_id = self.room_group_name[-1]
-        """Send previous messages when a user connects"""
-        try:
-            print(f"is {tsk_id}")
-            # Query the Message model to get all previous messages
-            messages = Message.objects.filter(task_project_id=tsk_id).order_by(
-                'send_time')  # Retrieve all messages, ordered by the timestamp
-
-            # Send each message to the client
-            for msg in messages:
-                self.send(text_data=json.dumps({
-                    'type': 'chat',
-                    'client': msg.user.username if msg.user else 'Unknown',
-                    # Assuming the `client` is linked to the user,
-                    'user_detail': {
-                        "id": msg.user_id,
-                        "photo": msg.user.photo.id if msg.user.photo else None,
-                        "fullname": msg.user.full_name,
-                    },
-                    'message': msg.text,
-                    'timestamp': msg.send_time.isoformat()
-                    # Convert timestamp to ISO format for consistency
-                }))
+            history = await database_sync_to_async(get_history)(self.task_id, cursor)
+        except InvalidCursor as e:
+            await self.send(text_data=json.dumps({'type': 'error', 'message': str(e)}))
+            return
         except Exception as e:
             print(f"Error fetching messages: {e}")
+            return
+        await self.send(text_data=json.dumps(history))
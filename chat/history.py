@@ -0,0 +1,67 @@
+import base64
+import json
+
+from django.db.models import Q
+from django.utils.dateparse import parse_datetime
+
+from Sahand import settings
+from chat.models import Message
+
+HISTORY_PAGE_SIZE = getattr(settings, 'CHAT_HISTORY_PAGE_SIZE', 50)
+
+
+class InvalidCursor(Exception):
+    pass
+
+
+def encode_cursor(message):
+    payload = json.dumps({'t': message.send_time.isoformat(), 'id': message.id}, separators=(',', ':'))
+    return base64.urlsafe_b64encode(payload.encode()).decode().rstrip('=')
+
+
+def decode_cursor(token):
+    try:
+        payload = json.loads(base64.urlsafe_b64decode(token + '=' * (-len(token) % 4)))
+        send_time, pk = parse_datetime(payload['t']), int(payload['id'])
+    except (ValueError, TypeError, KeyError):
+        raise InvalidCursor('cursor نامعتبر است.')
+    if send_time is None:
+        raise InvalidCursor('cursor نامعتبر است.')
+    return send_time, pk
+
+
+def message_payload(msg):
+    return {
+        'type': 'chat',
+        'id': msg.id,
+        'client': msg.user.username if msg.user else 'Unknown',
+        'user_detail': {
+            "id": msg.user_id,
+            "photo": msg.user.photo_id if msg.user else None,
+            "fullname": msg.user.full_name if msg.user else None,
+        },
+        'message': msg.text,
+        'clientId': msg.client_id,
+        'timestamp': msg.send_time.isoformat()
+    }
+
+
+def get_history(task_id, cursor=None, limit=HISTORY_PAGE_SIZE):
+    """
+    One frame with the `limit` messages of the room before `cursor` (the newest ones without a cursor), oldest
+    first. Read backwards on the (task_project, send_time, id) index, so the cost does not grow with the room.
+    """
+    messages = Message.objects.filter(task_project_id=task_id).select_related('user')
+    if cursor:
+        send_time, pk = decode_cursor(cursor)
+        messages = messages.filter(Q(send_time__lt=send_time) | Q(send_time=send_time, id__lt=pk))
+    messages = list(messages.order_by('-send_time', '-id')[:limit + 1])
+
+    has_more = len(messages) > limit
+    messages = messages[:limit]
+    return {
+        'type': 'history',
+        'messages': [message_payload(msg) for msg in reversed(messages)],
+        'nextCursor': encode_cursor(messages[-1]) if has_more else None,
+        'hasMore': has_more,
+    }
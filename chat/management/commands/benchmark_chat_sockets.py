@@ -0,0 +1,72 @@
+import asyncio
+import time
+
+from asgiref.sync import async_to_sync
+from channels.layers import get_channel_layer
+from channels.testing import WebsocketCommunicator
+from django.core.management.base import BaseCommand, CommandError
+from django.utils.module_loading import import_string
+from rest_framework_simplejwt.tokens import AccessToken
+
+from security.models import User
+
+
+async def receive_chat(socket):
+    # presence and typing frames of the other sockets are skipped
+    while True:
+        frame = await socket.receive_json_from(timeout=60)
+        if frame['type'] == 'chat':
+            return frame
+
+
+class Command(BaseCommand):
+    help = ("Open chat sockets in one process, step by step, until connecting a step and replaying the room "
+            "history to it takes longer than --max-connect-time, then time one broadcast to all open sockets")
+
+    def add_arguments(self, parser):
+        parser.add_argument('--user', type=int, required=True, help="id of the user the sockets log in as")
+        parser.add_argument('--room', required=True, help="room name, e.g. task12")
+        parser.add_argument('--step', type=int, default=100)
+        parser.add_argument('--max-sockets', type=int, default=5000)
+        parser.add_argument('--max-connect-time', type=float, default=1.0)
+        parser.add_argument('--application', default='Sahand.asgi.application')
+
+    def handle(self, *args, **options):
+        if get_channel_layer() is None:
+            raise CommandError("CHANNEL_LAYERS is not configured")
+        user = User.objects.filter(id=options['user']).first()
+        if user is None:
+            raise CommandError(f"User {options['user']} not found")
+        options['token'] = str(AccessToken.for_user(user))
+        async_to_sync(self.run)(options)
+
+    async def connect(self, application, path):
+        communicator = WebsocketCommunicator(application, path)
+        connected, _ = await communicator.connect(timeout=30)
+        if not connected:
+            raise CommandError("Socket was rejected, check --user and --room")
+        # the history frame
+        await communicator.receive_from(timeout=60)
+        return communicator
+
+    async def run(self, options):
+        application = import_string(options['application'])
+        path = f"/ws/chat/{options['room']}/?token={options['token']}"
+        sockets = []
+        try:
+            while len(sockets) < options['max_sockets']:
+                started = time.perf_counter()
+                sockets += await asyncio.gather(*[self.connect(application, path) for _ in range(options['step'])])
+                elapsed = time.perf_counter() - started
+                self.stdout.write(f"{len(sockets)} sockets, last {options['step']} connected in {elapsed:.2f}s")
+                if elapsed > options['max_connect_time']:
+                    break
+
+            marker = f'benchmark-{time.time()}'
+            started = time.perf_counter()
+            await sockets[0].send_json_to({'text': marker})
+            await asyncio.gather(*[receive_chat(socket) for socket in sockets])
+            elapsed = time.perf_counter() - started
+            self.stdout.write(self.style.SUCCESS(f"broadcast reached {len(sockets)} sockets in {elapsed:.2f}s"))
+        finally:
+            await asyncio.gather(*[socket.disconnect() for socket in sockets])
@@ -0,0 +1,113 @@
+import asyncio
+import multiprocessing
+import statistics
+import time
+
+from asgiref.sync import async_to_sync
+from channels.layers import get_channel_layer, InMemoryChannelLayer
+from channels.testing import WebsocketCommunicator
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connections
+from django.utils.module_loading import import_string
+from rest_framework_simplejwt.tokens import AccessToken
+
+from chat.management.commands.benchmark_chat_sockets import receive_chat
+from security.models import User
+
+
+async def run_clients(worker, clients, options, barrier):
+    application = import_string(options['application'])
+    path = f"/ws/chat/{options['room']}/?token={options['token']}"
+
+    sockets = []
+    for _ in range(clients):
+        socket = WebsocketCommunicator(application, path)
+        connected, _ = await socket.connect(timeout=30)
+        if not connected:
+            return {'error': "Socket was rejected, check --user and --room"}
+        await socket.receive_from(timeout=30)  # the history frame
+        sockets.append(socket)
+
+    # every worker holds its sockets before the first message is sent
+    await asyncio.get_running_loop().run_in_executor(None, barrier.wait)
+
+    async def collect(socket):
+        latencies = []
+        try:
+            while len(latencies) < options['messages']:
+                frame = await receive_chat(socket)
+                latencies.append(time.time() - float(frame['message'].split()[1]))
+        except asyncio.TimeoutError:
+            pass
+        return latencies
+
+    collectors = [asyncio.ensure_future(collect(socket)) for socket in sockets]
+    if worker == 0:
+        for i in range(options['messages']):
+            await sockets[0].send_json_to({'text': f'load-{i} {time.time()}'})
+            await asyncio.sleep(options['interval'])
+    latencies = [latency for result in await asyncio.gather(*collectors) for latency in result]
+    await asyncio.gather(*[socket.disconnect() for socket in sockets])
+    return {'latencies': latencies}
+
+
+def run_worker(worker, clients, options, barrier, results):
+    results.put(async_to_sync(run_clients)(worker, clients, options, barrier))
+
+
+class Command(BaseCommand):
+    help = ("Spread --clients simulated chat clients over --workers processes in one room, send --messages from "
+            "one of them and report how many deliveries reached the clients of every worker and how fast. More "
+            "than one worker needs a shared channel layer, e.g. a local `redis-server` with "
+            "CHAT_REDIS_URL=redis://localhost:6379/0")
+
+    def add_arguments(self, parser):
+        parser.add_argument('--user', type=int, required=True, help="id of the user the clients log in as")
+        parser.add_argument('--room', required=True, help="room name, e.g. task12")
+        parser.add_argument('--clients', type=int, default=200)
+        parser.add_argument('--workers', type=int, default=2)
+        parser.add_argument('--messages', type=int, default=20)
+        parser.add_argument('--interval', type=float, default=0.05, help="seconds between two messages")
+        parser.add_argument('--application', default='Sahand.asgi.application')
+
+    def handle(self, *args, **options):
+        if options['workers'] > 1 and isinstance(get_channel_layer(), InMemoryChannelLayer):
+            raise CommandError("The in-memory channel layer does not reach other processes, set CHAT_REDIS_URL")
+        user = User.objects.filter(id=options['user']).first()
+        if user is None:
+            raise CommandError(f"User {options['user']} not found")
+        options['token'] = str(AccessToken.for_user(user))
+
+        workers = options['workers']
+        shares = [options['clients'] // workers + (1 if worker < options['clients'] % workers else 0)
+                  for worker in range(workers)]
+        # the forked workers open their own database connections
+        connections.close_all()
+        context = multiprocessing.get_context('fork')
+        barrier, results = context.Barrier(workers), context.Queue()
+        processes = [context.Process(target=run_worker, args=(worker, shares[worker], options, barrier, results))
+                     for worker in range(workers)]
+        started = time.perf_counter()
+        for process in processes:
+            process.start()
+        reports = [results.get() for _ in processes]
+        for process in processes:
+            process.join()
+        elapsed = time.perf_counter() - started
+
+        errors = [report['error'] for report in reports if 'error' in report]
+        if errors:
+            raise CommandError(errors[0])
+        latencies = sorted(latency for report in reports for latency in report['latencies'])
+        expected = options['clients'] * options['messages']
+        self.stdout.write(f"{workers} worker(s), {options['clients']} clients, {options['messages']} messages "
+                          f"in {elapsed:.2f}s")
+        self.stdout.write(f"deliveries: {len(latencies)}/{expected}")
+        if latencies:
+            self.stdout.write(f"latency p50 {statistics.median(latencies) * 1000:.1f}ms, "
+                              f"p95 {latencies[int(len(latencies) * 0.95) - 1] * 1000:.1f}ms, "
+                              f"max {latencies[-1] * 1000:.1f}ms")
+        if len(latencies) == expected:
+            self.stdout.write(self.style.SUCCESS("every client received every message"))
+        else:
+            self.stdout.write(self.style.ERROR("messages were lost"))
@@ -0,0 +1,117 @@
+import asyncio
+
+from channels.db import database_sync_to_async
+from channels.layers import get_channel_layer
+
+from Sahand import settings
+
+# Message.MESSAGE_STATUS_CHOICES reported back to the sender
+STORED = 1
+FAILED = 3
+
+
+class MessageBuffer:
+    """
+    Chat messages already broadcast and waiting to be stored. A task on the event loop writes them with
+    bulk_create every flush_interval, or as soon as batch_size are waiting. Failed rows are retried with a
+    growing delay up to max_attempts, the sender learns the outcome from a {"type": "message_status"} frame.
+    """
+
+    def __init__(self, batch_size=200, flush_interval=0.5, max_attempts=5):
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.max_attempts = max_attempts
+        self._pending = []
+        self._failures = 0
+        self._loop = None
+        self._wakeup = None
+        self._task = None
+
+    def add(self, message, channel_name):
+        self._pending.append({'message': message, 'channel_name': channel_name, 'attempts': 0})
+        self._ensure_started()
+        if len(self._pending) >= self.batch_size:
+            self._wakeup.set()
+
+    async def flush(self):
+        written = 0
+        while self._pending:
+            batch, self._pending = self._pending[:self.batch_size], self._pending[self.batch_size:]
+            saved, failed = await database_sync_to_async(self._write)(batch)
+            written += len(saved)
+
+            self._pending = [entry for entry in failed if entry['attempts'] < self.max_attempts] + self._pending
+            await self._notify(saved, STORED)
+            await self._notify([entry for entry in failed if entry['attempts'] >= self.max_attempts], FAILED)
+            if failed:
+                # the rest waits for the next attempt
+                self._failures += 1
+                break
+            self._failures = 0
+        return written
+
+    @staticmethod
+    def _write(batch):
+        from chat.models import Message
+
+        try:
+            # ignore_conflicts: a resent client_id that is already stored counts as stored
+            Message.objects.bulk_create([entry['message'] for entry in batch], ignore_conflicts=True)
+            return batch, []
+        except Exception as e:
+            print(f"Chat message flush failed: {e}")
+
+        # one by one, so a broken row does not hold back the others
+        saved, failed = [], []
+        for entry in batch:
+            try:
+                Message.objects.bulk_create([entry['message']], ignore_conflicts=True)
+                saved.append(entry)
+            except Exception as e:
+                print(f"Error saving message {entry['message'].client_id}: {e}")
+                entry['attempts'] += 1
+                failed.append(entry)
+        return saved, failed
+
+    async def _notify(self, entries, message_status):
+        channel_layer = get_channel_layer()
+        client_ids = {}
+        for entry in entries:
+            client_ids.setdefault(entry['channel_name'], []).append(entry['message'].client_id)
+        for channel_name, ids in client_ids.items():
+            try:
+                await channel_layer.send(channel_name, {
+                    'type': 'message_status', 'client_ids': ids, 'message_status': message_status
+                })
+            except Exception as e:
+                # the sender is gone, it resends what was not acknowledged after reconnecting
+                print(f"Error sending message status: {e}")
+
+    def _ensure_started(self):
+        # one task per event loop, the tests run every case in a loop of its own
+        loop = asyncio.get_running_loop()
+        if self._loop is loop:
+            return
+        self._loop = loop
+        self._wakeup = asyncio.Event()
+        self._task = loop.create_task(self._run())
+
+    async def _run(self):
+        while True:
+            delay = self.flush_interval * 2 ** min(self._failures, 6)
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), delay)
+            except asyncio.TimeoutError:
+                pass
+            self._wakeup.clear()
+            try:
+                await self.flush()
+            except Exception as e:
+                print(f"Chat message flush failed: {e}")
+
+
+message_buffer = MessageBuffer(
+    batch_size=getattr(settings, 'CHAT_MESSAGE_BATCH_SIZE', 200),
+    flush_interval=getattr(settings, 'CHAT_MESSAGE_FLUSH_INTERVAL', 0.5),
+    max_attempts=getattr(settings, 'CHAT_MESSAGE_MAX_ATTEMPTS', 5),
+)
@@ -0,0 +1,58 @@
+from urllib.parse import parse_qs
+
+import jwt
+from channels.db import database_sync_to_async
+from channels.middleware import BaseMiddleware
+from django.contrib.auth.models import AnonymousUser
+from jwt import ExpiredSignatureError, InvalidTokenError
+
+from Sahand import settings
+from security.models import User
+
+
+def get_query_token(scope):
+    query_string = scope.get('query_string', b'').decode('utf-8')
+    token = parse_qs(query_string).get('token')
+    if token:
+        return token[0]
+    # older clients send the token as the only value of the query string
+    return query_string.split('=')[-1] or None
+
+
+@database_sync_to_async
+def get_token_user(token):
+    try:
+        decoded_token = jwt.decode(
+            token,
+            settings.SECRET_KEY,
+            algorithms=["HS256"]
+        )
+    except ExpiredSignatureError:
+        print("Token has expired")
+        return AnonymousUser()
+    except InvalidTokenError:
+        print("Invalid token")
+        return AnonymousUser()
+
+    user = User.objects.filter(id=decoded_token.get("user_id")).first()
+    if user is None:
+        print("User not found")
+        return AnonymousUser()
+    return user
+
+
+class JWTAuthMiddleware(BaseMiddleware):
+    """
+    Authenticates a websocket once, from the access token in the query string (?token=...), and keeps the
+    user in scope['user'] for the consumers.
+    """
+
+    async def __call__(self, scope, receive, send):
+        scope = dict(scope)
+        token = get_query_token(scope)
+        scope['user'] = await get_token_user(token) if token else AnonymousUser()
+        return await super().__call__(scope, receive, send)
+
+
+def JWTAuthMiddlewareStack(inner):
+    return JWTAuthMiddleware(inner)
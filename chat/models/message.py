@@ -1,4 +1,5 @@
 from django.db import models
+from django.utils import timezone
 
 
 class Message(models.Model):
@@ -12,7 +13,7 @@ class Message(models.Model):
         (2, 'Inactive')
     ]
     text = models.TextField(null=True, blank=True)
-    send_time = models.DateTimeField(auto_now_add=True)
+    send_time = models.DateTimeField(default=timezone.now)  # set when the message is broadcast, stored later in bulk
     user = models.ForeignKey('security.User', on_delete=models.SET_NULL, null=True, blank=True,
                              related_name='message_user')
     task_project = models.ForeignKey('task_manager.TaskProject', on_delete=models.CASCADE,
@@ -26,6 +27,16 @@ class Message(models.Model):
     update_row_date = models.DateTimeField(auto_now=True)
     is_deleted = models.BooleanField(default=False)
     status = models.PositiveIntegerField(choices=STATUS_CHOICES, null=True, blank=True)
+    # id given by the sending client, a message resent after a lost acknowledgement is stored once
+    client_id = models.CharField(max_length=64, null=True, blank=True)
 
     class Meta:
         db_table = 'chat_message'
+        indexes = [
+            # history of a room, read backwards from the newest message
+            models.Index(fields=['task_project', '-send_time', '-id'], name='chat_message_history_idx'),
+        ]
+        constraints = [
+            models.UniqueConstraint(fields=['user', 'client_id'], condition=models.Q(client_id__isnull=False),
+                                    name='chat_message_unique_client_id'),
+        ]
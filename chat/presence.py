@@ -0,0 +1,104 @@
+import time
+
+from Sahand import settings
+
+PRESENCE_TTL = getattr(settings, 'CHAT_PRESENCE_TTL', 60)
+TYPING_TTL = getattr(settings, 'CHAT_TYPING_TTL', 5)
+PRESENCE_KEY = 'chat:presence:{}'
+TYPING_KEY = 'chat:typing:{}'
+
+
+class InMemoryPresenceStore:
+    """
+    Expiring members per key, only seen by the sockets of this process.
+    """
+
+    def __init__(self):
+        self._keys = {}
+
+    async def touch(self, key, member, ttl):
+        self._keys.setdefault(key, {})[member] = time.time() + ttl
+
+    async def remove(self, key, member):
+        self._keys.get(key, {}).pop(member, None)
+
+    async def members(self, key):
+        now = time.time()
+        members = self._keys.get(key, {})
+        for member, expires in list(members.items()):
+            if expires <= now:
+                del members[member]
+        return list(members)
+
+
+class RedisPresenceStore:
+    """
+    Expiring members per key shared by all the workers, a sorted set scored by the expiry time. The members
+    of a crashed worker stop being refreshed and expire with their TTL.
+    """
+
+    def __init__(self, url):
+        self.url = url
+        self._client = None
+
+    @property
+    def client(self):
+        if self._client is None:
+            import redis.asyncio as redis
+
+            self._client = redis.from_url(self.url, decode_responses=True)
+        return self._client
+
+    async def touch(self, key, member, ttl):
+        async with self.client.pipeline(transaction=False) as pipe:
+            pipe.zadd(key, {member: time.time() + ttl})
+            # the key of an idle room goes away on its own
+            pipe.expire(key, 2 * max(ttl, PRESENCE_TTL))
+            await pipe.execute()
+
+    async def remove(self, key, member):
+        await self.client.zrem(key, member)
+
+    async def members(self, key):
+        async with self.client.pipeline(transaction=False) as pipe:
+            pipe.zremrangebyscore(key, '-inf', time.time())
+            pipe.zrange(key, 0, -1)
+            _, members = await pipe.execute()
+        return members
+
+
+_store = None
+
+
+def get_presence_store():
+    global _store
+    if _store is None:
+        url = getattr(settings, 'CHAT_REDIS_URL', '')
+        _store = RedisPresenceStore(url) if url else InMemoryPresenceStore()
+    return _store
+
+
+async def join(room, user_id, channel_name):
+    # one member per socket, a user with two tabs stays online until both are closed
+    await get_presence_store().touch(PRESENCE_KEY.format(room), f'{user_id}:{channel_name}', PRESENCE_TTL)
+
+
+async def leave(room, user_id, channel_name):
+    await get_presence_store().remove(PRESENCE_KEY.format(room), f'{user_id}:{channel_name}')
+
+
+async def online_users(room):
+    members = await get_presence_store().members(PRESENCE_KEY.format(room))
+    return sorted({int(member.split(':', 1)[0]) for member in members})
+
+
+async def start_typing(room, user_id):
+    await get_presence_store().touch(TYPING_KEY.format(room), str(user_id), TYPING_TTL)
+
+
+async def stop_typing(room, user_id):
+    await get_presence_store().remove(TYPING_KEY.format(room), str(user_id))
+
+
+async def typing_users(room):
+    return sorted(int(member) for member in await get_presence_store().members(TYPING_KEY.format(room)))
@@ -1,3 +1,155 @@
-from django.test import TestCase
+from datetime import timedelta
+from unittest import mock
 
-# Create your tests here.
+from channels.routing import URLRouter
+from channels.testing import WebsocketCommunicator
+from django.test import TestCase, override_settings
+from django.utils import timezone
+from rest_framework_simplejwt.tokens import AccessToken
+
+from chat.history import get_history
+from chat.message_buffer import message_buffer, MessageBuffer
+from chat.middleware import JWTAuthMiddlewareStack
+from chat.models import Message
+from chat.routing import websocket_urlpatterns
+from security.models import User
+from task_manager.models import TaskProject
+
+IN_MEMORY_CHANNEL_LAYERS = {'default': {'BACKEND': 'channels.layers.InMemoryChannelLayer'}}
+
+
+@override_settings(CHANNEL_LAYERS=IN_MEMORY_CHANNEL_LAYERS)
+class ChatConsumerTest(TestCase):
+    def setUp(self):
+        self.application = JWTAuthMiddlewareStack(URLRouter(websocket_urlpatterns))
+        self.user = User.objects.create_user(username='member', password='secret', full_name='Member')
+        self.task_project = TaskProject.objects.create(title='project')
+        Message.objects.create(text='earlier', user=self.user, task_project=self.task_project, message_status=1)
+
+    def communicator(self, token):
+        return WebsocketCommunicator(self.application, f'/ws/chat/task{self.task_project.id}/?token={token}')
+
+    async def receive_frame(self, communicator, frame_type):
+        while True:
+            frame = await communicator.receive_json_from()
+            if frame['type'] == frame_type:
+                return frame
+
+    async def test_rejects_invalid_token(self):
+        connected, _ = await self.communicator('invalid').connect()
+        self.assertFalse(connected)
+
+    async def test_history_and_broadcast(self):
+        token = str(AccessToken.for_user(self.user))
+        first, second = self.communicator(token), self.communicator(token)
+        for communicator in (first, second):
+            connected, _ = await communicator.connect()
+            self.assertTrue(connected)
+            history = await communicator.receive_json_from()
+            self.assertEqual([(message['message'], message['client']) for message in history['messages']],
+                             [('earlier', 'member')])
+
+        await first.send_json_to({'text': 'hello', 'clientId': 'c1'})
+        for communicator in (first, second):
+            message = await self.receive_frame(communicator, 'chat')
+            self.assertEqual((message['message'], message['user_detail']['fullname'], message['clientId']),
+                             ('hello', 'Member', 'c1'))
+
+        # the message is stored by the buffer, then the sender is told
+        await message_buffer.flush()
+        status = await self.receive_frame(first, 'message_status')
+        self.assertEqual((status['clientIds'], status['message_status']), (['c1'], 1))
+        for communicator in (first, second):
+            await communicator.disconnect()
+        self.assertEqual(await Message.objects.filter(task_project=self.task_project).acount(), 2)
+
+    def test_history_is_paged_with_a_cursor(self):
+        Message.objects.bulk_create([Message(text=f'message {i}', user=self.user, task_project=self.task_project,
+                                             message_status=1) for i in range(6)])
+        texts, cursor = [], None
+        while True:
+            with self.assertNumQueries(1):
+                history = get_history(self.task_project.id, cursor, limit=3)
+            texts = [message['message'] for message in history['messages']] + texts
+            if not history['hasMore']:
+                break
+            cursor = history['nextCursor']
+        self.assertEqual(texts, ['earlier'] + [f'message {i}' for i in range(6)])
+
+    async def test_load_older_with_invalid_cursor(self):
+        communicator = self.communicator(str(AccessToken.for_user(self.user)))
+        await communicator.connect()
+        self.assertFalse((await communicator.receive_json_from())['hasMore'])
+        await communicator.send_json_to({'type': 'load_older', 'cursor': 'broken'})
+        self.assertEqual((await communicator.receive_json_from())['type'], 'error')
+        await communicator.disconnect()
+
+    async def test_presence_and_typing(self):
+        other = await User.objects.acreate(username='other')
+        first = self.communicator(str(AccessToken.for_user(self.user)))
+        second = self.communicator(str(AccessToken.for_user(other)))
+        await first.connect()
+        self.assertEqual((await self.receive_frame(first, 'presence'))['users'], [self.user.id])
+
+        await second.connect()
+        self.assertEqual((await self.receive_frame(first, 'presence'))['users'], sorted([self.user.id, other.id]))
+        await second.send_json_to({'type': 'typing'})
+        self.assertEqual((await self.receive_frame(first, 'typing'))['users'], [other.id])
+
+        await second.disconnect()
+        self.assertEqual((await self.receive_frame(first, 'presence'))['users'], [self.user.id])
+        await first.disconnect()
+
+
+class MessageBufferTest(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username='member', password='secret')
+        self.task_project = TaskProject.objects.create(title='project')
+        self.buffer = MessageBuffer(batch_size=100, flush_interval=3600, max_attempts=2)
+
+    def message(self, client_id):
+        return Message(text=client_id, user=self.user, task_project=self.task_project, message_status=1,
+                       client_id=client_id)
+
+    async def test_bulk_insert_and_resent_messages(self):
+        for i in range(50):
+            self.buffer.add(self.message(f'c{i}'), 'channel')
+        # the resent message is stored once
+        self.buffer.add(self.message('c0'), 'channel')
+        self.assertEqual(await self.buffer.flush(), 51)
+        self.assertEqual(await Message.objects.filter(task_project=self.task_project).acount(), 50)
+
+    async def test_send_time_of_the_broadcast_is_kept(self):
+        sent = timezone.now() - timedelta(minutes=5)
+        message = self.message('late')
+        message.send_time = sent
+        self.buffer.add(message, 'channel')
+        await self.buffer.flush()
+        self.assertEqual((await Message.objects.aget(client_id='late')).send_time, sent)
+
+    async def test_failed_writes_are_retried(self):
+        original = Message.objects.bulk_create
+        calls = []
+
+        def fail_first_attempts(objs, **kwargs):
+            calls.append(len(objs))
+            if len(calls) <= 3:
+                raise Exception('database is gone')
+            return original(objs, **kwargs)
+
+        self.buffer.add(self.message('a'), 'channel')
+        self.buffer.add(self.message('b'), 'channel')
+        with mock.patch.object(Message.objects, 'bulk_create', side_effect=fail_first_attempts):
+            # the batch, then each row, fail
+            self.assertEqual(await self.buffer.flush(), 0)
+            self.assertEqual(await self.buffer.flush(), 2)
+        self.assertEqual(await Message.objects.filter(client_id__in=['a', 'b']).acount(), 2)
+
+    async def test_gives_up_after_max_attempts(self):
+        self.buffer.add(self.message('a'), 'channel')
+        with mock.patch.object(Message.objects, 'bulk_create', side_effect=Exception('database is gone')), \
+                mock.patch.object(self.buffer, '_notify') as notify:
+            await self.buffer.flush()
+            await self.buffer.flush()
+        self.assertEqual(await self.buffer.flush(), 0)
+        self.assertEqual(notify.call_args_list[-1].args[1], 3)
@@ -54,6 +54,12 @@ class Blog(models.Model):
 
     class Meta:
         db_table = 'cms_blog'
+        # keyset pagination of the public listings (frontend_api.pagination)
+        indexes = [
+            models.Index(fields=['-create_row_date', '-id'], name='cms_blog_new_idx'),
+            models.Index(fields=['-count_view', '-id'], name='cms_blog_view_idx'),
+            models.Index(fields=['-count_like', '-id'], name='cms_blog_popular_idx'),
+        ]
         ordering = ['id']
 
     def __str__(self):
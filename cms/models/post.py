@@ -46,4 +46,10 @@ class Post(models.Model):
     status = models.IntegerField(choices=STATUS_CHOICES, default=1)
 
     class Meta:
-        db_table = 'cms_post'
\ No newline at end of file
+        db_table = 'cms_post'
+        # keyset pagination of the public listings (frontend_api.pagination)
+        indexes = [
+            models.Index(fields=['-create_row_date', '-id'], name='cms_post_new_idx'),
+            models.Index(fields=['-count_view', '-id'], name='cms_post_view_idx'),
+            models.Index(fields=['-count_like', '-id'], name='cms_post_popular_idx'),
+        ]
\ No newline at end of file
@@ -31,6 +31,12 @@ class Story(models.Model):
 
     class Meta:
         db_table = 'cms_story'
+        # keyset pagination of the public listings (frontend_api.pagination)
+        indexes = [
+            models.Index(fields=['-create_row_date', '-id'], name='cms_story_new_idx'),
+            models.Index(fields=['-count_view', '-id'], name='cms_story_view_idx'),
+            models.Index(fields=['-count_like', '-id'], name='cms_story_popular_idx'),
+        ]
 
 
 # SELECT TOP (1000) [Id]
@@ -39,5 +39,11 @@ class WorkSample(models.Model):
 
     class Meta:
         db_table = 'cms_work_sample'
+        # keyset pagination of the public listings (frontend_api.pagination)
+        indexes = [
+            models.Index(fields=['-create_row_date', '-id'], name='cms_work_sample_new_idx'),
+            models.Index(fields=['-count_view', '-id'], name='cms_work_sample_view_idx'),
+            models.Index(fields=['-count_like', '-id'], name='cms_work_sample_popular_idx'),
+        ]
         ordering = ['id']
 
@@ -0,0 +1,12 @@
+from django.core.management.base import BaseCommand
+
+from utilities.sms import deliver_due_sms, SENT
+
+
+class Command(BaseCommand):
+    help = "Deliver the pending SMS outbox messages that are due, e.g. the ones left by a restarted process"
+
+    def handle(self, *args, **options):
+        results = deliver_due_sms()
+        sent = sum(1 for result in results if result == SENT)
+        self.stdout.write(self.style.SUCCESS(f"{sent}/{len(results)} message(s) sent"))
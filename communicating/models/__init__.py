@@ -1,3 +1,4 @@
 from .ans_consult import AnswerConsult
 from .req_consult import RequestConsult
-from .consult import Consult
\ No newline at end of file
+from .consult import Consult
+from .sms_outbox import SmsOutbox
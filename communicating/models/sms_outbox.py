@@ -0,0 +1,45 @@
+from django.db import models
+
+
+class SmsOutbox(models.Model):
+    DELIVERY_STATUS_CHOICES = [
+        (1, 'Pending'),
+        (2, 'Sent'),
+        (3, 'Failed')
+    ]
+    STATUS_CHOICES = [
+        (1, 'Active'),
+        (2, 'Inactive')
+    ]
+    phone = models.CharField(max_length=20)
+    template_id = models.PositiveIntegerField()
+    code = models.CharField(max_length=20, null=True, blank=True)
+    params = models.JSONField(default=list, blank=True)
+    delivery_status = models.PositiveIntegerField(choices=DELIVERY_STATUS_CHOICES, default=1)
+    attempts = models.PositiveIntegerField(default=0)
+    next_attempt_date = models.DateTimeField(null=True, blank=True)
+    sent_date = models.DateTimeField(null=True, blank=True)
+    last_error = models.TextField(null=True, blank=True)
+    create_row_date = models.DateTimeField(auto_now_add=True)
+    update_row_date = models.DateTimeField(auto_now=True)
+    is_deleted = models.BooleanField(default=False)
+    status = models.PositiveIntegerField(choices=STATUS_CHOICES, null=True, blank=True)
+
+    class Meta:
+        db_table = 'communicating_sms_outbox'
+        indexes = [
+            # pending messages due for delivery
+            models.Index(fields=['delivery_status', 'next_attempt_date'], name='sms_outbox_due_idx'),
+        ]
+
+    def body(self):
+        body = {
+            "mobile": str(self.phone),
+            "method": "sms",
+            "templateID": self.template_id,
+        }
+        if self.code is not None:
+            body["code"] = str(self.code)
+        if self.params:
+            body["params"] = self.params
+        return body
@@ -1,3 +1,45 @@
+import time
+from unittest import mock
+
 from django.test import TestCase
 
-# Create your tests here.
+from communicating.models import SmsOutbox
+from utilities import sms
+from utilities.sms import FakeSmsProvider, deliver_sms, deliver_due_sms, send_sms_login, send_sms_new_task
+
+
+class SmsOutboxTest(TestCase):
+    def test_enqueue_does_not_wait_for_the_provider(self):
+        provider = FakeSmsProvider(latency=0.5)
+        with mock.patch.object(sms, 'submit_sms') as submit:
+            started = time.perf_counter()
+            with self.captureOnCommitCallbacks(execute=True):
+                outbox = send_sms_new_task('09120000000', 'آقای', 'کاربر', 'تسک', 'پروژه')
+            self.assertLess(time.perf_counter() - started, 0.1)
+        submit.assert_called_once_with(outbox.id)
+
+        self.assertEqual(deliver_sms(outbox.id, provider), sms.SENT)
+        self.assertEqual(provider.sent[0]['params'], ['آقای', 'کاربر', 'تسک', 'پروژه'])
+        outbox.refresh_from_db()
+        self.assertEqual((outbox.delivery_status, outbox.attempts), (sms.SENT, 1))
+        # a delivered message is not sent twice
+        self.assertIsNone(deliver_sms(outbox.id, provider))
+
+    def test_failed_attempts_back_off_and_give_up(self):
+        with mock.patch.object(sms, 'submit_sms'):
+            outbox = send_sms_login('09120000000', '12345')
+        provider = FakeSmsProvider(failure_rate=1.0)
+
+        self.assertEqual(deliver_sms(outbox.id, provider), sms.PENDING)
+        outbox.refresh_from_db()
+        self.assertEqual(outbox.attempts, 1)
+        self.assertIsNotNone(outbox.last_error)
+        # not due before the backoff
+        self.assertEqual(deliver_due_sms(provider), [])
+
+        for attempt in range(2, sms.MAX_ATTEMPTS + 1):
+            SmsOutbox.objects.filter(id=outbox.id).update(next_attempt_date=outbox.create_row_date)
+            deliver_due_sms(provider)
+        outbox.refresh_from_db()
+        self.assertEqual((outbox.delivery_status, outbox.attempts), (sms.FAILED, sms.MAX_ATTEMPTS))
+        self.assertEqual(provider.sent, [])
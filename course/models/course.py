@@ -72,3 +72,9 @@ class Course(models.Model):
 
     class Meta:
         db_table = 'course_course'
+        # keyset pagination of the public listings (frontend_api.pagination)
+        indexes = [
+            models.Index(fields=['-create_row_date', '-id'], name='course_course_new_idx'),
+            models.Index(fields=['-count_view', '-id'], name='course_course_view_idx'),
+            models.Index(fields=['-count_like', '-id'], name='course_course_popular_idx'),
+        ]
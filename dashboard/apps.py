@@ -4,3 +4,9 @@ from django.apps import AppConfig
 class DashboardConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'dashboard'
+
+    def ready(self):
+        from dashboard.signals import connect_saved_items_signals
+
+        # the cached saved items of a user are dropped when one of the user's operations changes
+        connect_saved_items_signals()
@@ -10,16 +10,28 @@ from course.serializers import CourseSerializer, CourseUserSerializer
 from payment.serializers import TransactionSerializer
 
 
+class UserDashboardRequestSerializer(serializers.Serializer):
+    commentPage = serializers.IntegerField(min_value=0, default=0)
+    commentPageCount = serializers.IntegerField(min_value=1, max_value=100, default=20)
+
+
+class DashboardCommentItemSerializer(CommentSerializer):
+    english_title = serializers.CharField(allow_null=True, read_only=True)
+
+
 class DashboardCommentSerializer(serializers.Serializer):
     all_comments = serializers.IntegerField()
     true_comments = serializers.IntegerField()
     false_comments = serializers.IntegerField()
-    courses = CommentSerializer(many=True)
-    blogs = CommentSerializer(many=True)
-    work_samples = CommentSerializer(many=True)
-    posts = CommentSerializer(many=True)
-    stories = CommentSerializer(many=True)
-    services = CommentSerializer(many=True)
+    page = serializers.IntegerField()
+    total_page = serializers.IntegerField()
+    has_next_page = serializers.BooleanField()
+    courses = DashboardCommentItemSerializer(many=True)
+    blogs = DashboardCommentItemSerializer(many=True)
+    work_samples = DashboardCommentItemSerializer(many=True)
+    posts = DashboardCommentItemSerializer(many=True)
+    stories = DashboardCommentItemSerializer(many=True)
+    services = DashboardCommentItemSerializer(many=True)
 
 class SavedItemsSerializer(serializers.Serializer):
     courses = CourseSerializer(many=True)
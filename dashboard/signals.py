@@ -0,0 +1,13 @@
+from django.db.models.signals import post_save, post_delete
+
+from activity.models import ItemOperation
+from dashboard.utils import invalidate_saved_items
+
+
+def item_operation_changed(sender, instance, **kwargs):
+    invalidate_saved_items(instance.user_id)
+
+
+def connect_saved_items_signals():
+    post_save.connect(item_operation_changed, sender=ItemOperation, dispatch_uid='dashboard_saved_items_save')
+    post_delete.connect(item_operation_changed, sender=ItemOperation, dispatch_uid='dashboard_saved_items_delete')
@@ -1,3 +1,95 @@
+from django.core.cache import cache
+from django.db import connection
 from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from rest_framework.test import APIClient
 
-# Create your tests here.
+from activity.models import ItemOperation, Comment
+from activity.reactions import set_reaction, SAVE
+from cms.models import Blog, Post
+from dashboard.utils import retrieve_saved_items, retrieve_comments
+from security.models import User
+
+
+class SavedItemsTest(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user(username='reader', password='secret')
+        self.blogs = [Blog.objects.create(title=f'blog {i}', english_title=f'blog-{i}', time=5, status=1)
+                      for i in range(30)]
+        self.post = Post.objects.create(title='post', english_title='post', status=1)
+
+    def save_items(self, blogs):
+        with self.captureOnCommitCallbacks(execute=True):
+            for blog in blogs:
+                ItemOperation.objects.create(user=self.user, object_type=2, related_id=blog.id,
+                                             item_operation_type=3, status=1)
+
+    def saved_query_count(self):
+        cache.clear()
+        with CaptureQueriesContext(connection) as queries:
+            retrieve_saved_items(self.user)
+        return len(queries.captured_queries)
+
+    def test_one_query_per_object_type(self):
+        self.save_items(self.blogs[:2])
+        few = self.saved_query_count()
+        self.save_items(self.blogs[2:])
+        self.assertEqual(self.saved_query_count(), few)
+
+        saved = retrieve_saved_items(self.user)
+        self.assertEqual([blog['id'] for blog in saved['blogs']], [blog.id for blog in self.blogs])
+        self.assertEqual(saved['blogs'][0]['english_title'], 'blog-0')
+        self.assertEqual(saved['courses'], [])
+
+    def test_snapshot_is_invalidated(self):
+        self.save_items(self.blogs[:1])
+        self.assertEqual(len(retrieve_saved_items(self.user)['blogs']), 1)
+        with CaptureQueriesContext(connection) as queries:
+            retrieve_saved_items(self.user)
+        self.assertEqual(len(queries.captured_queries), 0)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            set_reaction(self.user, 4, self.post.id, SAVE, True)
+        self.assertEqual([post['id'] for post in retrieve_saved_items(self.user)['posts']], [self.post.id])
+
+        with self.captureOnCommitCallbacks(execute=True):
+            operation = ItemOperation.objects.get(user=self.user, object_type=2)
+            operation.is_deleted = True
+            operation.save()
+        self.assertEqual(retrieve_saved_items(self.user)['blogs'], [])
+
+
+class CommentSummaryTest(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username='writer', password='secret')
+        self.blog = Blog.objects.create(title='blog', english_title='blog-en', time=5, status=1)
+        self.post = Post.objects.create(title='post', english_title='post-en', status=1)
+        for i in range(25):
+            Comment.objects.create(user=self.user, object_type=2 if i % 2 else 4, related_id=self.blog.id if i % 2
+                                   else self.post.id, comment_type=1, comment_text=f'comment {i}', status=i % 5 != 0)
+
+    def test_counters_and_titles(self):
+        with CaptureQueriesContext(connection) as queries:
+            comments = retrieve_comments(self.user, 0, 10)
+        # counters, the page and one title lookup per object type
+        self.assertEqual(len(queries.captured_queries), 4)
+        self.assertEqual((comments['all_comments'], comments['true_comments'], comments['false_comments']),
+                         (25, 20, 5))
+        self.assertEqual(len(comments['blogs']) + len(comments['posts']), 10)
+        self.assertEqual({comment.english_title for comment in comments['blogs']}, {'blog-en'})
+        self.assertEqual((comments['total_page'], comments['has_next_page']), (3, True))
+
+        last = retrieve_comments(self.user, 2, 10)
+        self.assertEqual(len(last['blogs']) + len(last['posts']), 5)
+        self.assertFalse(last['has_next_page'])
+
+    def test_dashboard_endpoint(self):
+        client = APIClient()
+        client.force_authenticate(self.user)
+        response = client.post('/dashboard/GetUserProfile/', {'commentPage': 1, 'commentPageCount': 20},
+                               format='json')
+        self.assertEqual(response.status_code, 200)
+        comments = response.data['comments']
+        self.assertEqual(len(comments['blogs']) + len(comments['posts']), 5)
+        self.assertEqual(comments['posts'][0]['english_title'], 'post-en')
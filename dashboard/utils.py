@@ -1,76 +1,122 @@
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import F, Q, Count
+
+from Sahand import settings
 from activity.models import ItemOperation, Comment
-from activity.serializers import CommentSerializer
 from course.models import Course
-from course.serializers import CourseSerializer
 from cms.models import Blog, WorkSample, Post, Story, Service
-from cms.serializers import ServiceSerializer, StorySerializer, PostSerializer, BlogSerializer, WorkSampleSerializer
-from django.contrib.auth.models import User
+
+SAVED_ITEMS_CACHE_TIMEOUT = getattr(settings, 'DASHBOARD_SAVED_ITEMS_CACHE_TIMEOUT', 10 * 60)
+SAVED_ITEMS_KEY = 'dashboard:saved:{}'
+COMMENTS_PAGE_COUNT = getattr(settings, 'DASHBOARD_COMMENTS_PAGE_COUNT', 20)
+
+SAVED_ITEM_COMMON_FIELDS = ('id', 'title', 'photo', 'count_like', 'count_dislike', 'count_view', 'count_comment',
+                            'create_row_date')
+# object_type: (key in the dashboard, model, fields shown on the saved item cards besides the common ones)
+SAVED_ITEM_TYPES = {
+    1: ('courses', Course, ('english_title', 'abstract', 'rate', 'price', 'is_discount', 'discount',
+                            'discount_type', 'discount_end', 'hours', 'student_count', 'writer')),
+    2: ('blogs', Blog, ('english_title', 'abstract', 'rate', 'time', 'content_category', 'publish_date')),
+    3: ('work_samples', WorkSample, ('english_title', 'abstract', 'rate')),
+    4: ('posts', Post, ('english_title', 'post_type', 'rate', 'publish_date')),
+    5: ('stories', Story, ('link', 'publish_date')),
+    6: ('services', Service, ('english_title', 'icon', 'order')),
+}
+# object_type: (model, field shown as the english_title of a comment)
+COMMENT_TITLE_FIELDS = {
+    1: (Course, 'english_title'),
+    2: (Blog, 'english_title'),
+    3: (WorkSample, 'title'),
+    4: (Post, 'english_title'),
+    5: (Story, 'title'),
+    6: (Service, 'title'),
+}
 
 
 def retrieve_saved_items(user):
     """
     Retrieve saved items for a given user and organize them by object type.
+    One query for the saved operations and one per object type, the result is cached per user until one of
+    the user's operations changes.
     """
+    cache_key = SAVED_ITEMS_KEY.format(user.id)
+    saved_data = cache.get(cache_key)
+    if saved_data is not None:
+        return saved_data
+
     saved_operations = ItemOperation.objects.filter(
         user=user,
         item_operation_type=3,
         is_deleted=False
-    )
+    ).order_by('id').values_list('object_type', 'related_id')
+
+    related_ids = {}
+    for object_type, related_id in saved_operations:
+        if object_type in SAVED_ITEM_TYPES:
+            related_ids.setdefault(object_type, []).append(related_id)
+
+    saved_data = {key: [] for key, _, _ in SAVED_ITEM_TYPES.values()}
+    for object_type, ids in related_ids.items():
+        key, model, fields = SAVED_ITEM_TYPES[object_type]
+        queryset = model.objects.filter(id__in=ids)
+        if model is Blog:
+            queryset = queryset.annotate(content_category_title=F('content_category__title'))
+            fields += ('content_category_title',)
+        items = {item['id']: item for item in queryset.values(*SAVED_ITEM_COMMON_FIELDS, *fields)}
+        # in the order they were saved, items removed since then are skipped
+        saved_data[key] = [items[related_id] for related_id in dict.fromkeys(ids) if related_id in items]
+
+    cache.set(cache_key, saved_data, SAVED_ITEMS_CACHE_TIMEOUT)
+    return saved_data
 
-    saved_data = {
-        "courses": [],
-        "blogs": [],
-        "work_samples": [],
-        "posts": [],
-        "stories": [],
-        "services": []
-    }
 
-    for operation in saved_operations:
-        related_id = operation.related_id
-        if operation.object_type == 1:  # Course
-            item = Course.objects.filter(id=related_id).first()
-            if item:
-                saved_data["courses"].append(CourseSerializer(item).data)
-        elif operation.object_type == 2:  # Blog
-            item = Blog.objects.filter(id=related_id).first()
-            if item:
-                saved_data["blogs"].append(BlogSerializer(item).data)
-        elif operation.object_type == 3:  # WorkSample
-            item = WorkSample.objects.filter(id=related_id).first()
-            if item:
-                saved_data["work_samples"].append(WorkSampleSerializer(item).data)
-        elif operation.object_type == 4:  # Post
-            item = Post.objects.filter(id=related_id).first()
-            if item:
-                saved_data["posts"].append(PostSerializer(item).data)
-        elif operation.object_type == 5:  # Story
-            item = Story.objects.filter(id=related_id).first()
-            if item:
-                saved_data["stories"].append(StorySerializer(item).data)
-        elif operation.object_type == 6:  # Service
-            item = Service.objects.filter(id=related_id).first()
-            if item:
-                saved_data["services"].append(ServiceSerializer(item).data)
+def invalidate_saved_items(user_id):
+    # after the commit, a request running meanwhile could cache the old state again
+    if user_id:
+        transaction.on_commit(lambda: cache.delete(SAVED_ITEMS_KEY.format(user_id)))
 
-    return saved_data
+
+def resolve_titles(keys):
+    """
+    {(object_type, related_id): title} for the given pairs, one query per object type.
+    """
+    related_ids = {}
+    for object_type, related_id in keys:
+        if object_type in COMMENT_TITLE_FIELDS:
+            related_ids.setdefault(object_type, set()).add(related_id)
+
+    titles = {}
+    for object_type, ids in related_ids.items():
+        model, field = COMMENT_TITLE_FIELDS[object_type]
+        for related_id, title in model.objects.filter(id__in=ids).values_list('id', field):
+            titles[(object_type, related_id)] = title
+    return titles
 
 
-def retrieve_comments(user):
+def retrieve_comments(user, page=0, page_count=COMMENTS_PAGE_COUNT):
     """
     Retrieve comments for a given user and organize them by object type.
+    The counters come from one aggregate query, only the requested page of comments is loaded.
     """
     user_comments = Comment.objects.filter(
         user=user,
         comment_type=1,  # 'نظر' type
-        is_deleted=False,
-        status=True
+        is_deleted=False
+    )
+
+    counters = user_comments.aggregate(
+        all_comments=Count('id'),
+        true_comments=Count('id', filter=Q(status=True)),
+        false_comments=Count('id', filter=Q(status=False)),
     )
+    total_page = (counters['all_comments'] + page_count - 1) // page_count
 
     comments_data = {
-        "all_comments": user_comments.count(),
-        "true_comments": user_comments.filter(status=True).count(),
-        "false_comments": user_comments.filter(status=False).count(),
+        **counters,
+        "page": page,
+        "total_page": total_page,
+        "has_next_page": page + 1 < total_page,
         "courses": [],
         "blogs": [],
         "work_samples": [],
@@ -79,58 +125,11 @@ def retrieve_comments(user):
         "services": []
     }
 
-    for comment in user_comments:
-        serialized_comment = CommentSerializer(comment).data
-        related_id = comment.related_id
-
-        # Replace 'user' ID with serialized user object
-        if isinstance(comment.user, int):
-            comment_user = User.objects.filter(id=comment.user).first()
-            if comment_user:
-                serialized_comment['user'] = {
-                    "id": comment_user.id,
-                    "username": comment_user.username,  # Add fields as needed
-                }
-            else:
-                serialized_comment['user'] = None  # Handle missing user
-        else:
-            serialized_comment['user'] = comment.user  # Already a User instance
-
-        # Fetch related object data and add extra fields like 'english_title'
-        if comment.object_type == 1:  # Course
-            related_object = Course.objects.filter(id=related_id).first()
-            if related_object:
-                serialized_comment['english_title'] = related_object.english_title
-            comments_data["courses"].append(serialized_comment)
-
-        elif comment.object_type == 2:  # Blog
-            related_object = Blog.objects.filter(id=related_id).first()
-            if related_object:
-                serialized_comment['english_title'] = related_object.english_title
-            comments_data["blogs"].append(serialized_comment)
-
-        elif comment.object_type == 3:  # WorkSample
-            related_object = WorkSample.objects.filter(id=related_id).first()
-            if related_object:
-                serialized_comment['english_title'] = related_object.title
-            comments_data["work_samples"].append(serialized_comment)
-
-        elif comment.object_type == 4:  # Post
-            related_object = Post.objects.filter(id=related_id).first()
-            if related_object:
-                serialized_comment['english_title'] = related_object.english_title
-            comments_data["posts"].append(serialized_comment)
-
-        elif comment.object_type == 5:  # Story
-            related_object = Story.objects.filter(id=related_id).first()
-            if related_object:
-                serialized_comment['english_title'] = related_object.title
-            comments_data["stories"].append(serialized_comment)
-
-        elif comment.object_type == 6:  # Service
-            related_object = Service.objects.filter(id=related_id).first()
-            if related_object:
-                serialized_comment['english_title'] = related_object.title
-            comments_data["services"].append(serialized_comment)
+    comments = list(user_comments.order_by('-create_row_date', '-id')[page * page_count:(page + 1) * page_count])
+    titles = resolve_titles((comment.object_type, comment.related_id) for comment in comments)
+    for comment in comments:
+        comment.english_title = titles.get((comment.object_type, comment.related_id))
+        if comment.object_type in SAVED_ITEM_TYPES:
+            comments_data[SAVED_ITEM_TYPES[comment.object_type][0]].append(comment)
 
     return comments_data
@@ -10,7 +10,7 @@ from rest_framework.views import APIView
 # from course.serializers import CourseUserSerializer
 from course.models import CourseUser
 from course.serializers import CourseUserSerializer
-from dashboard.serializers import UserDashboardSerializer
+from dashboard.serializers import UserDashboardSerializer, UserDashboardRequestSerializer
 from dashboard.utils import retrieve_saved_items, retrieve_comments
 from payment.models import Transaction
 
@@ -18,6 +18,7 @@ from payment.models import Transaction
 class GetUserProfileView(APIView):
 
     @extend_schema(
+        request=UserDashboardRequestSerializer,
         responses={200: OpenApiResponse(response=UserDashboardSerializer)},
         description="Get user profile with saved items"
     )
@@ -26,6 +27,12 @@ class GetUserProfileView(APIView):
         if not user:
             return Response({"message": "کاربر یافت نشد!"}, status=status.HTTP_400_BAD_REQUEST)
 
+        request_serializer = UserDashboardRequestSerializer(data=request.data)
+        if not request_serializer.is_valid():
+            return Response(request_serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+        comment_page = request_serializer.validated_data['commentPage']
+        comment_page_count = request_serializer.validated_data['commentPageCount']
+
         # Prepare profile data
         profile_data = {
             'id': user.id,
@@ -38,12 +45,12 @@ class GetUserProfileView(APIView):
         # Retrieve saved items using the helper function
         saved_data = retrieve_saved_items(user)
 
-        comments_data = retrieve_comments(user)
+        comments_data = retrieve_comments(user, comment_page, comment_page_count)
 
         # Combine profile, saved items, and comments
         user_courses = CourseUser.objects.filter(user=user, is_deleted=False)  # Get the user's active courses
         # courses_data = CourseUserSerializer(user_courses, many=True).data  # Serialize course data
-        user_transactions = Transaction.objects.filter(user=user, is_deleted=False)
+        user_transactions = Transaction.objects.filter(user=user, is_deleted=False).select_related('course_user__course')
 
 
         # Combine profile, saved items, comments, and courses
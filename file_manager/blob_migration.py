@@ -0,0 +1,27 @@
+from file_manager.storage import get_blob_storage
+
+MIGRATION_CHUNK_SIZE = 1024 * 1024
+
+
+def migrate_file_to_storage(file_id):
+    """
+    Moves the legacy file_data of a FileManager row into the blob storage. Returns True when the row was moved.
+    Run by the migrate_file_blobs command, a download still reading the column goes on from the blob
+    (see FileManager.iter_file_data).
+    """
+    from file_manager.models import FileManager
+
+    file_instance = FileManager.objects.filter(
+        pk=file_id, is_folder=False, content_hash__isnull=True, file_data__isnull=False
+    ).first()
+    if file_instance is None:
+        return False
+
+    size = file_instance.get_stored_size()
+    content_hash, size = get_blob_storage().save(
+        file_instance.iter_file_data(0, size - 1, MIGRATION_CHUNK_SIZE)
+    )
+    # only clear the legacy column if nobody replaced the file meanwhile
+    return FileManager.objects.filter(pk=file_id, content_hash__isnull=True).update(
+        content_hash=content_hash, size=size, file_data=None
+    ) == 1
@@ -0,0 +1,146 @@
+from django.db.models import F, Q, Value
+from django.db.models.functions import Concat, Substr
+
+
+def normalize_folder_path(path):
+    """
+    '/docs/videos', 'docs/videos/' and '/docs/videos/' all name the folder '/docs/videos/'.
+    """
+    path = (path or '').strip('/')
+    return f'/{path}/' if path else '/'
+
+
+def ancestor_paths(path):
+    """
+    '/docs/videos/' -> ['/', '/docs/', '/docs/videos/']
+    """
+    parts = normalize_folder_path(path).strip('/').split('/')
+    paths = ['/']
+    for i in range(len(parts)):
+        if parts[i]:
+            paths.append('/' + '/'.join(parts[:i + 1]) + '/')
+    return paths
+
+
+def folder_path(parent_url, name):
+    return normalize_folder_path(f'{parent_url or "/"}{name}')
+
+
+def folder_path_of(folder):
+    return folder_path(folder.parentUrl, folder.name)
+
+
+def apply_folder_delta(parent_url, files=0, folders=0, size=0, direct=True):
+    """
+    Adds an item (or removes it, with negative values) under `parent_url`: the direct counters of the parent
+    folder and the cumulative counters of every ancestor are updated with a single UPDATE. `direct=False` only
+    moves the cumulative counters, for the content of a moved folder.
+    """
+    from file_manager.models import FolderStats
+
+    if not files and not folders and not size:
+        return
+    parent_path = normalize_folder_path(parent_url)
+    paths = ancestor_paths(parent_path)
+    FolderStats.objects.bulk_create([FolderStats(path=path) for path in paths], ignore_conflicts=True)
+    FolderStats.objects.filter(path__in=paths).update(
+        total_file_count=F('total_file_count') + files,
+        total_folder_count=F('total_folder_count') + folders,
+        total_size=F('total_size') + size,
+    )
+    if not direct:
+        return
+    FolderStats.objects.filter(path=parent_path).update(
+        file_count=F('file_count') + files,
+        folder_count=F('folder_count') + folders,
+    )
+
+
+def register_folder(folder):
+    from file_manager.models import FolderStats
+
+    FolderStats.objects.update_or_create(path=folder_path_of(folder), defaults={'folder_id': folder.id})
+
+
+def move_folder(old_path, new_path):
+    """
+    Moves the content of a renamed or moved folder: the parentUrl of the rows under it, one UPDATE per sub folder,
+    and the FolderStats rows of its sub tree with their counters. Runs in the transaction of the folder's save().
+    """
+    from file_manager.models import FileManager, FolderStats
+
+    old_path, new_path = normalize_folder_path(old_path), normalize_folder_path(new_path)
+    if old_path == new_path or old_path == '/':
+        return
+    old_stem, new_stem = old_path.strip('/'), new_path.strip('/')
+
+    # parentUrl is stored as sent, with or without the leading and trailing slashes
+    parent_urls = FileManager.objects.filter(
+        Q(parentUrl__startswith=f'/{old_stem}/') | Q(parentUrl__startswith=f'{old_stem}/')
+        | Q(parentUrl__in=[f'/{old_stem}', old_stem])
+    ).values_list('parentUrl', flat=True).distinct()
+    for parent_url in list(parent_urls):
+        lead = '/' if parent_url.startswith('/') else ''
+        FileManager.objects.filter(parentUrl=parent_url).update(
+            parentUrl=lead + new_stem + parent_url[len(lead) + len(old_stem):]
+        )
+
+    stats = FolderStats.objects.select_for_update().filter(path=old_path).first()
+    old_parent, new_parent = ancestor_paths(old_path)[-2], ancestor_paths(new_path)[-2]
+    if stats and old_parent != new_parent:
+        apply_folder_delta(old_parent, files=-stats.total_file_count, folders=-stats.total_folder_count,
+                           size=-stats.total_size, direct=False)
+        apply_folder_delta(new_parent, files=stats.total_file_count, folders=stats.total_folder_count,
+                           size=stats.total_size, direct=False)
+
+    # rows left at the new path describe no folder, the name was free
+    FolderStats.objects.filter(path__startswith=new_path).delete()
+    FolderStats.objects.filter(path__startswith=old_path).update(
+        path=Concat(Value(new_path), Substr('path', len(old_path) + 1))
+    )
+
+
+def get_folder_stats(paths):
+    """
+    Returns {normalized path: FolderStats} for the given folder paths in one query.
+    """
+    from file_manager.models import FolderStats
+
+    paths = [normalize_folder_path(path) for path in paths]
+    return {stats.path: stats for stats in FolderStats.objects.filter(path__in=paths)}
+
+
+def rebuild_folder_stats():
+    """
+    Recomputes every FolderStats row from the FileManager table.
+    """
+    from file_manager.models import FileManager, FolderStats
+
+    stats = {}
+
+    def get(path):
+        if path not in stats:
+            stats[path] = FolderStats(path=path)
+        return stats[path]
+
+    get('/')
+    rows = FileManager.objects.values_list('id', 'name', 'parentUrl', 'is_folder', 'size').iterator()
+    for file_id, name, parent_url, is_folder, size in rows:
+        parent_path = normalize_folder_path(parent_url)
+        parent = get(parent_path)
+        if is_folder:
+            parent.folder_count += 1
+            get(normalize_folder_path(f'{parent_url or "/"}{name}')).folder_id = file_id
+        else:
+            parent.file_count += 1
+        for path in ancestor_paths(parent_path):
+            ancestor = get(path)
+            if is_folder:
+                ancestor.total_folder_count += 1
+            else:
+                ancestor.total_file_count += 1
+                ancestor.total_size += size or 0
+
+    FolderStats.objects.all().delete()
+    FolderStats.objects.bulk_create(stats.values(), batch_size=500)
+    return len(stats)
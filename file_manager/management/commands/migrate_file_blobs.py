@@ -0,0 +1,24 @@
+from django.core.management.base import BaseCommand
+
+from file_manager.blob_migration import migrate_file_to_storage
+from file_manager.models import FileManager
+
+
+class Command(BaseCommand):
+    help = "Move the file_data of legacy FileManager rows into the blob storage"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--limit', type=int, default=None, help="Maximum number of files to move")
+
+    def handle(self, *args, **options):
+        file_ids = FileManager.objects.filter(
+            is_folder=False, content_hash__isnull=True, file_data__isnull=False
+        ).order_by('id').values_list('id', flat=True)
+        if options['limit']:
+            file_ids = file_ids[:options['limit']]
+
+        moved = 0
+        for file_id in file_ids.iterator():
+            if migrate_file_to_storage(file_id):
+                moved += 1
+        self.stdout.write(self.style.SUCCESS(f"{moved} file(s) moved to the blob storage"))
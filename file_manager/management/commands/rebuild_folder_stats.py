@@ -0,0 +1,13 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from file_manager.folder_index import rebuild_folder_stats
+
+
+class Command(BaseCommand):
+    help = "Recompute the file manager folder aggregates from the FileManager table"
+
+    def handle(self, *args, **options):
+        with transaction.atomic():
+            count = rebuild_folder_stats()
+        self.stdout.write(self.style.SUCCESS(f"{count} folder(s) indexed"))
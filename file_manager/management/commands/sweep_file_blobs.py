@@ -0,0 +1,15 @@
+from django.core.management.base import BaseCommand
+
+from file_manager.storage import sweep_unreferenced_blobs
+
+
+class Command(BaseCommand):
+    help = "Remove the stored blobs no FileManager row refers to any more"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--grace-period', type=int, default=None,
+                            help="Keep the blobs saved within this many seconds (FILE_MANAGER_BLOB_GRACE_PERIOD)")
+
+    def handle(self, *args, **options):
+        deleted = sweep_unreferenced_blobs(options['grace_period'])
+        self.stdout.write(self.style.SUCCESS(f"{deleted} blob(s) removed"))
@@ -1,12 +1,32 @@
 import os
 
-from django.db import models
+from django.db import models, transaction
+from django.db.models import BinaryField
+from django.db.models.functions import Length, Substr
+
+from file_manager.folder_index import apply_folder_delta, register_folder, folder_path, folder_path_of, move_folder
+from file_manager.storage import get_blob_storage
+
+
+class FileManagerQuerySet(models.QuerySet):
+    def with_file_data(self):
+        """
+        Loads the legacy file_data column too, for the few paths that really need the bytes.
+        """
+        return self.defer(None)
+
+
+class FileManagerManager(models.Manager.from_queryset(FileManagerQuerySet)):
+    def get_queryset(self):
+        # file_data can hold whole files, listings and FK dereferences (blog.photo, user.photo, ...) never need it
+        return super().get_queryset().defer('file_data')
 
 
 class FileManager(models.Model):
     name = models.CharField(max_length=255)  # Name of the file or folder
     # url = models.CharField(max_length=500, blank=True, null=True)
-    file_data = models.BinaryField(blank=True, null=True)  # Store raw file data
+    file_data = models.BinaryField(blank=True, null=True)  # Legacy raw file data, read until moved to the blob storage
+    content_hash = models.CharField(max_length=64, blank=True, null=True, db_index=True)  # SHA-256 of the blob
     # parent = models.ForeignKey('self', related_name='children', on_delete=models.PROTECT, blank=True, null=True)
     parentUrl = models.CharField(max_length=1000, default='/')
     is_folder = models.BooleanField(default=False)  # Determines if it's a folder
@@ -16,25 +36,141 @@ class FileManager(models.Model):
     updated_at = models.DateTimeField(auto_now=True)
     is_deleted = models.BooleanField(default=False)
 
+    objects = FileManagerManager()
+
     class Meta:
         db_table = 'file_manager'  # Specify the table name here
+        # related lookups use the base manager, so they defer file_data as well
+        base_manager_name = 'objects'
         verbose_name = 'File Manager'
         verbose_name_plural = 'File Manager'
 
     def __str__(self):
         return self.name
 
-    def save_file(self, file):
-        # Read the file content as binary
-        self.file_data = file.read()  # Directly store the raw bytes
+    def save(self, *args, **kwargs):
+        with transaction.atomic():
+            previous = None
+            if self.pk is not None:
+                # locked, a concurrent save of the row waits for these deltas before computing its own
+                previous = FileManager.objects.select_for_update().filter(pk=self.pk).values(
+                    'name', 'parentUrl', 'is_folder', 'size').first()
+            super().save(*args, **kwargs)
+
+            # keep the folder aggregates in step with the row
+            if previous is None:
+                self._apply_to_folder_stats(self.parentUrl, self.is_folder, self.size, 1)
+            elif (previous['parentUrl'], previous['is_folder'], previous['size']) != \
+                    (self.parentUrl, self.is_folder, self.size):
+                self._apply_to_folder_stats(previous['parentUrl'], previous['is_folder'], previous['size'], -1)
+                self._apply_to_folder_stats(self.parentUrl, self.is_folder, self.size, 1)
+            if self.is_folder:
+                if previous and previous['is_folder']:
+                    move_folder(folder_path(previous['parentUrl'], previous['name']), folder_path_of(self))
+                register_folder(self)
 
-        # Save the size in bytes
-        self.size = file.size  # Update size in bytes
+    def _apply_to_folder_stats(self, parent_url, is_folder, size, sign):
+        if is_folder:
+            apply_folder_delta(parent_url, folders=sign)
+        else:
+            apply_folder_delta(parent_url, files=sign, size=sign * (size or 0))
+
+    def save_file(self, file):
+        # Stream the upload into the blob storage, only the hash is kept in the row
+        self.content_hash, self.size = get_blob_storage().save(file.chunks())
+        self.file_data = None
         self.file_extension = os.path.splitext(file.name)[1]
         self.save()
 
+    def delete(self, *args, **kwargs):
+        with transaction.atomic():
+            previous = FileManager.objects.select_for_update().filter(pk=self.pk).values(
+                'parentUrl', 'is_folder', 'size').first()
+            result = super().delete(*args, **kwargs)
+            if previous:
+                self._apply_to_folder_stats(previous['parentUrl'], previous['is_folder'], previous['size'], -1)
+            if self.is_folder:
+                # an emptied folder takes its aggregates with it
+                FolderStats.objects.filter(path=folder_path_of(self), file_count=0, folder_count=0).delete()
+        # blobs are shared between identical uploads, the unreferenced ones are removed by the sweep_file_blobs
+        # command after a grace period (see storage.sweep_unreferenced_blobs)
+        return result
+
     def get_file_data(self):
         """
         Returns the file data as binary.
         """
+        if self.content_hash:
+            with get_blob_storage().open(self.content_hash) as blob:
+                return blob.read()
+        # file_data is deferred, accessing it loads the column on demand
         return self.file_data  # No decoding needed, just return raw bytes
+
+    def get_stored_size(self):
+        """
+        Returns the length in bytes of the stored file data without loading it.
+        """
+        if self.content_hash:
+            return get_blob_storage().size(self.content_hash)
+        return FileManager.objects.filter(pk=self.pk).annotate(
+            data_length=Length('file_data')
+        ).values_list('data_length', flat=True).first() or 0
+
+    def read_file_chunk(self, offset, length):
+        """
+        Returns `length` bytes of the legacy file data starting at `offset`, sliced in the database
+        (substring() on PostgreSQL) so the whole BinaryField is never loaded.
+        """
+        chunk = FileManager.objects.filter(pk=self.pk).annotate(
+            chunk=Substr('file_data', offset + 1, length, output_field=BinaryField())
+        ).values_list('chunk', flat=True).first()
+        return bytes(chunk) if chunk is not None else b''
+
+    def iter_file_data(self, start, end, chunk_size):
+        """
+        Yields the stored bytes from `start` to `end` (inclusive) in slices of at most `chunk_size`.
+        """
+        if self.content_hash:
+            with get_blob_storage().open(self.content_hash) as blob:
+                blob.seek(start)
+                remaining = end - start + 1
+                while remaining > 0:
+                    chunk = blob.read(min(chunk_size, remaining))
+                    if not chunk:
+                        break
+                    yield chunk
+                    remaining -= len(chunk)
+            return
+
+        offset = start
+        while offset <= end:
+            chunk = self.read_file_chunk(offset, min(chunk_size, end - offset + 1))
+            if not chunk:
+                # moved to the blob storage meanwhile (migrate_file_blobs), the rest is read from there
+                self.content_hash = FileManager.objects.filter(pk=self.pk).values_list(
+                    'content_hash', flat=True).first()
+                if self.content_hash:
+                    yield from self.iter_file_data(offset, end, chunk_size)
+                break
+            yield chunk
+            offset += len(chunk)
+
+
+class FolderStats(models.Model):
+    """
+    Maintained aggregates of a file manager folder, keyed by its normalized path ('/', '/docs/', ...).
+    The root row holds the totals of the whole file manager.
+    """
+    path = models.CharField(max_length=1000, unique=True)
+    folder_id = models.BigIntegerField(blank=True, null=True)  # FileManager row of the folder, None for the root
+    file_count = models.IntegerField(default=0)  # direct files
+    folder_count = models.IntegerField(default=0)  # direct sub folders
+    total_file_count = models.IntegerField(default=0)  # files in the whole sub tree
+    total_folder_count = models.IntegerField(default=0)  # folders in the whole sub tree
+    total_size = models.BigIntegerField(default=0)  # bytes of the files in the whole sub tree
+
+    class Meta:
+        db_table = 'file_manager_folder_stats'
+
+    def __str__(self):
+        return self.path
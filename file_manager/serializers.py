@@ -2,6 +2,7 @@ from rest_framework import serializers
 
 from Sahand import settings
 from .models import FileManager
+from .utils import format_size
 
 class FileTypeSerializer(serializers.Serializer):
     value = serializers.IntegerField()
@@ -36,11 +37,7 @@ class FileAndFolderSerializer(serializers.ModelSerializer):
         ]
 
     def get_sizeValue(self, obj):
-        size_in_bytes = obj.size
-        for unit in ['B', 'KB', 'MB', 'GB', 'TB']:
-            if size_in_bytes < 1024:
-                return f"{size_in_bytes:.2f} {unit}"
-            size_in_bytes /= 1024
+        return format_size(obj.size)
 
     def get_extension(self, obj):
         return obj.name.split('.')[-1].lower() if not obj.is_folder and '.' in obj.name else ''
@@ -89,8 +86,9 @@ class FileManagerSearchSerializer(serializers.Serializer):
 
 class BreadCrumbSerializer(serializers.Serializer):
     """Serializer for breadcrumb navigation."""
-    id = serializers.IntegerField()
+    id = serializers.IntegerField(allow_null=True)
     name = serializers.CharField()
+    url = serializers.CharField()
 
 class ResponseDataSerializer(serializers.Serializer):
     """Main response serializer containing various data."""
@@ -0,0 +1,148 @@
+import hashlib
+import os
+import tempfile
+import time
+from itertools import islice
+
+from django.utils.module_loading import import_string
+
+from Sahand import settings
+
+
+class BlobStorage:
+    """
+    Interface of the backends holding FileManager content. Blobs are addressed by the SHA-256 of their bytes,
+    so identical uploads are stored once.
+    """
+
+    def save(self, chunks):
+        """
+        Stores the bytes yielded by `chunks` and returns their (sha256 hex digest, size).
+        """
+        raise NotImplementedError
+
+    def open(self, content_hash):
+        """
+        Returns a binary file object positioned at the start of the blob.
+        """
+        raise NotImplementedError
+
+    def size(self, content_hash):
+        raise NotImplementedError
+
+    def exists(self, content_hash):
+        raise NotImplementedError
+
+    def delete(self, content_hash, written_before=None):
+        """
+        Removes the blob, with `written_before` (a timestamp) only if it was not saved again since then.
+        """
+        raise NotImplementedError
+
+    def iter_blobs(self):
+        """
+        Yields the (content_hash, timestamp of the last save) of every stored blob.
+        """
+        raise NotImplementedError
+
+
+class LocalBlobStorage(BlobStorage):
+    """
+    Content-addressed store on local disk: <root>/<hash[:2]>/<hash[2:4]>/<hash>.
+    """
+
+    def __init__(self, root):
+        self.root = root
+
+    def path(self, content_hash):
+        return os.path.join(self.root, content_hash[:2], content_hash[2:4], content_hash)
+
+    def save(self, chunks):
+        os.makedirs(self.root, exist_ok=True)
+        digest = hashlib.sha256()
+        size = 0
+        # write to a temporary file next to the store first, the final name is only known at the end
+        fd, temp_path = tempfile.mkstemp(dir=self.root, suffix='.part')
+        try:
+            with os.fdopen(fd, 'wb') as temp_file:
+                for chunk in chunks:
+                    digest.update(chunk)
+                    size += len(chunk)
+                    temp_file.write(chunk)
+
+            content_hash = digest.hexdigest()
+            target = self.path(content_hash)
+            if os.path.exists(target):
+                # identical content is already stored, saved again for sweep_unreferenced_blobs
+                os.remove(temp_path)
+                os.utime(target)
+            else:
+                os.makedirs(os.path.dirname(target), exist_ok=True)
+                os.replace(temp_path, target)
+        except Exception:
+            if os.path.exists(temp_path):
+                os.remove(temp_path)
+            raise
+        return content_hash, size
+
+    def open(self, content_hash):
+        return open(self.path(content_hash), 'rb')
+
+    def size(self, content_hash):
+        return os.path.getsize(self.path(content_hash))
+
+    def exists(self, content_hash):
+        return os.path.exists(self.path(content_hash))
+
+    def delete(self, content_hash, written_before=None):
+        try:
+            if written_before is not None and os.path.getmtime(self.path(content_hash)) >= written_before:
+                return False
+            os.remove(self.path(content_hash))
+        except FileNotFoundError:
+            return False
+        return True
+
+    def iter_blobs(self):
+        for directory, _, names in os.walk(self.root):
+            for name in names:
+                if name.endswith('.part'):
+                    continue
+                try:
+                    yield name, os.path.getmtime(os.path.join(directory, name))
+                except FileNotFoundError:
+                    continue
+
+
+_storage = None
+
+
+def get_blob_storage():
+    global _storage
+    if _storage is None:
+        storage_class = import_string(getattr(settings, 'FILE_MANAGER_STORAGE', 'file_manager.storage.LocalBlobStorage'))
+        _storage = storage_class(settings.FILE_MANAGER_STORAGE_ROOT)
+    return _storage
+
+
+def sweep_unreferenced_blobs(grace_period=None, batch_size=500):
+    """
+    Deletes the blobs no FileManager row refers to any more and returns their number. A blob saved within the
+    last `grace_period` seconds is kept: an identical upload may have found it in place and not saved its row yet.
+    """
+    from file_manager.models import FileManager
+
+    if grace_period is None:
+        grace_period = getattr(settings, 'FILE_MANAGER_BLOB_GRACE_PERIOD', 24 * 60 * 60)
+    blob_storage = get_blob_storage()
+    written_before = time.time() - grace_period
+    candidates = (content_hash for content_hash, saved_at in blob_storage.iter_blobs() if saved_at < written_before)
+    deleted = 0
+    while True:
+        batch = list(islice(candidates, batch_size))
+        if not batch:
+            return deleted
+        referenced = set(FileManager.objects.filter(content_hash__in=batch).values_list('content_hash', flat=True))
+        for content_hash in batch:
+            if content_hash not in referenced and blob_storage.delete(content_hash, written_before):
+                deleted += 1
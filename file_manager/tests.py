@@ -1,3 +1,273 @@
-from django.test import TestCase
+import os
+import shutil
+import tempfile
+import time
+import tracemalloc
+from io import StringIO
+from unittest import mock
 
-# Create your tests here.
+from asgiref.sync import async_to_sync
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.db import connection
+from django.test import TestCase, SimpleTestCase
+from django.test.utils import CaptureQueriesContext
+from rest_framework.test import APIClient
+
+from security.models import User
+
+from file_manager import storage
+from file_manager.folder_index import rebuild_folder_stats
+from file_manager.models import FileManager, FolderStats
+from file_manager.blob_migration import migrate_file_to_storage
+from file_manager.storage import LocalBlobStorage, sweep_unreferenced_blobs
+from file_manager.utils import parse_range_header, file_stream_response, DOWNLOAD_CHUNK_SIZE
+
+
+class FolderListingBenchmarkTest(TestCase):
+    """
+    A folder listing must never pull file_data, whatever the size of the files it lists.
+    """
+    file_count = 1000
+    file_size = 256 * 1024
+    # budgets for listing the whole folder
+    memory_budget = 32 * 1024 * 1024
+    latency_budget = 3.0
+
+    @classmethod
+    def setUpTestData(cls):
+        data = b'0' * cls.file_size
+        FileManager.objects.bulk_create(
+            [FileManager(name=f'video-{i}.mp4', parentUrl='/bench/', file_data=data, size=cls.file_size,
+                         file_extension='.mp4') for i in range(cls.file_count)],
+            batch_size=50
+        )
+
+    def test_listing_stays_within_budget(self):
+        client = APIClient()
+        with CaptureQueriesContext(connection) as queries:
+            tracemalloc.start()
+            started = time.perf_counter()
+            response = client.post('/fileManager/FileManagerGetData/', {'url': '/bench/'}, format='json')
+            elapsed = time.perf_counter() - started
+            _, peak = tracemalloc.get_traced_memory()
+            tracemalloc.stop()
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(response.data['fileAndFolders']), self.file_count)
+        self.assertFalse(any('"file_data"' in query['sql'] for query in queries.captured_queries))
+        self.assertLess(peak, self.memory_budget)
+        self.assertLess(elapsed, self.latency_budget)
+
+    def test_file_data_is_loaded_on_explicit_access(self):
+        file_instance = FileManager.objects.filter(parentUrl='/bench/').first()
+        self.assertIn('file_data', file_instance.get_deferred_fields())
+        self.assertEqual(len(file_instance.get_file_data()), self.file_size)
+        self.assertEqual(
+            len(FileManager.objects.with_file_data().get(pk=file_instance.pk).file_data), self.file_size
+        )
+
+
+class TemporaryStorageMixin:
+    """
+    Points the blob storage to a temporary directory for the test.
+    """
+
+    def setUp(self):
+        super().setUp()
+        root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, root, ignore_errors=True)
+        self.storage = LocalBlobStorage(root)
+        patcher = mock.patch.object(storage, '_storage', self.storage)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+
+class RangeHeaderTest(SimpleTestCase):
+    def test_ranges(self):
+        self.assertIsNone(parse_range_header(None, 100))
+        self.assertIsNone(parse_range_header('bytes=0-1,5-6', 100))
+        self.assertIsNone(parse_range_header('bytes=-', 100))
+        self.assertEqual(parse_range_header('bytes=10-', 100), (10, 99))
+        self.assertEqual(parse_range_header('bytes=10-19', 100), (10, 19))
+        self.assertEqual(parse_range_header('bytes=90-200', 100), (90, 99))
+        self.assertEqual(parse_range_header('bytes=-10', 100), (90, 99))
+        self.assertEqual(parse_range_header('bytes=-500', 100), (0, 99))
+
+    def test_unsatisfiable_ranges(self):
+        self.assertIs(parse_range_header('bytes=100-', 100), False)
+        self.assertIs(parse_range_header('bytes=20-10', 100), False)
+        self.assertIs(parse_range_header('bytes=-0', 100), False)
+        self.assertIs(parse_range_header('bytes=-10', 0), False)
+        self.assertIs(parse_range_header('bytes=0-', 0), False)
+
+
+class FileStreamResponseTest(TemporaryStorageMixin, TestCase):
+    def setUp(self):
+        super().setUp()
+        self.data = bytes(range(256)) * (DOWNLOAD_CHUNK_SIZE // 128)
+        content_hash, size = self.storage.save([self.data])
+        self.file = FileManager.objects.create(name='video.mp4', file_extension='.mp4', content_hash=content_hash,
+                                               size=size)
+
+    def test_range_response(self):
+        size = len(self.data)
+        response = file_stream_response(self.file, 'bytes=-10')
+        self.assertEqual(response.status_code, 206)
+        self.assertEqual(response['Content-Range'], f'bytes {size - 10}-{size - 1}/{size}')
+        self.assertEqual(b''.join(response.streaming_content), self.data[-10:])
+
+        empty = FileManager.objects.create(name='empty.txt', file_extension='.txt',
+                                           content_hash=self.storage.save([])[0])
+        response = file_stream_response(empty, 'bytes=-10')
+        self.assertEqual((response.status_code, response['Content-Range']), (416, 'bytes */0'))
+
+    def test_asynchronous_response_is_read_in_slices(self):
+        response = file_stream_response(self.file, 'bytes=1-', asynchronous=True)
+        self.assertTrue(response.is_async)
+
+        async def read():
+            return [chunk async for chunk in response]
+
+        chunks = async_to_sync(read)()
+        self.assertEqual(b''.join(chunks), self.data[1:])
+        self.assertEqual(max(len(chunk) for chunk in chunks), DOWNLOAD_CHUNK_SIZE)
+
+
+class BlobStorageTest(TemporaryStorageMixin, TestCase):
+    def upload(self, content, name='report.pdf', file_id=None):
+        data = {'file': SimpleUploadedFile(name, content), 'parentUrl': '/docs/'}
+        if file_id:
+            data['id'] = file_id
+        response = APIClient().post('/fileManager/FileManagerAddFileById/', data, format='multipart')
+        self.assertEqual(response.status_code, 200)
+        return FileManager.objects.get(id=response.data['id'])
+
+    def age(self, content_hash, seconds=2 * 24 * 60 * 60):
+        path = self.storage.path(content_hash)
+        saved_at = os.path.getmtime(path) - seconds
+        os.utime(path, (saved_at, saved_at))
+
+    def test_identical_uploads_share_a_blob(self):
+        first = self.upload(b'same content', 'a.pdf')
+        second = self.upload(b'same content', 'b.pdf')
+        self.assertEqual(first.content_hash, second.content_hash)
+        self.assertEqual(len(list(self.storage.iter_blobs())), 1)
+        self.assertEqual((second.size, second.get_file_data()), (12, b'same content'))
+
+        first.delete()
+        self.age(second.content_hash)
+        self.assertEqual(sweep_unreferenced_blobs(), 0)
+        self.assertEqual(second.get_file_data(), b'same content')
+
+    def test_sweep_keeps_recently_saved_blobs(self):
+        file_instance = self.upload(b'draft')
+        file_instance.delete()
+        # an identical upload may have found the blob in place and not saved its row yet
+        self.assertEqual(sweep_unreferenced_blobs(), 0)
+        self.age(file_instance.content_hash)
+        self.assertEqual(sweep_unreferenced_blobs(), 1)
+        self.assertFalse(self.storage.exists(file_instance.content_hash))
+
+        # saving the content again makes the blob recent once more
+        content_hash, _ = self.storage.save([b'draft'])
+        self.age(content_hash)
+        self.storage.save([b'draft'])
+        self.assertEqual(sweep_unreferenced_blobs(), 0)
+
+    def test_replaced_content_is_swept(self):
+        file_instance = self.upload(b'version 1')
+        replaced = self.upload(b'version 2', 'report-v2.pdf', file_id=file_instance.id)
+        self.assertEqual(replaced.id, file_instance.id)
+        self.age(file_instance.content_hash)
+        self.age(replaced.content_hash)
+        call_command('sweep_file_blobs', stdout=StringIO())
+        self.assertFalse(self.storage.exists(file_instance.content_hash))
+        self.assertEqual(replaced.get_file_data(), b'version 2')
+
+    def test_missing_blob(self):
+        file_instance = self.upload(b'gone')
+        os.remove(self.storage.path(file_instance.content_hash))
+        response = APIClient().get(f'/fileManager/FileManagerShowFile/{file_instance.id}/')
+        self.assertEqual(response.status_code, 404)
+
+    def test_legacy_rows_are_migrated(self):
+        data = b'legacy' * 1000
+        file_instance = FileManager.objects.create(name='old.txt', file_extension='.txt', file_data=data,
+                                                   size=len(data))
+        # a download started before the migration goes on from the blob
+        chunks = file_instance.iter_file_data(0, len(data) - 1, 1000)
+        first = next(chunks)
+        call_command('migrate_file_blobs', stdout=StringIO())
+        self.assertEqual(first + b''.join(chunks), data)
+
+        file_instance.refresh_from_db()
+        self.assertIsNone(FileManager.objects.with_file_data().get(pk=file_instance.pk).file_data)
+        self.assertEqual(file_instance.get_file_data(), data)
+        self.assertFalse(migrate_file_to_storage(file_instance.id))
+
+        response = APIClient().get(f'/fileManager/FileManagerShowFile/{file_instance.id}/', HTTP_RANGE='bytes=0-5')
+        self.assertEqual(b''.join(response.streaming_content), b'legacy')
+
+
+class FolderStatsTest(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(User.objects.create_user(username='manager', password='secret'))
+        self.docs = self.add_folder('docs')
+        self.videos = self.add_folder('videos', '/docs/')
+        for name, parent_url, size in (('a.pdf', '/docs/', 100), ('b.mp4', '/docs/videos/', 1000),
+                                       ('c.mp4', '/docs/videos/', 2000), ('d.txt', '/', 10)):
+            FileManager.objects.create(name=name, parentUrl=parent_url, size=size)
+
+    def add_folder(self, name, parent_url='/', folder_id=0):
+        response = self.client.post('/fileManager/FileManagerAddOrUpdateFolder/',
+                                    {'name': name, 'parentUrl': parent_url, 'id': folder_id}, format='json')
+        self.assertEqual(response.status_code, 200)
+        return FileManager.objects.get(id=response.data.get('id', folder_id))
+
+    def stats(self):
+        # {path: counters} of the rows that hold something
+        rows = FolderStats.objects.values_list('path', 'folder_id', 'file_count', 'folder_count', 'total_file_count',
+                                               'total_folder_count', 'total_size')
+        return {row[0]: row[1:] for row in rows if any(row[1:])}
+
+    def assertMatchesRebuild(self):
+        maintained = self.stats()
+        rebuild_folder_stats()
+        self.assertEqual(maintained, self.stats())
+
+    def test_counters_follow_saves_and_deletes(self):
+        self.assertEqual(self.stats()['/'][1:], (1, 1, 4, 2, 3110))
+        self.assertEqual(self.stats()['/docs/'], (self.docs.id, 1, 1, 3, 1, 3100))
+        FileManager.objects.get(name='b.mp4').delete()
+        file_instance = FileManager.objects.get(name='a.pdf')
+        file_instance.size = 150
+        file_instance.save()
+        self.assertEqual(self.stats()['/docs/'], (self.docs.id, 1, 1, 2, 1, 2150))
+        self.assertMatchesRebuild()
+
+    def test_renamed_folder_keeps_its_content(self):
+        self.add_folder('papers', '/', self.docs.id)
+        stats = self.stats()
+        self.assertNotIn('/docs/', stats)
+        self.assertEqual(stats['/papers/'], (self.docs.id, 1, 1, 3, 1, 3100))
+        self.assertEqual(stats['/papers/videos/'], (self.videos.id, 2, 0, 2, 0, 3000))
+        self.assertEqual(stats['/'][1:], (1, 1, 4, 2, 3110))
+        moved = FileManager.objects.filter(name__in=['b.mp4', 'c.mp4']).values_list('parentUrl', flat=True)
+        self.assertEqual(set(moved), {'/papers/videos/'})
+
+        response = self.client.post('/fileManager/FileManagerGetData/', {'url': '/'}, format='json')
+        sizes = {item['name']: item['size'] for item in response.data['fileAndFolders']}
+        self.assertEqual(sizes['papers'], 3100)
+        self.assertMatchesRebuild()
+
+    def test_moved_folder_moves_its_totals(self):
+        archive = self.add_folder('archive')
+        self.videos.parentUrl = '/archive/'
+        self.videos.save()
+        stats = self.stats()
+        self.assertEqual(stats['/docs/'], (self.docs.id, 1, 0, 1, 0, 100))
+        self.assertEqual(stats['/archive/'], (archive.id, 0, 1, 2, 1, 3000))
+        self.assertEqual(stats['/archive/videos/'][0], self.videos.id)
+        self.assertMatchesRebuild()
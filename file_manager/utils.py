@@ -0,0 +1,105 @@
+import mimetypes
+import re
+
+from asgiref.sync import sync_to_async
+from django.core.handlers.asgi import ASGIRequest
+from django.http import StreamingHttpResponse, HttpResponse
+
+# bytes held in memory per download at any time
+DOWNLOAD_CHUNK_SIZE = 512 * 1024
+
+RANGE_PATTERN = re.compile(r'^bytes=(\d*)-(\d*)$')
+
+
+def format_size(size_in_bytes):
+    for unit in ['B', 'KB', 'MB', 'GB', 'TB']:
+        if size_in_bytes < 1024:
+            return f"{size_in_bytes:.2f} {unit}"
+        size_in_bytes /= 1024
+    return f"{size_in_bytes:.2f} PB"
+
+
+def parse_range_header(range_header, size):
+    """
+    Returns the (start, end) byte positions requested by a single-range `Range` header, None when the
+    whole file should be sent and False when the range cannot be satisfied.
+    """
+    if not range_header:
+        return None
+    match = RANGE_PATTERN.match(range_header.strip())
+    if not match:
+        # multiple or malformed ranges, the header may be ignored and the full file sent
+        return None
+
+    first, last = match.groups()
+    if not first and not last:
+        return None
+    if size <= 0:
+        # an empty file has no byte to send
+        return False
+    if not first:
+        # suffix range: the last N bytes
+        suffix = int(last)
+        if suffix == 0:
+            return False
+        return max(size - suffix, 0), size - 1
+
+    start = int(first)
+    end = int(last) if last else size - 1
+    if start >= size or end < start:
+        return False
+    return start, min(end, size - 1)
+
+
+def stream_file(file_instance, start, end):
+    yield from file_instance.iter_file_data(start, end, DOWNLOAD_CHUNK_SIZE)
+
+
+async def astream_file(file_instance, start, end):
+    # under ASGI a sync iterator is collected into a list by StreamingHttpResponse, the slices are read in the
+    # sync thread one at a time instead
+    chunks = stream_file(file_instance, start, end)
+    read_chunk = sync_to_async(next)
+    try:
+        while True:
+            chunk = await read_chunk(chunks, None)
+            if chunk is None:
+                return
+            yield chunk
+    finally:
+        await sync_to_async(chunks.close)()
+
+
+def is_asgi_request(request):
+    return isinstance(getattr(request, '_request', request), ASGIRequest)
+
+
+def file_stream_response(file_instance, range_header=None, asynchronous=False):
+    """
+    Builds a streaming response for a FileManager file with HTTP Range support, reading the content
+    in DOWNLOAD_CHUNK_SIZE slices. `asynchronous` (see is_asgi_request) streams through an async iterator.
+    """
+    # Use the file_extension to guess the MIME type
+    mime_type = mimetypes.types_map.get(file_instance.file_extension,
+                                        'application/octet-stream')  # Fallback to a binary type
+    size = file_instance.get_stored_size()
+    byte_range = parse_range_header(range_header, size)
+
+    if byte_range is False:
+        response = HttpResponse(status=416)
+        response['Content-Range'] = f'bytes */{size}'
+        return response
+
+    start, end = byte_range or (0, size - 1)
+    content = (astream_file if asynchronous else stream_file)(file_instance, start, end)
+    if byte_range is None:
+        response = StreamingHttpResponse(content, content_type=mime_type)
+    else:
+        response = StreamingHttpResponse(content, content_type=mime_type, status=206)
+        response['Content-Range'] = f'bytes {start}-{end}/{size}'
+
+    response['Content-Length'] = str(end - start + 1)
+    response['Accept-Ranges'] = 'bytes'
+    # Set the content-disposition header to prompt download with the original file name
+    response['Content-Disposition'] = f'attachment; filename="{file_instance.name}"'
+    return response
@@ -1,8 +1,6 @@
-from django.http import HttpResponse, Http404
 from django.shortcuts import render
 
 # Create your views here.
-import mimetypes
 # region BaseData
 from drf_spectacular.utils import extend_schema, OpenApiResponse, OpenApiExample
 from rest_framework import status
@@ -11,7 +9,10 @@ from rest_framework.permissions import AllowAny
 from rest_framework.response import Response
 from rest_framework.views import APIView
 
+from Sahand import settings
+from file_manager.folder_index import ancestor_paths, folder_path_of, get_folder_stats
 from file_manager.models import FileManager
+from file_manager.utils import file_stream_response, format_size, is_asgi_request
 from file_manager.serializers import FileManagerSearchSerializer, ResponseDataSerializer, FileAndFolderSerializer, \
     FileManagerBaseDataSerializer, FileManagerSerializer, MessageResponseSerializer
 
@@ -27,10 +28,12 @@ class FileManagerBaseDataView(APIView):
         description="Add or Update DeviceType"
     )
     def post(self, request):
-        total_size = 0  # محاسبه اندازه کلی فضای استفاده‌شده
-        used_size = 0  # محاسبه فضای استفاده‌شده
-        total_file = FileManager.objects.filter(is_folder=False).count()
-        total_folder = FileManager.objects.filter(is_folder=True).count()
+        # the root aggregates hold the totals of the whole file manager
+        root = get_folder_stats(['/']).get('/')
+        total_size = settings.FILE_MANAGER_QUOTA
+        used_size = root.total_size if root else 0
+        total_file = root.total_file_count if root else 0
+        total_folder = root.total_folder_count if root else 0
 
         file_types = [
             {"value": 1, "label": "File", "extension": ".*"},
@@ -39,9 +42,9 @@ class FileManagerBaseDataView(APIView):
 
         base_data = {
             "totalSize": total_size,
-            "totalSizeValue": f"{total_size} MB",
+            "totalSizeValue": format_size(total_size),
             "usedSize": used_size,
-            "usedSizeValue": f"{used_size} MB",
+            "usedSizeValue": format_size(used_size),
             "totalFile": total_file,
             "totalFolder": total_folder,
             "fileTypes": file_types,
@@ -82,6 +85,15 @@ class FileManagerGetDataView(APIView):
         if search:
             files = files.filter(name__icontains=search)
 
+        files = list(files)
+        # folders show the cumulative size of their content
+        folders = [item for item in files if item.is_folder]
+        if folders:
+            folder_stats = get_folder_stats([folder_path_of(folder) for folder in folders])
+            for folder in folders:
+                stats = folder_stats.get(folder_path_of(folder))
+                folder.size = stats.total_size if stats else 0
+
         file_and_folders = FileAndFolderSerializer(files, many=True).data
         breadcrumbs = self.get_breadcrumbs(url)
 
@@ -96,9 +108,16 @@ class FileManagerGetDataView(APIView):
     def get_breadcrumbs(self, path):
         breadcrumbs = []
         if path:
-            parts = path.strip("/").split("/")
-            for i in range(len(parts)):
-                breadcrumbs.append({"name": parts[i], "url": "/".join(parts[: i + 1])})
+            # the folder ids come from the folder index, one query for the whole trail
+            paths = ancestor_paths(path)[1:]
+            folder_stats = get_folder_stats(paths)
+            for folder_path in paths:
+                stats = folder_stats.get(folder_path)
+                breadcrumbs.append({
+                    "id": stats.folder_id if stats else None,
+                    "name": folder_path.strip("/").split("/")[-1],
+                    "url": folder_path.strip("/"),
+                })
         return breadcrumbs
 
     def get_folder_by_path(self, path):
@@ -186,24 +205,17 @@ class FileManagerShowFileView(APIView):
 
     def get(self, request, file_id):
         try:
-            # Retrieve the file object from the database
+            # Retrieve the file metadata only, the content is streamed in slices
             file_instance = FileManager.objects.get(pk=file_id, is_folder=False)
-
-            # Use the file_extension to guess the MIME type
-            mime_type = mimetypes.types_map.get(file_instance.file_extension,
-                                                'application/octet-stream')  # Fallback to a binary type
-
-            # Prepare the response with the file's binary data
-            response = HttpResponse(file_instance.file_data, content_type=mime_type)
-
-            # Set the content-disposition header to prompt download with the original file name
-            response['Content-Disposition'] = f'attachment; filename="{file_instance.name}"'
-
-            return response
-
         except FileManager.DoesNotExist:
             return Response({"message": "فایل یافت نشد"}, status=status.HTTP_400_BAD_REQUEST)
 
+        try:
+            return file_stream_response(file_instance, request.headers.get('Range'), is_asgi_request(request))
+        except FileNotFoundError as e:
+            print(f"Missing blob of file {file_id}: {e}")
+            return Response({"message": "فایل یافت نشد"}, status=status.HTTP_404_NOT_FOUND)
+
 
 class FileManagerAddOrUpdateFolderView(APIView):
     def post(self, request):
@@ -265,7 +277,8 @@ class FileManagerDeleteFileAndFolderView(APIView):
         # Handle folder deletion
         if file_or_folder.is_folder:
             # Check if the folder is empty
-            if file_or_folder.children.exists():
+            folder_stats = get_folder_stats([folder_path_of(file_or_folder)]).get(folder_path_of(file_or_folder))
+            if folder_stats and (folder_stats.file_count or folder_stats.folder_count):
                 return Response({"message": "این پوشه دارای فایل‌ها یا پوشه‌های دیگر است و نمی‌تواند حذف شود."},
                                 status=status.HTTP_400_BAD_REQUEST)
 
@@ -369,7 +382,14 @@ class FileManagerAddFileByIdView(APIView):
             return Response({"message": "A file with the same name already exists!"},
                             status=status.HTTP_400_BAD_REQUEST)
 
-        file_instance = FileManager(id=file_id, name=file.name, parentUrl=parent_url, is_folder=False)
+        # an existing file gets the new content, its previous blob is left to sweep_file_blobs
+        file_instance = FileManager.objects.filter(id=file_id).first() if file_id else None
+        if file_instance is None:
+            file_instance = FileManager(id=file_id, is_folder=False)
+        elif file_instance.is_folder:
+            return Response({"message": "A folder with this id already exists!"}, status=status.HTTP_400_BAD_REQUEST)
+        file_instance.name = file.name
+        file_instance.parentUrl = parent_url
         file_instance.save_file(file)
 
         return Response({"message": "File uploaded successfully!", "id": file_instance.id}, status=status.HTTP_200_OK)
@@ -4,3 +4,9 @@ from django.apps import AppConfig
 class FrontendApiConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'frontend_api'
+
+    def ready(self):
+        from frontend_api.signals import connect_index_cache_signals
+
+        # the cached Site/Index/ fragments are dropped when the models they are built from change
+        connect_index_cache_signals()
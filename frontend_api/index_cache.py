@@ -0,0 +1,131 @@
+from django.core.cache import cache
+from rest_framework.renderers import JSONRenderer
+
+from Sahand import settings
+from base.models import Faq, Slider, AbstractContent, StaticContent
+from base.serializers import SliderSerializer
+from cms.models import Blog, ContentCategory, Gallery, Story, Service, Event, Banner, Post, WorkSample, Brand
+from cms.serializers import GallerySerializer, ServiceSerializer, EventSerializer, BannerSerializer, PostSerializer, \
+    WorkSampleSerializer, BrandSerializer
+from content_manager.models import ContentManager
+from course.models import Course
+from file_manager.models import FileManager
+from frontend_api.models import AboutUs
+from frontend_api.serializers import BlogDetailWithUserSerializer, FaqContentSerializer, StoryFrontSerializer, \
+    CourseWriterSerializer, AboutUsContentSerializer, AbstractContentContentSerializer, StaticContentContentSerializer
+from info.models import WhyUs, Colleague, Statistic, CustomerComment, Team
+from info.serializers import WhyUsSerializer, ColleagueSerializer, StatisticSerializer, CustomerCommentSerializer, \
+    TeamSerializer
+from security.models import User
+
+CACHE_TIMEOUT = getattr(settings, 'FRONTEND_INDEX_CACHE_TIMEOUT', 5 * 60)
+PAYLOAD_KEY = 'frontend_index:payload'
+SECTION_KEY = 'frontend_index:section:{}'
+
+# user fields shown next to blogs and courses, other user updates (e.g. last_login) keep the cache
+USER_FIELDS = {'full_name', 'about', 'photo', 'photo_id'}
+
+
+def latest(model, limit=10, serializer=None):
+    queryset = model.objects.filter(is_deleted=False, status=1).order_by('-create_row_date')
+    if hasattr(serializer, 'setup_eager_loading'):
+        queryset = serializer.setup_eager_loading(queryset)
+    return queryset[:limit] if limit else queryset
+
+
+class IndexSection:
+    """
+    One fragment of the Site/Index/ payload: how to build it and which models it is built from.
+    `dependencies` maps a model to the fields the fragment reads from it, None meaning any change.
+    """
+
+    def __init__(self, name, build, dependencies):
+        self.name = name
+        self.build = build
+        self.dependencies = dependencies
+
+    @property
+    def cache_key(self):
+        return SECTION_KEY.format(self.name)
+
+
+# in the order of the response
+INDEX_SECTIONS = [
+    IndexSection('blogs', lambda: BlogDetailWithUserSerializer(latest(Blog, serializer=BlogDetailWithUserSerializer), many=True).data,
+                 {Blog: None, ContentCategory: None, User: USER_FIELDS}),
+    IndexSection('faqs', lambda: FaqContentSerializer(latest(Faq, None, serializer=FaqContentSerializer), many=True).data,
+                 {Faq: None, ContentManager: None}),
+    IndexSection('galleries', lambda: GallerySerializer(latest(Gallery), many=True).data, {Gallery: None}),
+    IndexSection('stories', lambda: StoryFrontSerializer(latest(Story), many=True).data,
+                 {Story: None, FileManager: None}),
+    IndexSection('services', lambda: ServiceSerializer(latest(Service), many=True).data, {Service: None}),
+    IndexSection('sliders', lambda: SliderSerializer(latest(Slider, None), many=True).data, {Slider: None}),
+    IndexSection('whyus', lambda: WhyUsSerializer(latest(WhyUs, None), many=True).data, {WhyUs: None}),
+    IndexSection('colleagues', lambda: ColleagueSerializer(latest(Colleague), many=True).data, {Colleague: None}),
+    IndexSection('events', lambda: EventSerializer(latest(Event), many=True).data, {Event: None}),
+    IndexSection('courses', lambda: CourseWriterSerializer(latest(Course, serializer=CourseWriterSerializer), many=True).data,
+                 {Course: None, User: USER_FIELDS}),
+    IndexSection('banners', lambda: BannerSerializer(latest(Banner), many=True).data, {Banner: None}),
+    IndexSection('statistics', lambda: StatisticSerializer(latest(Statistic), many=True).data, {Statistic: None}),
+    IndexSection('posts', lambda: PostSerializer(latest(Post), many=True).data, {Post: None}),
+    IndexSection('customer_comments', lambda: CustomerCommentSerializer(latest(CustomerComment), many=True).data,
+                 {CustomerComment: None}),
+    IndexSection('work_samples', lambda: WorkSampleSerializer(latest(WorkSample), many=True).data,
+                 {WorkSample: None}),
+    IndexSection('about_us', lambda: AboutUsContentSerializer(AboutUs.objects.first()).data,
+                 {AboutUs: None, ContentManager: None}),
+    IndexSection('brands', lambda: BrandSerializer(latest(Brand), many=True).data, {Brand: None}),
+    IndexSection('abstract_contents',
+                 lambda: AbstractContentContentSerializer(latest(AbstractContent, serializer=AbstractContentContentSerializer), many=True).data,
+                 {AbstractContent: None, ContentManager: None}),
+    IndexSection('static_contents', lambda: StaticContentContentSerializer(latest(StaticContent, serializer=StaticContentContentSerializer), many=True).data,
+                 {StaticContent: None, ContentManager: None}),
+    IndexSection('teams', lambda: TeamSerializer(latest(Team), many=True).data, {Team: None}),
+]
+
+
+def get_index_payload():
+    """
+    Returns the Site/Index/ response as rendered JSON bytes. A warm hit is a single cache read, otherwise the
+    missing fragments are rebuilt and the payload is assembled and stored again.
+    """
+    payload = cache.get(PAYLOAD_KEY)
+    if payload is not None:
+        return payload
+
+    fragments = cache.get_many([section.cache_key for section in INDEX_SECTIONS])
+    missing = {}
+    response_data = {}
+    for section in INDEX_SECTIONS:
+        if section.cache_key not in fragments:
+            missing[section.cache_key] = section.build()
+        response_data[section.name] = fragments.get(section.cache_key, missing.get(section.cache_key))
+    if missing:
+        cache.set_many(missing, CACHE_TIMEOUT)
+
+    payload = JSONRenderer().render(response_data)
+    cache.set(PAYLOAD_KEY, payload, CACHE_TIMEOUT)
+    return payload
+
+
+def invalidate_index_sections(model, update_fields=None):
+    """
+    Drops the fragments built from `model` and the assembled payload.
+    """
+    keys = []
+    for section in INDEX_SECTIONS:
+        if model not in section.dependencies:
+            continue
+        fields = section.dependencies[model]
+        if fields is not None and update_fields is not None and not fields & set(update_fields):
+            continue
+        keys.append(section.cache_key)
+    if keys:
+        cache.delete_many(keys + [PAYLOAD_KEY])
+
+
+def index_models():
+    models = set()
+    for section in INDEX_SECTIONS:
+        models.update(section.dependencies)
+    return models
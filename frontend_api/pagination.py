@@ -0,0 +1,117 @@
+import base64
+import hashlib
+import json
+
+from django.core.cache import cache
+from django.core.exceptions import EmptyResultSet
+from django.db.models import Q
+from django.utils.dateparse import parse_datetime
+
+from Sahand import settings
+
+# orders available in cursor mode, always descending with the id as tiebreak
+KEYSET_ORDERS = {
+    'new': 'create_row_date',
+    'view': 'count_view',
+    'popular': 'count_like',
+}
+DATETIME_FIELDS = {'create_row_date'}
+
+COUNT_CACHE_TIMEOUT = getattr(settings, 'FRONTEND_LIST_COUNT_CACHE_TIMEOUT', 60)
+COUNT_KEY = 'frontend_list_count:{}'
+
+
+class InvalidCursor(Exception):
+    pass
+
+
+def is_cursor_request(request_data):
+    # cursor mode is opt-in, the first page is requested with "cursor": null
+    return 'cursor' in request_data
+
+
+def encode_cursor(order, value, pk):
+    if KEYSET_ORDERS[order] in DATETIME_FIELDS:
+        value = value.isoformat()
+    payload = json.dumps({'o': order, 'v': value, 'id': pk}, separators=(',', ':'))
+    return base64.urlsafe_b64encode(payload.encode()).decode().rstrip('=')
+
+
+def decode_cursor(token, order):
+    try:
+        payload = json.loads(base64.urlsafe_b64decode(token + '=' * (-len(token) % 4)))
+        value, pk = payload['v'], int(payload['id'])
+        if payload['o'] != order:
+            raise InvalidCursor('cursor متعلق به ترتیب دیگری است.')
+    except (ValueError, TypeError, KeyError):
+        raise InvalidCursor('cursor نامعتبر است.')
+
+    if KEYSET_ORDERS[order] in DATETIME_FIELDS:
+        value = parse_datetime(value) if isinstance(value, str) else None
+    elif not isinstance(value, int):
+        value = None
+    if value is None:
+        raise InvalidCursor('cursor نامعتبر است.')
+    return value, pk
+
+
+def cached_count(queryset):
+    """
+    Count of the filtered queryset, shared between requests for a short while so paging through a listing
+    does not repeat the full filtered scan on every page.
+    """
+    queryset = queryset.order_by()
+    try:
+        sql = str(queryset.query)
+    except EmptyResultSet:
+        # e.g. id__in=[] of a search without results, nothing to count
+        return 0
+    key = COUNT_KEY.format(hashlib.md5(f'{queryset.model._meta.db_table}:{sql}'.encode()).hexdigest())
+    count = cache.get(key)
+    if count is None:
+        count = queryset.count()
+        cache.set(key, count, COUNT_CACHE_TIMEOUT)
+    return count
+
+
+def page_number_data(queryset, page, page_count, first_page=0):
+    total_count = cached_count(queryset)
+    total_page = (total_count // page_count) + (1 if total_count % page_count > 0 else 0)
+    return {
+        "totalPage": total_page,
+        "totalCount": total_count,
+        "currentPage": page,
+        "hasNextPage": page - first_page + 1 < total_page,
+    }
+
+
+def cursor_paginate(queryset, order, request_data, page_count):
+    """
+    Returns (items, pagination data) of the page after request_data['cursor'], seeking on (order field, id)
+    instead of skipping rows with OFFSET. The total is only counted when the client asks for it (withCount).
+    """
+    if order not in KEYSET_ORDERS:
+        raise InvalidCursor('این ترتیب در حالت cursor پشتیبانی نمی شود.')
+    if not isinstance(page_count, int) or page_count <= 0:
+        raise InvalidCursor('pageCount نامعتبر است.')
+
+    field = KEYSET_ORDERS[order]
+    page_queryset = queryset.order_by(f'-{field}', '-id')
+    token = request_data.get('cursor')
+    if token:
+        value, pk = decode_cursor(str(token), order)
+        page_queryset = page_queryset.filter(Q(**{f'{field}__lt': value}) | Q(**{field: value, 'id__lt': pk}))
+
+    items = list(page_queryset[:page_count + 1])
+    has_next_page = len(items) > page_count
+    items = items[:page_count]
+
+    data = {
+        "nextCursor": encode_cursor(order, getattr(items[-1], field), items[-1].id) if has_next_page else None,
+        "hasNextPage": has_next_page,
+    }
+    if request_data.get('withCount'):
+        total_count = cached_count(queryset)
+        data["totalCount"] = total_count
+        data["totalPage"] = (total_count // page_count) + (1 if total_count % page_count > 0 else 0)
+    return items, data
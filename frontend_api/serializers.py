@@ -29,6 +29,9 @@ class PostSearchRequestSerializer(serializers.Serializer):
     page = serializers.IntegerField(default=0)
     pageCount = serializers.IntegerField(default=10)
     order = serializers.CharField(default='id')
+    # cursor mode: send cursor (null for the first page) with order new, view or popular
+    cursor = serializers.CharField(required=False, allow_null=True, allow_blank=True)
+    withCount = serializers.BooleanField(default=False)
 
 
 class PostListPaginationResponseSerializer(serializers.Serializer):
@@ -37,6 +40,7 @@ class PostListPaginationResponseSerializer(serializers.Serializer):
     totalCount = serializers.IntegerField()
     currentPage = serializers.IntegerField()
     hasNextPage = serializers.BooleanField()
+    nextCursor = serializers.CharField(required=False, allow_null=True)
 
 
 class WorkSampleSearchRequestSerializer(serializers.Serializer):
@@ -45,6 +49,9 @@ class WorkSampleSearchRequestSerializer(serializers.Serializer):
     page = serializers.IntegerField(default=0)
     pageCount = serializers.IntegerField(default=10)
     order = serializers.CharField(default='id')
+    # cursor mode: send cursor (null for the first page) with order new, view or popular
+    cursor = serializers.CharField(required=False, allow_null=True, allow_blank=True)
+    withCount = serializers.BooleanField(default=False)
 
 
 class WorkSampleListPaginationResponseSerializer(serializers.Serializer):
@@ -53,6 +60,7 @@ class WorkSampleListPaginationResponseSerializer(serializers.Serializer):
     totalCount = serializers.IntegerField()
     currentPage = serializers.IntegerField()
     hasNextPage = serializers.BooleanField()
+    nextCursor = serializers.CharField(required=False, allow_null=True)
 
 
 class BlogSearchRequestSerializer(serializers.Serializer):
@@ -61,6 +69,9 @@ class BlogSearchRequestSerializer(serializers.Serializer):
     page = serializers.IntegerField(default=0)
     pageCount = serializers.IntegerField(default=0)
     order = serializers.CharField(default='id')
+    # cursor mode: send cursor (null for the first page) with order new, view or popular
+    cursor = serializers.CharField(required=False, allow_null=True, allow_blank=True)
+    withCount = serializers.BooleanField(default=False)
 
 
 class BlogPaginationDataSerializer(serializers.Serializer):
@@ -69,6 +80,7 @@ class BlogPaginationDataSerializer(serializers.Serializer):
     totalCount = serializers.IntegerField()
     currentPage = serializers.IntegerField()
     hasNextPage = serializers.BooleanField()
+    nextCursor = serializers.CharField(required=False, allow_null=True)
 
 
 class BlogListSerializer(serializers.Serializer):
@@ -105,6 +117,7 @@ class BlogListPaginationResponseSerializer(serializers.Serializer):
     totalCount = serializers.IntegerField()
     currentPage = serializers.IntegerField()
     hasNextPage = serializers.BooleanField()
+    nextCursor = serializers.CharField(required=False, allow_null=True)
 
 
 class CourseListPaginationResponseSerializer(serializers.Serializer):
@@ -113,6 +126,7 @@ class CourseListPaginationResponseSerializer(serializers.Serializer):
     totalCount = serializers.IntegerField()
     currentPage = serializers.IntegerField()
     hasNextPage = serializers.BooleanField()
+    nextCursor = serializers.CharField(required=False, allow_null=True)
 
 
 class CourseSearchRequestSerializer(serializers.Serializer):
@@ -121,6 +135,9 @@ class CourseSearchRequestSerializer(serializers.Serializer):
     page = serializers.IntegerField(default=0)
     pageCount = serializers.IntegerField(default=0)
     order = serializers.CharField(default='id')
+    # cursor mode: send cursor (null for the first page) with order new, view or popular
+    cursor = serializers.CharField(required=False, allow_null=True, allow_blank=True)
+    withCount = serializers.BooleanField(default=False)
     is_free = serializers.BooleanField(default=False)
 
 class CommentUserSerializer(serializers.ModelSerializer):
@@ -130,10 +147,14 @@ class CommentUserSerializer(serializers.ModelSerializer):
         model = Comment
         fields = "__all__"
 
+    @staticmethod
+    def setup_eager_loading(queryset):
+        return queryset.select_related('user')
+
     def get_user(self, obj):
         return {
             "full_name": obj.user.full_name,
-            "photo": obj.user.photo.id if obj.user.photo else None,
+            "photo": obj.user.photo_id,
             "about": obj.user.about
         } if obj.user else None
 
@@ -149,6 +170,10 @@ class CourseDetailSerializer(serializers.ModelSerializer):
         model = Course
         fields = '__all__'
 
+    @staticmethod
+    def setup_eager_loading(queryset):
+        return queryset.select_related('writer', 'content')
+
     def get_paid_percentage(self, obj):
         """
         Calculates the paid_percentage for the course_user.
@@ -172,7 +197,7 @@ class CourseDetailSerializer(serializers.ModelSerializer):
         """
         request = self.context.get('request')
         user = request.user if request else None
-        episodes = obj.episode_course.all().order_by('order')  # Get all episodes for the course
+        episodes = list(obj.episode_course.all().order_by('order'))  # Get all episodes for the course
 
         if user and user.is_authenticated:
             try:
@@ -181,7 +206,7 @@ class CourseDetailSerializer(serializers.ModelSerializer):
                 # Calculate unlocked episodes
                 if course_user.course_installment_count and course_user.paid_installments:
                     paid_fraction = course_user.paid_installments / course_user.course_installment_count
-                    total_episodes = episodes.count()
+                    total_episodes = len(episodes)
                     unlocked_episodes_count = int(paid_fraction * total_episodes)
                 else:
                     # No installments paid, no episodes unlocked
@@ -222,11 +247,11 @@ class CourseDetailSerializer(serializers.ModelSerializer):
                 "update_row_date": episode.update_row_date,
                 "is_deleted": episode.is_deleted,
                 "status": episode.status,
-                "photo": episode.photo.id if episode.photo else None,
-                "file": episode.file.id if episode.file else None,
-                "content": episode.content.id if episode.content else None,
-                "course": episode.course.id,
-                "parent": episode.parent.id if episode.parent else None,
+                "photo": episode.photo_id,
+                "file": episode.file_id,
+                "content": episode.content_id,
+                "course": episode.course_id,
+                "parent": episode.parent_id,
             })
 
         return serialized_episodes
@@ -237,12 +262,12 @@ class CourseDetailSerializer(serializers.ModelSerializer):
     def get_writer(self, obj):
         return {
             "full_name": obj.writer.full_name,
-            "photo": obj.writer.photo.id if obj.writer.photo else None,
+            "photo": obj.writer.photo_id,
             "about": obj.writer.about
         } if obj.writer else None
 
     def get_comment_responses(self, obj):
-        comments = Comment.objects.filter(related_id=obj.id, object_type=1, status=1)
+        comments = Comment.objects.filter(related_id=obj.id, object_type=1, status=1).select_related('user')
         return CommentUserSerializer(comments, many=True).data  # Serialize the queryset
 
     def get_has_course(self, obj):
@@ -271,6 +296,10 @@ class EpisodeDetailSerializer(serializers.ModelSerializer):
     class Meta:
         model = Episode
         fields = '__all__'
+
+    @staticmethod
+    def setup_eager_loading(queryset):
+        return queryset.select_related('content', 'course', 'course__writer')
     def get_content(self, obj):
         return obj.content.content if obj.content else None
 
@@ -303,19 +332,24 @@ class EpisodeDetailSerializer(serializers.ModelSerializer):
     def get_writer(self, obj):
         return {
             "full_name": obj.course.writer.full_name,
-            "photo": obj.course.writer.photo.id if obj.course.writer.photo else None,
+            "photo": obj.course.writer.photo_id,
             "about": obj.course.writer.about
         } if obj.course.writer else None
 
     def get_qa(self, obj):
-        # Retrieve QA data where parent is null for the current episode
-        qas = EpisodeQA.objects.filter(episode=obj, parent__isnull=True, is_deleted=False)
-        return [self._get_qa_data(qa) for qa in qas]
-
-    def _get_qa_data(self, qa):
+        # Load every QA of the episode once and build the tree in memory
+        qas = EpisodeQA.objects.filter(episode=obj, is_deleted=False).select_related(
+            'content', 'user', 'author', 'course'
+        ).order_by('id')
+        children_by_parent = {}
+        for qa in qas:
+            children_by_parent.setdefault(qa.parent_id, []).append(qa)
+        return [self._get_qa_data(qa, children_by_parent) for qa in children_by_parent.get(None, [])]
+
+    def _get_qa_data(self, qa, children_by_parent):
         # Recursively get data for each QA and its children
-        children = EpisodeQA.objects.filter(parent=qa, is_deleted=False)
-        children_data = [self._get_qa_data(child) for child in children] if children else []
+        children = children_by_parent.get(qa.id, [])
+        children_data = [self._get_qa_data(child, children_by_parent) for child in children]
 
         return {
             "id": qa.id,
@@ -324,13 +358,13 @@ class EpisodeDetailSerializer(serializers.ModelSerializer):
                 "id": qa.user.id if qa.user else None,
                 "sex": qa.user.sex if qa.user else None,
                 "full_name": qa.user.full_name if qa.user else None,
-                "photo": qa.user.photo.id if qa.user and qa.user.photo else None
+                "photo": qa.user.photo_id if qa.user else None
             } if qa.user else None,
             "author": {
                 "id": qa.author.id if qa.author else None,
                 "sex": qa.author.sex if qa.author else None,
                 "full_name": qa.author.full_name if qa.author else None,
-                "photo": qa.author.photo.id if qa.author and qa.author.photo else None
+                "photo": qa.author.photo_id if qa.author else None
             } if qa.author else None,
             "course": {
                 "id": qa.course.id if qa.course else None,
@@ -338,12 +372,12 @@ class EpisodeDetailSerializer(serializers.ModelSerializer):
                 "english_title": qa.course.english_title if qa.course else None
             } if qa.course else None,
             "episode": {
-                "id": qa.episode.id if qa.episode else None
-            } if qa.episode else None,
+                "id": qa.episode_id
+            } if qa.episode_id else None,
             "file": {
-                "id": qa.file.id if qa.file else None
-            } if qa.file else None,
-            "parent": qa.parent.id if qa.parent else None,
+                "id": qa.file_id
+            } if qa.file_id else None,
+            "parent": qa.parent_id,
             "children": children_data  # Nested children data
         }
 
@@ -538,10 +572,14 @@ class BlogDetailWithUserSerializer(serializers.ModelSerializer):
         model = Blog
         fields = '__all__'
 
+    @staticmethod
+    def setup_eager_loading(queryset):
+        return queryset.select_related('content_category', 'user')
+
     def get_user(self, obj):
         return {
             "full_name": obj.user.full_name,
-            "photo": obj.user.photo.id if obj.user.photo else None,
+            "photo": obj.user.photo_id,
             "about": obj.user.about
         } if obj.user else None
 
@@ -559,15 +597,19 @@ class BlogDetailSerializer(serializers.ModelSerializer):
         model = Blog
         fields = '__all__'
 
+    @staticmethod
+    def setup_eager_loading(queryset):
+        return queryset.select_related('content_category', 'user', 'content')
+
     def get_user(self, obj):
         return {
             "full_name": obj.user.full_name,
-            "photo": obj.user.photo.id if obj.user.photo else None,
+            "photo": obj.user.photo_id,
             "about": obj.user.about
         } if obj.user else None
 
     def get_comment_responses(self, obj):
-        comments = Comment.objects.filter(related_id=obj.id, object_type=2, status=1)
+        comments = Comment.objects.filter(related_id=obj.id, object_type=2, status=1).select_related('user')
         return CommentUserSerializer(comments, many=True).data  # Serialize the queryset
 
     def get_content(self, obj):
@@ -577,10 +619,10 @@ class BlogDetailSerializer(serializers.ModelSerializer):
 
     def get_related_blogs(self, obj):
         # Fetch the latest 10 blogs with the same category, excluding the current blog
-        related_blogs = Blog.objects.filter(
+        related_blogs = BlogContentSerializer.setup_eager_loading(Blog.objects.filter(
             content_category=obj.content_category,
             is_deleted=False
-        ).exclude(id=obj.id).order_by('-create_row_date')[:10]
+        )).exclude(id=obj.id).order_by('-create_row_date')[:10]
 
         # Use BlogDetailSerializer to serialize related blogs or define a simpler serializer
         return BlogContentSerializer(related_blogs, many=True).data
@@ -593,6 +635,10 @@ class FaqContentSerializer(serializers.ModelSerializer):
         model = Faq
         fields = '__all__'
 
+    @staticmethod
+    def setup_eager_loading(queryset):
+        return queryset.select_related('content')
+
     def get_content(self, obj):
         if obj.content:
             return obj.content.content
@@ -605,6 +651,10 @@ class AbstractContentContentSerializer(serializers.ModelSerializer):
         model = AbstractContent
         fields = '__all__'
 
+    @staticmethod
+    def setup_eager_loading(queryset):
+        return queryset.select_related('content')
+
     def get_content(self, obj):
         if obj.content:
             return obj.content.content
@@ -617,6 +667,10 @@ class StaticContentContentSerializer(serializers.ModelSerializer):
         model = StaticContent
         fields = '__all__'
 
+    @staticmethod
+    def setup_eager_loading(queryset):
+        return queryset.select_related('content')
+
     def get_content(self, obj):
         if obj.content:
             return obj.content.content
@@ -630,8 +684,12 @@ class ServiceContentSerializer(serializers.ModelSerializer):
         model = Service
         fields = '__all__'
 
+    @staticmethod
+    def setup_eager_loading(queryset):
+        return queryset.select_related('content')
+
     def get_comment_responses(self, obj):
-        comments = Comment.objects.filter(related_id=obj.id, object_type=6)
+        comments = Comment.objects.filter(related_id=obj.id, object_type=6).select_related('user')
         return CommentUserSerializer(comments, many=True).data
 
     def get_content(self, obj):
@@ -662,6 +720,9 @@ class PostContentSerializer(serializers.ModelSerializer):
         model = Post
         fields = '__all__'
 
+    @staticmethod
+    def setup_eager_loading(queryset):
+        return queryset.select_related('content')
 
     def get_content(self, obj):
         if obj.content:
@@ -677,8 +738,12 @@ class WorkSampleContentSerializer(serializers.ModelSerializer):
         model = WorkSample
         fields = '__all__'
 
+    @staticmethod
+    def setup_eager_loading(queryset):
+        return queryset.select_related('content')
+
     def get_comment_responses(self, obj):
-        comments = Comment.objects.filter(related_id=obj.id, object_type=3)
+        comments = Comment.objects.filter(related_id=obj.id, object_type=3).select_related('user')
         return CommentUserSerializer(comments, many=True).data
 
     def get_content(self, obj):
@@ -696,6 +761,10 @@ class BlogContentSerializer(serializers.ModelSerializer):
         model = Blog
         fields = '__all__'
 
+    @staticmethod
+    def setup_eager_loading(queryset):
+        return queryset.select_related('content', 'content_category', 'user')
+
     def get_content(self, obj):
         if obj.content:
             return obj.content.content
@@ -704,7 +773,7 @@ class BlogContentSerializer(serializers.ModelSerializer):
     def get_user(self, obj):
         return {
             "full_name": obj.user.full_name,
-            "photo": obj.user.photo.id if obj.user.photo else None,
+            "photo": obj.user.photo_id,
             "about": obj.user.about
         } if obj.user else None
 
@@ -716,6 +785,10 @@ class BasePageContentSerializer(serializers.ModelSerializer):
         model = BasePage
         fields = '__all__'
 
+    @staticmethod
+    def setup_eager_loading(queryset):
+        return queryset.select_related('content')
+
     def get_content(self, obj):
         if obj.content:
             return obj.content.content
@@ -733,6 +806,10 @@ class TaskRequestContentSerializer(serializers.ModelSerializer):
         model = TaskRequest
         fields = '__all__'
 
+    @staticmethod
+    def setup_eager_loading(queryset):
+        return queryset.select_related('task_project')
+
     def get_project_members(self, obj):
         if obj.task_project.project_members:
             return obj.task_project.project_members
@@ -744,26 +821,16 @@ class TaskRequestContentSerializer(serializers.ModelSerializer):
         return None
 
     def get_members_detail(self, obj):
-        members = []
-        for member in obj.project_members:
-            try:
-                user = User.objects.get(id=member)
-                members.append(
-                    {'id': user.id, 'full_name': user.full_name, 'photo': user.photo.id if user.photo else None})
-            except User.DoesNotExist:
-                pass
-        return members
+        return self._users_detail(obj.project_members)
 
     def get_managers_detail(self, obj):
-        managers = []
-        for manager in obj.project_managers:
-            try:
-                user = User.objects.get(id=manager)
-                managers.append(
-                    {'id': user.id, 'full_name': user.full_name, 'photo': user.photo.id if user.photo else None})
-            except User.DoesNotExist:
-                pass
-        return managers
+        return self._users_detail(obj.project_managers)
+
+    def _users_detail(self, user_ids):
+        # one query for all the users, in the order of the given ids
+        users = {user.id: user for user in User.objects.filter(id__in=user_ids or [])}
+        return [{'id': user.id, 'full_name': user.full_name, 'photo': user.photo_id}
+                for user in (users.get(user_id) for user_id in user_ids or []) if user]
 
 
 # why us
@@ -774,6 +841,10 @@ class WhyUsContentSerializer(serializers.ModelSerializer):
         model = WhyUs
         fields = '__all__'
 
+    @staticmethod
+    def setup_eager_loading(queryset):
+        return queryset.select_related('content')
+
     def get_content(self, obj):
         if obj.content:
             return obj.content.content
@@ -781,18 +852,36 @@ class WhyUsContentSerializer(serializers.ModelSerializer):
 
 
 # story
+class StoryFrontListSerializer(serializers.ListSerializer):
+    def to_representation(self, data):
+        # Resolve the files of every story with a single query
+        stories = list(data.all() if isinstance(data, models.Manager) else data)
+        file_ids = set()
+        for story in stories:
+            file_ids.update(story.files if isinstance(story.files, list) else [])
+        self.child.files_by_id = {
+            file['id']: file for file in FileManager.objects.filter(id__in=file_ids).values('id', 'file_extension')
+        }
+        return super().to_representation(stories)
+
+
 class StoryFrontSerializer(serializers.ModelSerializer):
     files = serializers.SerializerMethodField()
 
     class Meta:
         model = Story
         fields = "__all__"
+        list_serializer_class = StoryFrontListSerializer
 
     def get_files(self, obj):
         # Retrieve file details from FileManager based on file IDs in the JSONField
         file_ids = obj.files if isinstance(obj.files, list) else []
-        files = FileManager.objects.filter(id__in=file_ids)
-        return [{'id': file.id, 'file_extension': file.file_extension} for file in files]
+        files_by_id = getattr(self, 'files_by_id', None)
+        if files_by_id is None:
+            files_by_id = {
+                file['id']: file for file in FileManager.objects.filter(id__in=file_ids).values('id', 'file_extension')
+            }
+        return [files_by_id[file_id] for file_id in file_ids if file_id in files_by_id]
 
 
 class StorySearchRequestSerializer(serializers.Serializer):
@@ -801,6 +890,9 @@ class StorySearchRequestSerializer(serializers.Serializer):
     page = serializers.IntegerField(default=0)
     pageCount = serializers.IntegerField(default=10)
     order = serializers.CharField(default='id')
+    # cursor mode: send cursor (null for the first page) with order new, view or popular
+    cursor = serializers.CharField(required=False, allow_null=True, allow_blank=True)
+    withCount = serializers.BooleanField(default=False)
 
 
 class StoryListPaginationResponseSerializer(serializers.Serializer):
@@ -809,6 +901,7 @@ class StoryListPaginationResponseSerializer(serializers.Serializer):
     totalCount = serializers.IntegerField()
     currentPage = serializers.IntegerField()
     hasNextPage = serializers.BooleanField()
+    nextCursor = serializers.CharField(required=False, allow_null=True)
 
 
 class CourseWriterSerializer(serializers.ModelSerializer):
@@ -818,9 +911,13 @@ class CourseWriterSerializer(serializers.ModelSerializer):
         model = Course
         fields = "__all__"
 
+    @staticmethod
+    def setup_eager_loading(queryset):
+        return queryset.select_related('writer')
+
     def get_writer(self, obj):
         return {
             "full_name": obj.writer.full_name,
-            "photo": obj.writer.photo.id if obj.writer.photo else None,
+            "photo": obj.writer.photo_id,
             "about": obj.writer.about
         } if obj.writer else None
\ No newline at end of file
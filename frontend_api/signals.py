@@ -0,0 +1,19 @@
+from django.db import transaction
+from django.db.models.signals import post_save, post_delete
+
+from frontend_api.index_cache import index_models, invalidate_index_sections
+
+
+def index_model_saved(sender, instance, update_fields=None, **kwargs):
+    # after the commit, a concurrent rebuild could cache the old rows again otherwise
+    transaction.on_commit(lambda: invalidate_index_sections(sender, update_fields))
+
+
+def index_model_deleted(sender, instance, **kwargs):
+    transaction.on_commit(lambda: invalidate_index_sections(sender))
+
+
+def connect_index_cache_signals():
+    for model in index_models():
+        post_save.connect(index_model_saved, sender=model, dispatch_uid=f'index_cache_save_{model._meta.label}')
+        post_delete.connect(index_model_deleted, sender=model, dispatch_uid=f'index_cache_delete_{model._meta.label}')
@@ -1,3 +1,153 @@
+import json
+
+from django.core.cache import cache
+from django.db import connection
 from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from rest_framework.test import APIClient
+
+from cms.models import Blog, ContentCategory, Post, WorkSample, Story
+from content_manager.models import ContentManager
+from course.models import Course
+from file_manager.models import FileManager
+from frontend_api.index_cache import get_index_payload
+from info.models import WhyUs
+from security.models import User
+
+
+class ListEndpointQueryCountTest(TestCase):
+    """
+    The list endpoints must run the same number of queries whatever the page size, every relation the
+    serializers read is loaded by the view's eager-loading plan.
+    """
+    item_count = 30
+    small_page = 2
+    large_page = 25
+
+    @classmethod
+    def setUpTestData(cls):
+        users = [User.objects.create(username=f'writer-{i}', full_name=f'writer {i}') for i in range(3)]
+        categories = [ContentCategory.objects.create(title=f'category {i}', status=1) for i in range(3)]
+        files = FileManager.objects.bulk_create(
+            [FileManager(name=f'photo-{i}.jpg', parentUrl='/stories/', file_extension='.jpg') for i in range(3)]
+        )
+        for i in range(cls.item_count):
+            content = ContentManager.objects.create(content=f'content {i}')
+            Blog.objects.create(title=f'blog {i}', english_title=f'blog-{i}', time=5, status=1,
+                                content=content, content_category=categories[i % 3], user=users[i % 3])
+            Post.objects.create(title=f'post {i}', english_title=f'post-{i}', is_published=True, content=content,
+                                user=users[i % 3])
+            WorkSample.objects.create(title=f'work sample {i}', english_title=f'work-sample-{i}', content=content)
+            Story.objects.create(title=f'story {i}', is_published=True, files=[file.id for file in files])
+            Course.objects.create(title=f'course {i}', english_title=f'course-{i}', progress=50, price=100,
+                                  content=content, writer=users[i % 3])
+
+    def count_queries(self, url, data):
+        # the list totals are cached, every request starts cold
+        cache.clear()
+        client = APIClient()
+        with CaptureQueriesContext(connection) as queries:
+            response = client.post(url, data, format='json')
+        self.assertEqual(response.status_code, 200)
+        return len(queries.captured_queries)
+
+    def assertConstantQueries(self, url, page):
+        small = self.count_queries(url, {'page': page, 'pageCount': self.small_page})
+        large = self.count_queries(url, {'page': page, 'pageCount': self.large_page})
+        self.assertEqual(small, large, f'{url} runs {small} queries for {self.small_page} items '
+                                       f'and {large} for {self.large_page}')
+
+    def test_blog_search(self):
+        self.assertConstantQueries('/Content/BlogList/', 0)
+
+    def test_blog_list_pagination(self):
+        self.assertConstantQueries('/Content/BlogListPagination/', 1)
+
+    def test_post_search(self):
+        self.assertConstantQueries('/Content/PostList/', 0)
+
+    def test_work_sample_search(self):
+        self.assertConstantQueries('/Content/WorkSampleList/', 0)
+
+    def test_story_list(self):
+        self.assertConstantQueries('/Content/StoryList/', 0)
+
+    def test_course_list_pagination(self):
+        self.assertConstantQueries('/Content/CourseListPagination/', 1)
+
+    def test_blog_search_cursor_mode(self):
+        data = {'cursor': None, 'order': 'new'}
+        small = self.count_queries('/Content/BlogList/', {**data, 'pageCount': self.small_page})
+        large = self.count_queries('/Content/BlogList/', {**data, 'pageCount': self.large_page})
+        self.assertEqual(small, large)
+
+
+class KeysetPaginationTest(TestCase):
+    def setUp(self):
+        cache.clear()
+
+    @classmethod
+    def setUpTestData(cls):
+        # ties on count_view and count_like, the id decides the order between them
+        Blog.objects.bulk_create(
+            [Blog(title=f'blog {i}', english_title=f'blog-{i}', time=5, status=1, count_view=i % 4, count_like=i % 2)
+             for i in range(23)]
+        )
+
+    def walk(self, order, page_count=5, **extra):
+        client = APIClient()
+        ids, cursor, pages = [], None, 0
+        while True:
+            response = client.post('/Content/BlogListPagination/',
+                                   {'cursor': cursor, 'order': order, 'pageCount': page_count, **extra},
+                                   format='json')
+            self.assertEqual(response.status_code, 200)
+            ids.extend(blog['id'] for blog in response.data['blogs'])
+            pages += 1
+            cursor = response.data['nextCursor']
+            self.assertEqual(response.data['hasNextPage'], cursor is not None)
+            if cursor is None:
+                return ids, pages, response.data
+
+    def test_every_order_visits_each_row_once_in_order(self):
+        for order, field in [('new', 'create_row_date'), ('view', 'count_view'), ('popular', 'count_like')]:
+            ids, pages, _ = self.walk(order)
+            expected = list(Blog.objects.order_by(f'-{field}', '-id').values_list('id', flat=True))
+            self.assertEqual(ids, expected, order)
+            self.assertEqual(pages, 5)
+
+    def test_count_only_when_requested(self):
+        _, _, data = self.walk('view')
+        self.assertNotIn('totalCount', data)
+        _, _, data = self.walk('view', withCount=True)
+        self.assertEqual(data['totalCount'], 23)
+        self.assertEqual(data['totalPage'], 5)
+
+    def test_listing_without_results(self):
+        response = APIClient().post('/Content/BlogList/', {'search': 'کاتلین', 'page': 0, 'pageCount': 5},
+                                    format='json')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['blogPaginationData']['totalCount'], 0)
+
+    def test_invalid_cursor_and_order(self):
+        client = APIClient()
+        for data in [{'cursor': 'not-a-cursor', 'order': 'new'}, {'cursor': None, 'order': 'title'}]:
+            response = client.post('/Content/BlogListPagination/', {'pageCount': 5, **data}, format='json')
+            self.assertEqual(response.status_code, 400)
+        response = client.post('/Content/BlogListPagination/', {'cursor': None, 'order': 'new', 'pageCount': 5},
+                               format='json')
+        response = client.post('/Content/BlogListPagination/',
+                               {'cursor': response.data['nextCursor'], 'order': 'view', 'pageCount': 5},
+                               format='json')
+        self.assertEqual(response.status_code, 400)
+
 
-# Create your tests here.
+class IndexCacheTest(TestCase):
+    def test_sections_are_invalidated_once_committed(self):
+        cache.clear()
+        self.assertEqual(json.loads(get_index_payload())['whyus'], [])
+        with self.captureOnCommitCallbacks(execute=True):
+            WhyUs.objects.create(title='why', english_title='why', status=1)
+            # a rebuild running before the commit keeps serving the committed payload
+            self.assertEqual(json.loads(get_index_payload())['whyus'], [])
+        self.assertEqual([item['title'] for item in json.loads(get_index_payload())['whyus']], ['why'])
@@ -6,27 +6,30 @@ from rest_framework.views import APIView
 from rest_framework.response import Response
 from rest_framework import status
 
-from base.models import Faq, Slider, BasePage, AbstractContent, StaticContent
-from base.serializers import FaqSerializer, SliderSerializer, BasePageSerializer, AbstractContentSerializer
-from cms.models import Blog, ContentCategory, Gallery, Story, Service, Event, Banner, Post, WorkSample, Brand
-from cms.serializers import BlogSerializer, ContentCategorySerializer, GallerySerializer, StorySerializer, \
-    ServiceSerializer, EventSerializer, BannerSerializer, PostSerializer, WorkSampleSerializer, BrandSerializer
+from activity.counters import increment_counter, apply_pending_counters
+from base.models import BasePage
+from base.serializers import FaqSerializer, BasePageSerializer, AbstractContentSerializer
+from cms.models import Blog, ContentCategory, Story, Service, Post, WorkSample, Brand
+from cms.serializers import BlogSerializer, ContentCategorySerializer, StorySerializer, ServiceSerializer, \
+    PostSerializer, WorkSampleSerializer, BrandSerializer
 from django.db.models import Q
+from django.http import HttpResponse
 
-from course.models import Course, CourseCategory
+from course.models import CourseCategory
 from course.serializers import CourseSerializer, CourseCategorySerializer
+from frontend_api.index_cache import get_index_payload
 from frontend_api.models import AboutUs
+from frontend_api.pagination import is_cursor_request, cursor_paginate, page_number_data, InvalidCursor
 from frontend_api.serializers import BlogResponseSerializer, BlogSearchRequestSerializer, \
     BlogListPaginationResponseSerializer, BlogDetailSerializer, ServiceContentSerializer, BasePageContentSerializer, \
-    BlogContentSerializer, FaqContentSerializer, CourseListPaginationResponseSerializer, PostContentSerializer, \
+    BlogContentSerializer, CourseListPaginationResponseSerializer, PostContentSerializer, \
     WorkSampleContentSerializer, PostSearchRequestSerializer, PostListPaginationResponseSerializer, \
     WorkSampleSearchRequestSerializer, WorkSampleListPaginationResponseSerializer, AboutUsContentSerializer, \
     BlogDetailWithUserSerializer, ServiceSearchRequestSerializer, ServiceListPaginationResponseSerializer, \
-    WhyUsContentSerializer, StorySearchRequestSerializer, StoryListPaginationResponseSerializer, StoryFrontSerializer, \
-    AbstractContentContentSerializer, StaticContentContentSerializer, CourseWriterSerializer
-from info.models import WhyUs, Colleague, Statistic, CustomerComment, Team
-from info.serializers import WhyUsSerializer, ColleagueSerializer, StatisticSerializer, CustomerCommentSerializer, \
-    TeamSerializer
+    WhyUsContentSerializer, StorySearchRequestSerializer, StoryListPaginationResponseSerializer, StoryFrontSerializer
+from info.models import WhyUs, Statistic, Team
+from info.serializers import StatisticSerializer, TeamSerializer
+from search.engine import search_queryset
 from serializers import GetModelSerializer, UrlSerializer
 
 
@@ -60,7 +63,7 @@ class BlogSearchView(APIView):
         order = request.data.get('order', 'id')  # Default order by id
 
         # Filtering and searching
-        blogs = Blog.objects.filter(is_deleted=False)
+        blogs = BlogDetailWithUserSerializer.setup_eager_loading(Blog.objects.filter(is_deleted=False))
 
         if category:
             blogs = blogs.filter(
@@ -69,11 +72,7 @@ class BlogSearchView(APIView):
             )
 
         if search:
-            blogs = blogs.filter(
-                Q(title__icontains=search) |
-                Q(abstract__icontains=search) |
-                Q(keywords__icontains=search)
-            )
+            blogs = search_queryset(blogs, search)
 
         # Ordering the results
         order_mapping = {
@@ -82,23 +81,29 @@ class BlogSearchView(APIView):
             "popular": "-count_like",
         }
 
-        # Determine the order field
-        order_field = order_mapping.get(order, 'id')  # Fallback to 'id' if order is invalid
+        # Determine the order field, falling back to relevance for searches and to 'id' otherwise
+        order_field = order_mapping.get(order, 'search_rank' if search else 'id')
         blogs = blogs.order_by(order_field)
 
         # Pagination
-        total_count = blogs.count()
-        total_page = (total_count // page_count) + (1 if total_count % page_count > 0 else 0)
-        start = page * page_count
-        end = start + page_count
-        paginated_blogs = blogs[start:end]
+        if is_cursor_request(request.data):
+            try:
+                paginated_blogs, pagination_data = cursor_paginate(blogs, order, request.data, page_count)
+            except InvalidCursor as e:
+                return Response({'message': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+        else:
+            start = page * page_count
+            end = start + page_count
+            paginated_blogs = blogs[start:end]
+            pagination_data = page_number_data(blogs, page, page_count)
 
         # Serialize paginated blogs
         blog_serializer = BlogDetailWithUserSerializer(paginated_blogs, many=True)
 
         # Get latest and best blogs (you might want to implement your own logic here)
-        latest_blogs = Blog.objects.filter(is_deleted=False).order_by('-create_row_date')[:5]  # Get the latest 5
-        best_blogs = Blog.objects.filter(is_deleted=False).order_by('-count_view')[:5]  # Get the most viewed 5
+        eager_blogs = BlogDetailWithUserSerializer.setup_eager_loading(Blog.objects.filter(is_deleted=False))
+        latest_blogs = eager_blogs.order_by('-create_row_date')[:5]  # Get the latest 5
+        best_blogs = eager_blogs.order_by('-count_view')[:5]  # Get the most viewed 5
 
         latest_blog_serializer = BlogDetailWithUserSerializer(latest_blogs, many=True)
         best_blog_serializer = BlogDetailWithUserSerializer(best_blogs, many=True)
@@ -111,10 +116,7 @@ class BlogSearchView(APIView):
         response_data = {
             "blogPaginationData": {
                 "blogs": blog_serializer.data,
-                "totalPage": total_page,
-                "totalCount": total_count,
-                "currentPage": page,
-                "hasNextPage": page + 1 < total_page,
+                **pagination_data,
             },
             "latestBlog": latest_blog_serializer.data,
             "bestBlog": best_blog_serializer.data,
@@ -149,17 +151,13 @@ class BlogListPagination(APIView):
         order = request.data.get('order', 'id')  # Default order by id
 
         # Filtering and searching
-        blogs = Blog.objects.filter(is_deleted=False)
+        blogs = Blog.objects.filter(is_deleted=False).select_related('content_category')
 
         if category:
             blogs = blogs.filter(content_category__title__icontains=category)
 
         if search:
-            blogs = blogs.filter(
-                Q(title__icontains=search) |
-                Q(abstract__icontains=search) |
-                Q(keywords__icontains=search)
-            )
+            blogs = search_queryset(blogs, search)
 
         # Ordering the results
         if order == 'new':
@@ -168,36 +166,32 @@ class BlogListPagination(APIView):
             blogs = blogs.order_by('-count_view')
         elif order == 'popular':
             blogs = blogs.order_by('-count_like')
+        elif search and order == 'id':
+            blogs = blogs.order_by('search_rank')
         else:
             blogs = blogs.order_by(order)
 
-        # Calculate the correct pagination
-        paginator = self.pagination_class()
-
-        # Adjust for one-based page indexing
-        start = (page - 1) * page_count
-        end = start + page_count
+        if is_cursor_request(request.data):
+            try:
+                paginated_blogs, pagination_data = cursor_paginate(blogs, order, request.data, page_count)
+            except InvalidCursor as e:
+                return Response({'message': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+        else:
+            # Adjust for one-based page indexing
+            start = (page - 1) * page_count
+            end = start + page_count
+            paginated_blogs = blogs[start:end]
 
-        # Use the paginator to get the paginated blogs
-        paginated_blogs = blogs[start:end]
+            # Get the total count and total pages, and determine if there is a next page
+            pagination_data = page_number_data(blogs, page, page_count, first_page=1)
 
         # Serialize paginated blogs
         blog_serializer = BlogSerializer(paginated_blogs, many=True)
 
-        # Get the total count and total pages
-        total_count = blogs.count()  # Total count without pagination
-        total_page = (total_count // page_count) + (1 if total_count % page_count > 0 else 0)
-
-        # Determine if there is a next page
-        has_next_page = page < total_page
-
         # Construct the response
         response_data = {
             "blogs": blog_serializer.data,
-            "totalPage": total_page,
-            "totalCount": total_count,
-            "currentPage": page,
-            "hasNextPage": has_next_page,  # Correctly determine if there is a next page
+            **pagination_data,
         }
 
         return Response(response_data, status=status.HTTP_200_OK)
@@ -216,7 +210,10 @@ class BlogDetailView(APIView):
     def post(self, request):
         en_name = request.data.get('url')  # This can be used for filtering or other logic
         try:
-            blog = Blog.objects.get(english_title=en_name, is_deleted=False)
+            blog = BlogDetailSerializer.setup_eager_loading(Blog.objects.all()).get(
+                english_title=en_name, is_deleted=False)
+            increment_counter(blog, 'count_view')
+            apply_pending_counters([blog])
             # Assume `content` field is also serialized properly
             serializer = BlogDetailSerializer(blog)
             return Response(serializer.data, status=status.HTTP_200_OK)
@@ -493,53 +490,8 @@ class IndexAPIView(APIView):
         )
     )
     def post(self, request):
-        # Fetch the 10 latest objects from each model
-        latest_blogs = Blog.objects.filter(is_deleted=False, status=1).order_by('-create_row_date')[:10]
-        latest_faqs = Faq.objects.filter(is_deleted=False, status=1).order_by('-create_row_date')
-        latest_galleries = Gallery.objects.filter(is_deleted=False, status=1).order_by('-create_row_date')[:10]
-        latest_stories = Story.objects.filter(is_deleted=False, status=1).order_by('-create_row_date')[:10]
-        latest_services = Service.objects.filter(is_deleted=False, status=1).order_by('-create_row_date')[:10]
-        latest_sliders = Slider.objects.filter(is_deleted=False, status=1).order_by('-create_row_date')
-        latest_whyus = WhyUs.objects.filter(is_deleted=False, status=1).order_by('-create_row_date')
-        latest_colleagues = Colleague.objects.filter(is_deleted=False, status=1).order_by('-create_row_date')[:10]
-        latest_events = Event.objects.filter(is_deleted=False, status=1).order_by('-create_row_date')[:10]
-        latest_courses = Course.objects.filter(is_deleted=False, status=1).order_by('-create_row_date')[:10]
-        latest_banners = Banner.objects.filter(is_deleted=False, status=1).order_by('-create_row_date')[:10]
-        latest_statistics = Statistic.objects.filter(is_deleted=False, status=1).order_by('-create_row_date')[:10]
-        latest_posts = Post.objects.filter(is_deleted=False, status=1).order_by('-create_row_date')[:10]
-        latest_customer_comments = CustomerComment.objects.filter(is_deleted=False, status=1).order_by(
-            '-create_row_date')[:10]
-        latest_work_samples = WorkSample.objects.filter(is_deleted=False, status=1).order_by('-create_row_date')[:10]
-        latest_brands = Brand.objects.filter(is_deleted=False, status=1).order_by('-create_row_date')[:10]
-        latest_abstract_contents = AbstractContent.objects.filter(is_deleted=False, status=1).order_by('-create_row_date')[:10]
-        latest_static_contents = StaticContent.objects.filter(is_deleted=False, status=1).order_by('-create_row_date')[:10]
-        about_us = AboutUs.objects.first()
-        latest_teams = Team.objects.filter(is_deleted=False, status=1).order_by('-create_row_date')[:10]
-        # Serialize each queryset
-        response_data = {
-            "blogs": BlogDetailWithUserSerializer(latest_blogs, many=True).data,
-            "faqs": FaqContentSerializer(latest_faqs, many=True).data,
-            "galleries": GallerySerializer(latest_galleries, many=True).data,
-            "stories": StoryFrontSerializer(latest_stories, many=True).data,
-            "services": ServiceSerializer(latest_services, many=True).data,
-            "sliders": SliderSerializer(latest_sliders, many=True).data,
-            "whyus": WhyUsSerializer(latest_whyus, many=True).data,
-            "colleagues": ColleagueSerializer(latest_colleagues, many=True).data,
-            "events": EventSerializer(latest_events, many=True).data,
-            "courses": CourseWriterSerializer(latest_courses, many=True).data,
-            "banners": BannerSerializer(latest_banners, many=True).data,
-            "statistics": StatisticSerializer(latest_statistics, many=True).data,
-            "posts": PostSerializer(latest_posts, many=True).data,
-            "customer_comments": CustomerCommentSerializer(latest_customer_comments, many=True).data,
-            "work_samples": WorkSampleSerializer(latest_work_samples, many=True).data,
-            "about_us": AboutUsContentSerializer(about_us).data,
-            "brands": BrandSerializer(latest_brands, many=True).data,
-            "abstract_contents": AbstractContentContentSerializer(latest_abstract_contents, many=True).data,
-            "static_contents": StaticContentContentSerializer(latest_static_contents, many=True).data,
-            "teams": TeamSerializer(latest_teams, many=True).data,
-        }
-
-        return Response(response_data)
+        # the 10 latest objects of each model, served as pre-rendered JSON from the cache (see index_cache)
+        return HttpResponse(get_index_payload(), content_type='application/json')
 
 
 # region service
@@ -558,7 +510,10 @@ class ServiceDetailView(APIView):
 
         try:
             # Retrieve the service based on the english_title and is_deleted fields
-            service = Service.objects.get(english_title=en_name, is_deleted=False)
+            service = ServiceContentSerializer.setup_eager_loading(Service.objects.all()).get(
+                english_title=en_name, is_deleted=False)
+            increment_counter(service, 'count_view')
+            apply_pending_counters([service])
             # Serialize the single service object (do not use `many=True`)
             serializer = ServiceContentSerializer(service)
             return Response(serializer.data, status=status.HTTP_200_OK)
@@ -586,13 +541,10 @@ class ServiceSearchView(APIView):
         services = Service.objects.filter(is_deleted=False)
 
         if search:
-            services = services.filter(
-                Q(title__icontains=search) |
-                Q(english_title__icontains=search)
-            )
+            services = search_queryset(services, search)
 
         # Ordering the results
-        services = services.order_by(order)
+        services = services.order_by('search_rank' if search and order == 'id' else order)
 
         # Pagination
         total_count = services.count()
@@ -648,7 +600,8 @@ class BasePageDetailView(APIView):
         en_name = request.data.get('url')  # This can be used for filtering or other logic
 
         try:
-            base_page = BasePage.objects.get(url=en_name, is_deleted=False)
+            base_page = BasePageContentSerializer.setup_eager_loading(BasePage.objects.all()).get(
+                url=en_name, is_deleted=False)
             # Assume `content` field is also serialized properly
             serializer = BasePageContentSerializer(base_page)
             return Response(serializer.data, status=status.HTTP_200_OK)
@@ -674,7 +627,10 @@ class PostDetailView(APIView):
 
         try:
             # Retrieve the service based on the english_title and is_deleted fields
-            post = Post.objects.get(english_title=en_name, is_deleted=False)
+            post = PostContentSerializer.setup_eager_loading(Post.objects.all()).get(
+                english_title=en_name, is_deleted=False)
+            increment_counter(post, 'count_view')
+            apply_pending_counters([post])
             # Serialize the single service object (do not use `many=True`)
             serializer = PostContentSerializer(post)
             return Response(serializer.data, status=status.HTTP_200_OK)
@@ -707,11 +663,7 @@ class PostSearchView(APIView):
         #     posts = posts.filter(content__title__icontains=category)
 
         if search:
-            posts = posts.filter(
-                Q(title__icontains=search) |
-                Q(english_title__icontains=search) |
-                Q(hashtag__icontains=search)
-            )
+            posts = search_queryset(posts, search)
         valid_fields = {"new": "create_row_date", "view": "count_view", "popular": "count_like"}
 
         # Check if order starts with "-" (indicating ascending order)
@@ -721,15 +673,24 @@ class PostSearchView(APIView):
         # Get the corresponding database field, defaulting to `order` itself if not found
         field_name = valid_fields.get(order_key, order)
 
-        # Apply ordering (prepend '-' for descending order)
-        posts = posts.order_by(field_name if is_ascending else f"-{field_name}")
+        if search and order == 'id':
+            # the most relevant posts first
+            posts = posts.order_by('search_rank')
+        else:
+            # Apply ordering (prepend '-' for descending order)
+            posts = posts.order_by(field_name if is_ascending else f"-{field_name}")
 
         # Pagination
-        total_count = posts.count()
-        total_page = (total_count // page_count) + (1 if total_count % page_count > 0 else 0)
-        start = page * page_count
-        end = start + page_count
-        paginated_posts = posts[start:end]
+        if is_cursor_request(request.data):
+            try:
+                paginated_posts, pagination_data = cursor_paginate(posts, order, request.data, page_count)
+            except InvalidCursor as e:
+                return Response({'message': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+        else:
+            start = page * page_count
+            end = start + page_count
+            paginated_posts = posts[start:end]
+            pagination_data = page_number_data(posts, page, page_count)
 
         # Serialize paginated posts
         post_serializer = PostSerializer(paginated_posts, many=True)
@@ -749,10 +710,7 @@ class PostSearchView(APIView):
         response_data = {
             "postPaginationData": {
                 "posts": post_serializer.data,
-                "totalPage": total_page,
-                "totalCount": total_count,
-                "currentPage": page,
-                "hasNextPage": page + 1 < total_page,
+                **pagination_data,
             },
             "latestPost": latest_post_serializer.data,
             "bestPost": best_post_serializer.data,
@@ -793,11 +751,7 @@ class WorkSampleSearchView(APIView):
             work_samples = work_samples.filter(categories__icontains=category)
 
         if search:
-            work_samples = work_samples.filter(
-                Q(title__icontains=search) |
-                Q(english_title__icontains=search) |
-                Q(tags__icontains=search)
-            )
+            work_samples = search_queryset(work_samples, search)
 
         # Ordering the results
         order_mapping = {
@@ -806,16 +760,22 @@ class WorkSampleSearchView(APIView):
             "popular": "-count_like",
         }
 
-        # Determine the order field
-        order_field = order_mapping.get(order, 'id')  # Fallback to 'id' if order is invalid
+        # Determine the order field, falling back to relevance for searches and to 'id' otherwise
+        order_field = order_mapping.get(order, 'search_rank' if search else 'id')
         work_samples = work_samples.order_by(order_field)
 
         # Pagination
-        total_count = work_samples.count()
-        total_page = (total_count // page_count) + (1 if total_count % page_count > 0 else 0)
-        start = page * page_count
-        end = start + page_count
-        paginated_work_samples = work_samples[start:end]
+        if is_cursor_request(request.data):
+            try:
+                paginated_work_samples, pagination_data = cursor_paginate(work_samples, order, request.data,
+                                                                          page_count)
+            except InvalidCursor as e:
+                return Response({'message': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+        else:
+            start = page * page_count
+            end = start + page_count
+            paginated_work_samples = work_samples[start:end]
+            pagination_data = page_number_data(work_samples, page, page_count)
 
         # Serialize paginated work samples
         work_sample_serializer = WorkSampleSerializer(paginated_work_samples, many=True)
@@ -831,10 +791,7 @@ class WorkSampleSearchView(APIView):
         response_data = {
             "workSamplePaginationData": {
                 "work_samples": work_sample_serializer.data,
-                "totalPage": total_page,
-                "totalCount": total_count,
-                "currentPage": page,
-                "hasNextPage": page + 1 < total_page,
+                **pagination_data,
             },
             "latestWorkSample": latest_work_sample_serializer.data,
             "bestWorkSample": best_work_sample_serializer.data,
@@ -863,7 +820,10 @@ class WorkSampleDetailView(APIView):
 
         try:
             # Retrieve the service based on the english_title and is_deleted fields
-            work_sample = WorkSample.objects.get(english_title=en_name, is_deleted=False)
+            work_sample = WorkSampleContentSerializer.setup_eager_loading(WorkSample.objects.all()).get(
+                english_title=en_name, is_deleted=False)
+            increment_counter(work_sample, 'count_view')
+            apply_pending_counters([work_sample])
             # Serialize the single service object (do not use `many=True`)
             serializer = WorkSampleContentSerializer(work_sample)
             return Response(serializer.data, status=status.HTTP_200_OK)
@@ -938,7 +898,7 @@ class WhyUsSearchView(APIView):
     )
     def post(self, request):
         # Query all non-deleted WhyUs objects
-        why_us_objects = WhyUs.objects.filter(is_deleted=False)
+        why_us_objects = WhyUsContentSerializer.setup_eager_loading(WhyUs.objects.filter(is_deleted=False))
 
         # Serialize the data
         serializer = WhyUsContentSerializer(why_us_objects, many=True)
@@ -977,15 +937,19 @@ class StoryListView(APIView):
                 Q(link__icontains=search)
             )
 
-        # Ordering the results
-        stories = stories.order_by(order)
-
         # Pagination
-        total_count = stories.count()
-        total_page = (total_count // page_count) + (1 if total_count % page_count > 0 else 0)
-        start = page * page_count
-        end = start + page_count
-        paginated_stories = stories[start:end]
+        if is_cursor_request(request.data):
+            try:
+                paginated_stories, pagination_data = cursor_paginate(stories, order, request.data, page_count)
+            except InvalidCursor as e:
+                return Response({'message': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+        else:
+            # Ordering the results
+            stories = stories.order_by(order)
+            start = page * page_count
+            end = start + page_count
+            paginated_stories = stories[start:end]
+            pagination_data = page_number_data(stories, page, page_count)
 
         # Serialize paginated stories
         story_serializer = StoryFrontSerializer(paginated_stories, many=True)
@@ -1001,10 +965,7 @@ class StoryListView(APIView):
         response_data = {
             "storyPaginationData": {
                 "stories": story_serializer.data,
-                "totalPage": total_page,
-                "totalCount": total_count,
-                "currentPage": page,
-                "hasNextPage": page + 1 < total_page,
+                **pagination_data,
             },
             "latestStory": latest_story_serializer.data,
             "bestStory": best_story_serializer.data,
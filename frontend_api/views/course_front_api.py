@@ -1,4 +1,3 @@
-from django.db.models import Q
 from drf_spectacular.utils import extend_schema, OpenApiResponse, OpenApiExample
 from rest_framework.pagination import PageNumberPagination
 from rest_framework.permissions import AllowAny
@@ -6,11 +5,14 @@ from rest_framework.views import APIView
 from rest_framework.response import Response
 from rest_framework import status
 
+from activity.counters import increment_counter, apply_pending_counters
 from course.models import CourseCategory, Course, Episode
 from course.serializers import CourseCategorySerializer, CourseSerializer, EpisodeSerializer
 from frontend_api.serializers import CourseSearchRequestSerializer, CourseListPaginationResponseSerializer, \
     CourseDetailSerializer, EpisodeDetailSerializer
+from frontend_api.pagination import is_cursor_request, cursor_paginate, page_number_data, InvalidCursor
 from frontend_api.views.cms_page_api import BlogPagination
+from search.engine import search_queryset
 from serializers import UrlSerializer
 
 
@@ -96,11 +98,7 @@ class CourseListPagination(APIView):
             courses = courses.filter(category_id=category)
 
         if search:
-            courses = courses.filter(
-                Q(title__icontains=search) |
-                Q(abstract__icontains=search) |
-                Q(keywords__icontains=search)
-            )
+            courses = search_queryset(courses, search)
         if is_free:
             courses = courses.filter(price=0)
         elif not is_free:
@@ -113,36 +111,32 @@ class CourseListPagination(APIView):
             courses = courses.order_by('-count_view')
         elif order == 'popular':
             courses = courses.order_by('-count_like')
+        elif search and order == 'id':
+            courses = courses.order_by('search_rank')
         else:
             courses = courses.order_by(order)
 
-        # Calculate the correct pagination
-        paginator = self.pagination_class()
-
-        # Adjust for one-based page indexing
-        start = (page - 1) * page_count
-        end = start + page_count
+        if is_cursor_request(request.data):
+            try:
+                paginated_courses, pagination_data = cursor_paginate(courses, order, request.data, page_count)
+            except InvalidCursor as e:
+                return Response({'message': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+        else:
+            # Adjust for one-based page indexing
+            start = (page - 1) * page_count
+            end = start + page_count
+            paginated_courses = courses[start:end]
 
-        # Use the paginator to get the paginated courses
-        paginated_courses = courses[start:end]
+            # Get the total count and total pages, and determine if there is a next page
+            pagination_data = page_number_data(courses, page, page_count, first_page=1)
 
         # Serialize paginated courses
         course_serializer = CourseSerializer(paginated_courses, many=True)
 
-        # Get the total count and total pages
-        total_count = courses.count()  # Total count without pagination
-        total_page = (total_count // page_count) + (1 if total_count % page_count > 0 else 0)
-
-        # Determine if there is a next page
-        has_next_page = page < total_page
-
         # Construct the response
         response_data = {
             "courses": course_serializer.data,
-            "totalPage": total_page,
-            "totalCount": total_count,
-            "currentPage": page,
-            "hasNextPage": has_next_page,  # Correctly determine if there is a next page
+            **pagination_data,
         }
 
         return Response(response_data, status=status.HTTP_200_OK)
@@ -163,10 +157,12 @@ class CourseDetailView(APIView):
             return Response({"error": "URL parameter is required"}, status=status.HTTP_400_BAD_REQUEST)
 
         try:
-            course = Course.objects.get(english_title=url)
+            course = CourseDetailSerializer.setup_eager_loading(Course.objects.all()).get(english_title=url)
         except Course.DoesNotExist:
             return Response({"error": "Course not found"}, status=status.HTTP_404_NOT_FOUND)
 
+        increment_counter(course, 'count_view')
+        apply_pending_counters([course])
         serializer = CourseDetailSerializer(course, context={"request": request})
         return Response(serializer.data, status=status.HTTP_200_OK)
 
@@ -186,7 +182,7 @@ class EpisodeDetailView(APIView):
             return Response({"error": "URL parameter is required"}, status=status.HTTP_400_BAD_REQUEST)
 
         try:
-            episode = Episode.objects.get(english_title=url)
+            episode = EpisodeDetailSerializer.setup_eager_loading(Episode.objects.all()).get(english_title=url)
         except Episode.DoesNotExist:
             return Response({"error": "Episode not found"}, status=status.HTTP_404_NOT_FOUND)
 
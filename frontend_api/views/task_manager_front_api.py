@@ -24,7 +24,8 @@ class TaskRequestDetailView(APIView):
 
         try:
             # Retrieve the service based on the english_title and is_deleted fields
-            task_request = TaskRequest.objects.get(title=en_name, is_deleted=False)
+            task_request = TaskRequestContentSerializer.setup_eager_loading(TaskRequest.objects.all()).get(
+                title=en_name, is_deleted=False)
             # Serialize the single service object (do not use `many=True`)
             serializer = TaskRequestContentSerializer(task_request)
             return Response(serializer.data, status=status.HTTP_200_OK)
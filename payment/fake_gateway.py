@@ -0,0 +1,112 @@
+import json
+import random
+import threading
+import time
+import uuid
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from payment.gateway import REQUEST_PATH, VERIFY_PATH, START_PAY_PATH, PAID, ALREADY_VERIFIED
+
+# error statuses of zarinpal
+INVALID_AMOUNT = -11
+NOT_FOUND = -54
+
+
+class FakeZarinpalGateway:
+    """
+    In-memory stand-in of the zarinpal WebGate, every payment is paid as soon as it is requested. `latency`
+    delays each answer and `failure_rate` answers with a 503, to see the client under a slow or failing gateway.
+    """
+
+    def __init__(self, latency=0.0, failure_rate=0.0):
+        self.latency = latency
+        self.failure_rate = failure_rate
+        self.payments = {}
+        self.verify_count = 0
+        self._lock = threading.Lock()
+
+    def request_payment(self, data):
+        authority = 'A' + uuid.uuid4().hex.rjust(35, '0')
+        with self._lock:
+            self.payments[authority] = {'amount': data.get('Amount'), 'ref_id': None}
+        return {'Status': PAID, 'Authority': authority}
+
+    def verify(self, data):
+        with self._lock:
+            self.verify_count += 1
+            payment = self.payments.get(data.get('Authority'))
+            if payment is None:
+                return {'Status': NOT_FOUND}
+            if payment['amount'] != data.get('Amount'):
+                return {'Status': INVALID_AMOUNT}
+            if payment['ref_id'] is not None:
+                return {'Status': ALREADY_VERIFIED, 'RefID': payment['ref_id']}
+            payment['ref_id'] = random.randint(10 ** 9, 10 ** 10)
+            return {'Status': PAID, 'RefID': payment['ref_id']}
+
+    def handle(self, path, data):
+        # (http status, body)
+        if self.latency:
+            time.sleep(self.latency)
+        if self.failure_rate and random.random() < self.failure_rate:
+            return 503, {'Status': -1}
+        if path == REQUEST_PATH:
+            return 200, self.request_payment(data)
+        if path == VERIFY_PATH:
+            return 200, self.verify(data)
+        return 404, {'Status': -1}
+
+
+class FakeGatewayServer(ThreadingHTTPServer):
+    daemon_threads = True
+    # benchmarks open many connections at once
+    request_queue_size = 128
+
+
+def make_server(gateway, host='127.0.0.1', port=8765):
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = 'HTTP/1.1'
+        # headers and body go out in separate writes, on a kept-alive connection nagle delays the body
+        disable_nagle_algorithm = True
+
+        def do_POST(self):
+            length = int(self.headers.get('content-length') or 0)
+            try:
+                data = json.loads(self.rfile.read(length) or b'{}')
+            except ValueError:
+                data = {}
+            code, body = gateway.handle(self.path, data)
+            self.reply(code, json.dumps(body).encode(), 'application/json')
+
+        def do_GET(self):
+            # the payment page, the user is sent back to the callback url in the real gateway
+            if self.path.startswith(START_PAY_PATH):
+                self.reply(200, b'paid', 'text/plain')
+            else:
+                self.reply(404, b'', 'text/plain')
+
+        def reply(self, code, body, content_type):
+            self.send_response(code)
+            self.send_header('content-type', content_type)
+            self.send_header('content-length', str(len(body)))
+            self.end_headers()
+            try:
+                self.wfile.write(body)
+            except ConnectionError:
+                # the client timed out meanwhile
+                pass
+
+        def log_message(self, format, *args):
+            pass
+
+    return FakeGatewayServer((host, port), Handler)
+
+
+def start_fake_gateway(gateway=None, host='127.0.0.1', port=0):
+    """
+    Serves the fake gateway from a background thread, port 0 picks a free port. Returns (server, base url),
+    stop it with server.shutdown().
+    """
+    server = make_server(gateway or FakeZarinpalGateway(), host, port)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, f"http://{host}:{server.server_address[1]}"
@@ -0,0 +1,213 @@
+import threading
+import time
+
+import requests
+from django.db import transaction as db_transaction
+from django.utils import timezone
+from requests.adapters import HTTPAdapter
+
+from Sahand import settings
+
+REQUEST_PATH = '/pg/rest/WebGate/PaymentRequest.json'
+VERIFY_PATH = '/pg/rest/WebGate/PaymentVerification.json'
+START_PAY_PATH = '/pg/StartPay/'
+
+DESCRIPTION = "توضیحات مربوط به تراکنش را در این قسمت وارد کنید"
+
+PAID = 100
+# the authority was verified before, returned by zarinpal to a repeated verification
+ALREADY_VERIFIED = 101
+
+SUCCESS = 'Success'
+FAILED = 'Failed'
+PENDING = 'pending'
+
+# the gateway did not answer, the transaction stays pending and can be verified again
+GATEWAY_ERRORS = {'timeout', 'connection error', 'unavailable'}
+
+
+class GatewayUnavailable(Exception):
+    def __init__(self, code):
+        super().__init__(code)
+        self.code = code
+
+
+class CircuitBreaker:
+    """
+    Opened after `failure_threshold` consecutive failures, requests are refused right away for `reset_timeout`
+    seconds instead of waiting for a gateway that is down. Then a single trial request is let through, the
+    circuit is closed again when it succeeds.
+    """
+
+    def __init__(self, failure_threshold=5, reset_timeout=30.0):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.failures = 0
+        self.opened_at = None
+        self._trial = False
+        self._lock = threading.Lock()
+
+    @property
+    def is_open(self):
+        return self.opened_at is not None
+
+    def allow(self):
+        with self._lock:
+            if self.opened_at is None:
+                return True
+            if not self._trial and time.monotonic() - self.opened_at >= self.reset_timeout:
+                self._trial = True
+                return True
+            return False
+
+    def record_success(self):
+        with self._lock:
+            self.failures = 0
+            self.opened_at = None
+            self._trial = False
+
+    def record_failure(self):
+        with self._lock:
+            self.failures += 1
+            if self._trial or self.failures >= self.failure_threshold:
+                self.opened_at = time.monotonic()
+            self._trial = False
+
+
+class ZarinpalClient:
+    """
+    Zarinpal WebGate client over one keep-alive session, shared by the API workers. Every call is bounded by
+    the (connect, read) timeout and goes through the circuit breaker.
+    """
+
+    def __init__(self, base_url='https://www.zarinpal.com', merchant=None, timeout=(3, 10), breaker=None,
+                 pool_size=10):
+        self.base_url = base_url.rstrip('/')
+        self.merchant = merchant or settings.MERCHANT
+        self.timeout = timeout
+        self.breaker = breaker or CircuitBreaker()
+        self.session = requests.Session()
+        self.session.headers.update({'content-type': 'application/json'})
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=pool_size)
+        self.session.mount('https://', adapter)
+        self.session.mount('http://', adapter)
+
+    def start_pay_url(self, authority):
+        return f"{self.base_url}{START_PAY_PATH}{authority}"
+
+    def _post(self, path, data):
+        if not self.breaker.allow():
+            raise GatewayUnavailable('unavailable')
+        try:
+            response = self.session.post(self.base_url + path, json=data, timeout=self.timeout)
+        except requests.exceptions.Timeout:
+            self.breaker.record_failure()
+            raise GatewayUnavailable('timeout')
+        except requests.RequestException:
+            self.breaker.record_failure()
+            raise GatewayUnavailable('connection error')
+        if response.status_code >= 500:
+            self.breaker.record_failure()
+            raise GatewayUnavailable('unavailable')
+        self.breaker.record_success()
+        if response.status_code != 200:
+            return {'Status': response.status_code}
+        return response.json()
+
+    def request_payment(self, amount, description=DESCRIPTION, callback_url=None, phone=None):
+        data = {
+            "MerchantID": self.merchant,
+            "Amount": amount,
+            "Description": description,
+            "CallbackURL": callback_url or getattr(settings, 'ZARINPAL_CALLBACK_URL', 'http://localhost:3000/PayMent'),
+        }
+        if phone:
+            data["Phone"] = phone
+        try:
+            response = self._post(REQUEST_PATH, data)
+        except GatewayUnavailable as e:
+            return {'status': False, 'code': e.code}
+        if response['Status'] == PAID:
+            return {'status': True, 'url': self.start_pay_url(response['Authority']),
+                    'authority': response['Authority']}
+        return {'status': False, 'code': str(response['Status'])}
+
+    def verify(self, authority, amount):
+        data = {
+            "MerchantID": self.merchant,
+            "Amount": amount,
+            "Authority": authority,
+        }
+        try:
+            response = self._post(VERIFY_PATH, data)
+        except GatewayUnavailable as e:
+            return {'status': False, 'code': e.code}
+        if response['Status'] in (PAID, ALREADY_VERIFIED):
+            return {'status': True, 'RefID': response['RefID']}
+        return {'status': False, 'code': str(response['Status'])}
+
+
+_client = None
+_lock = threading.Lock()
+
+
+def get_gateway_client():
+    global _client
+    if _client is None:
+        with _lock:
+            if _client is None:
+                _client = ZarinpalClient(
+                    base_url=getattr(settings, 'ZARINPAL_BASE_URL', 'https://www.zarinpal.com'),
+                    timeout=getattr(settings, 'ZARINPAL_TIMEOUT', (3, 10)),
+                    breaker=CircuitBreaker(getattr(settings, 'ZARINPAL_FAILURE_THRESHOLD', 5),
+                                           getattr(settings, 'ZARINPAL_RESET_TIMEOUT', 30))
+                )
+    return _client
+
+
+def get_transaction(authority):
+    """
+    The transaction of `authority` with its enrollment, course and user, one query over the authority index.
+    """
+    from payment.models import Transaction
+
+    if not authority:
+        return None
+    # no ORDER BY id as in first(), the plan stays on the authority index as the table grows
+    transactions = Transaction.objects.select_related('course_user__course', 'course_user__user').filter(
+        authority=authority
+    )[:1]
+    return transactions[0] if transactions else None
+
+
+def verify_transaction(authority, client=None, on_success=None):
+    """
+    Verifies the transaction of `authority` once. The row is locked for the verification, so a repeated or
+    concurrent callback waits for the first one and gets its RefID without calling the gateway again.
+    `on_success(transaction)` runs under the same lock and commits with the Success status, e.g. to credit the
+    enrollment: when it fails the transaction stays pending and the next callback verifies it again.
+    Returns (transaction, result, verified_now), transaction is None when the authority is unknown.
+    """
+    from payment.models import Transaction
+
+    with db_transaction.atomic():
+        transactions = Transaction.objects.select_for_update().filter(authority=authority)[:1]
+        if not transactions:
+            return None, None, False
+        transaction = transactions[0]
+        if transaction.pay_status == SUCCESS:
+            return transaction, {'status': True, 'RefID': transaction.ref_id}, False
+
+        result = (client or get_gateway_client()).verify(authority, transaction.pay_price)
+        if result['status']:
+            transaction.pay_status = SUCCESS
+            transaction.ref_id = result['RefID']
+        elif result['code'] in GATEWAY_ERRORS:
+            return transaction, result, False
+        else:
+            transaction.pay_status = FAILED
+        transaction.pay_time = timezone.now()
+        transaction.save()
+        if result['status'] and on_success is not None:
+            on_success(transaction)
+    return transaction, result, bool(result['status'])
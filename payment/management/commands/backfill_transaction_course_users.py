@@ -0,0 +1,37 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction as db_transaction
+
+from course.models import CourseUser
+from payment.models import Transaction
+
+
+class Command(BaseCommand):
+    help = ("Link the transactions listed in CourseUser.transactions to their enrollment (Transaction.course_user), "
+            "transactions already linked are left as they are so the command can be run again")
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=1000)
+
+    def handle(self, *args, **options):
+        batch_size = options['batch_size']
+        linked = 0
+        last_id = 0
+        while True:
+            course_users = list(CourseUser.objects.filter(id__gt=last_id).order_by('id')
+                                .values_list('id', 'transactions')[:batch_size])
+            if not course_users:
+                break
+            last_id = course_users[-1][0]
+            enrollments = {}
+            for course_user_id, transaction_ids in course_users:
+                for transaction_id in transaction_ids or []:
+                    enrollments.setdefault(int(transaction_id), course_user_id)
+
+            transactions = list(Transaction.objects.filter(id__in=enrollments, course_user__isnull=True)
+                                .only('id'))
+            for transaction in transactions:
+                transaction.course_user_id = enrollments[transaction.id]
+            with db_transaction.atomic():
+                Transaction.objects.bulk_update(transactions, ['course_user'], batch_size=batch_size)
+            linked += len(transactions)
+        self.stdout.write(self.style.SUCCESS(f"{linked} transaction(s) linked to their enrollment"))
@@ -0,0 +1,66 @@
+import statistics
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+
+from payment.fake_gateway import FakeZarinpalGateway, start_fake_gateway
+from payment.gateway import ZarinpalClient, CircuitBreaker, verify_transaction, PENDING
+from payment.models import Transaction
+from security.models import User
+
+
+class Command(BaseCommand):
+    help = ("Run checkouts (payment request, pending transaction, verification and a repeated callback) against "
+            "the fake zarinpal gateway from concurrent threads and report the throughput and latencies. "
+            "The transactions are deleted afterwards unless --keep is given")
+
+    def add_arguments(self, parser):
+        parser.add_argument('--user', type=int, required=True, help="id of the user the transactions belong to")
+        parser.add_argument('--checkouts', type=int, default=500)
+        parser.add_argument('--concurrency', type=int, default=20)
+        parser.add_argument('--amount', type=int, default=100000)
+        parser.add_argument('--latency', type=float, default=0.05, help="seconds the fake gateway takes per call")
+        parser.add_argument('--failure-rate', type=float, default=0.0)
+        parser.add_argument('--keep', action='store_true')
+
+    def handle(self, *args, **options):
+        if not User.objects.filter(id=options['user']).exists():
+            raise CommandError(f"User {options['user']} not found")
+        gateway = FakeZarinpalGateway(options['latency'], options['failure_rate'])
+        server, base_url = start_fake_gateway(gateway)
+        client = ZarinpalClient(base_url=base_url, timeout=(3, 10), pool_size=options['concurrency'],
+                                breaker=CircuitBreaker(failure_threshold=10 ** 9))
+
+        def checkout(_):
+            try:
+                started = time.perf_counter()
+                response = client.request_payment(options['amount'])
+                if not response['status']:
+                    return None, False, None
+                transaction = Transaction.objects.create(user_id=options['user'], authority=response['authority'],
+                                                         pay_price=options['amount'], pay_status=PENDING)
+                verify_transaction(transaction.authority, client)
+                # the callback of the same payment again, answered from the stored result
+                _, result, _ = verify_transaction(transaction.authority, client)
+                return transaction.id, result['status'], time.perf_counter() - started
+            finally:
+                connection.close()
+
+        started = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=options['concurrency']) as executor:
+            results = list(executor.map(checkout, range(options['checkouts'])))
+        elapsed = time.perf_counter() - started
+        server.shutdown()
+
+        paid = [result for result in results if result[0] is not None and result[1]]
+        latencies = sorted(result[2] for result in paid)
+        self.stdout.write(f"{len(paid)}/{options['checkouts']} checkout(s) paid in {elapsed:.2f}s, "
+                          f"{len(paid) / elapsed:.1f}/s, {gateway.verify_count} gateway verification(s)")
+        if latencies:
+            quantiles = statistics.quantiles(latencies, n=100) if len(latencies) > 1 else latencies * 99
+            self.stdout.write(f"latency p50 {quantiles[49] * 1000:.0f}ms, p95 {quantiles[94] * 1000:.0f}ms, "
+                              f"p99 {quantiles[98] * 1000:.0f}ms")
+        if not options['keep']:
+            Transaction.objects.filter(id__in=[result[0] for result in results if result[0] is not None]).delete()
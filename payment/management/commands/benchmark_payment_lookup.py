@@ -0,0 +1,91 @@
+import random
+import statistics
+import time
+import uuid
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction as db_transaction
+
+from course.models import Course, CourseUser
+from payment.gateway import get_transaction, PENDING
+from payment.models import Transaction
+from security.models import User
+
+PREFIX = 'bench-'
+
+
+class Command(BaseCommand):
+    help = ("Grow the enrollments step by step and time the transaction lookup of the payment callback at each "
+            "size. The generated rows are deleted afterwards unless --keep is given")
+
+    def add_arguments(self, parser):
+        parser.add_argument('--user', type=int, required=True, help="id of the user the enrollments belong to")
+        parser.add_argument('--course', type=int, required=True, help="id of the course of the enrollments")
+        parser.add_argument('--steps', default='10000,100000,1000000', help="enrollment counts, comma separated")
+        parser.add_argument('--lookups', type=int, default=200)
+        parser.add_argument('--batch-size', type=int, default=5000)
+        parser.add_argument('--compare-contains', action='store_true',
+                            help="also time the former CourseUser.transactions containment lookup (PostgreSQL)")
+        parser.add_argument('--keep', action='store_true')
+
+    def handle(self, *args, **options):
+        if not User.objects.filter(id=options['user']).exists():
+            raise CommandError(f"User {options['user']} not found")
+        if not Course.objects.filter(id=options['course']).exists():
+            raise CommandError(f"Course {options['course']} not found")
+        if options['compare_contains'] and connection.vendor != 'postgresql':
+            raise CommandError("--compare-contains needs PostgreSQL")
+
+        steps = sorted(int(step) for step in options['steps'].split(','))
+        authorities = []
+        try:
+            for step in steps:
+                while len(authorities) < step:
+                    authorities += self.create_enrollments(options, min(options['batch_size'], step - len(authorities)))
+                self.report(step, options, random.sample(authorities, min(options['lookups'], len(authorities))))
+        finally:
+            if not options['keep']:
+                self.delete_enrollments()
+
+    def create_enrollments(self, options, count):
+        authorities = [PREFIX + uuid.uuid4().hex for _ in range(count)]
+        with db_transaction.atomic():
+            transactions = Transaction.objects.bulk_create([
+                Transaction(user_id=options['user'], authority=authority, pay_price=1000, pay_status=PENDING, status=1)
+                for authority in authorities
+            ])
+            course_users = CourseUser.objects.bulk_create([
+                CourseUser(course_id=options['course'], user_id=options['user'], is_full=True,
+                           transactions=[transaction.id], status=1)
+                for transaction in transactions
+            ])
+            for transaction, course_user in zip(transactions, course_users):
+                transaction.course_user_id = course_user.id
+            Transaction.objects.bulk_update(transactions, ['course_user'], batch_size=1000)
+        return authorities
+
+    def time_lookups(self, lookup, values):
+        timings = []
+        for value in values:
+            started = time.perf_counter()
+            lookup(value)
+            timings.append((time.perf_counter() - started) * 1000)
+        return statistics.median(timings), statistics.quantiles(timings, n=20)[18]
+
+    def report(self, step, options, authorities):
+        p50, p95 = self.time_lookups(get_transaction, authorities)
+        line = f"{step} enrollment(s): lookup p50 {p50:.2f}ms, p95 {p95:.2f}ms"
+        if options['compare_contains']:
+            ids = list(Transaction.objects.filter(authority__in=authorities).values_list('id', flat=True))
+            p50, p95 = self.time_lookups(
+                lambda transaction_id: CourseUser.objects.filter(transactions__contains=[transaction_id]).first(), ids
+            )
+            line += f", containment lookup p50 {p50:.2f}ms, p95 {p95:.2f}ms"
+        self.stdout.write(line)
+
+    def delete_enrollments(self):
+        generated = Transaction.objects.filter(authority__startswith=PREFIX)
+        course_user_ids = list(generated.values_list('course_user_id', flat=True))
+        generated.delete()
+        for start in range(0, len(course_user_ids), 10000):
+            CourseUser.objects.filter(id__in=course_user_ids[start:start + 10000]).delete()
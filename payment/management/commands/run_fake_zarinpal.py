@@ -0,0 +1,25 @@
+from django.core.management.base import BaseCommand
+
+from payment.fake_gateway import FakeZarinpalGateway, make_server
+
+
+class Command(BaseCommand):
+    help = ("Serve a fake zarinpal gateway to run checkouts offline, start the API with "
+            "ZARINPAL_BASE_URL=http://127.0.0.1:<port>")
+
+    def add_arguments(self, parser):
+        parser.add_argument('--host', default='127.0.0.1')
+        parser.add_argument('--port', type=int, default=8765)
+        parser.add_argument('--latency', type=float, default=0.0, help="seconds added to every answer")
+        parser.add_argument('--failure-rate', type=float, default=0.0, help="share of requests answered with a 503")
+
+    def handle(self, *args, **options):
+        server = make_server(FakeZarinpalGateway(options['latency'], options['failure_rate']),
+                             options['host'], options['port'])
+        self.stdout.write(f"Fake zarinpal gateway on http://{options['host']}:{options['port']}")
+        try:
+            server.serve_forever()
+        except KeyboardInterrupt:
+            pass
+        finally:
+            server.server_close()
@@ -7,9 +7,11 @@ class Transaction(models.Model):
         (2, 'Inactive')
     ]
     user = models.ForeignKey('security.User', on_delete=models.PROTECT, null=True, related_name='transaction_user')
+    course_user = models.ForeignKey('course.CourseUser', on_delete=models.PROTECT, null=True, blank=True,
+                                    related_name='transaction_course_user')
     pay_time = models.DateTimeField(null=True, blank=True)
     pay_price = models.BigIntegerField(null=True, blank=True)
-    authority = models.CharField(max_length=300, blank=True, null=True)
+    authority = models.CharField(max_length=300, blank=True, null=True, db_index=True)
     ref_id = models.CharField(max_length=300, blank=True, null=True)
     pay_status = models.CharField(max_length=50, blank=True, null=True)
     create_row_date = models.DateTimeField(auto_now_add=True)
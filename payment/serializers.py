@@ -1,6 +1,5 @@
 from rest_framework import serializers
 
-from course.models import CourseUser
 from payment.models import Transaction
 
 
@@ -23,9 +22,7 @@ class TransactionSerializer(serializers.ModelSerializer):
         fields = '__all__'
 
     def get_course_title(self, obj):
-        course_user = CourseUser.objects.filter(transactions__contains=[obj.id]).first()
-        return course_user.course.title if course_user else None
+        return obj.course_user.course.title if obj.course_user else None
 
     def get_course_photo(self, obj):
-        course_user = CourseUser.objects.filter(transactions__contains=[obj.id]).first()
-        return course_user.course.photo.id if course_user.course.photo else None
\ No newline at end of file
+        return obj.course_user.course.photo_id if obj.course_user else None
\ No newline at end of file
@@ -1,3 +1,168 @@
+from io import StringIO
+from unittest import mock
+
+from django.core.management import call_command
+from django.db import DatabaseError
 from django.test import TestCase
+from rest_framework.test import APIClient
+
+from course.models import Course, CourseUser
+from payment import gateway
+from payment.fake_gateway import FakeZarinpalGateway, start_fake_gateway
+from payment.gateway import ZarinpalClient, CircuitBreaker, verify_transaction, get_transaction, SUCCESS, PENDING
+from payment.models import Transaction
+from security.models import User
+
+
+class CircuitBreakerTest(TestCase):
+    def test_opens_after_consecutive_failures(self):
+        breaker = CircuitBreaker(failure_threshold=3, reset_timeout=60)
+        breaker.record_failure()
+        breaker.record_success()
+        for _ in range(2):
+            breaker.record_failure()
+        self.assertTrue(breaker.allow())
+        breaker.record_failure()
+        self.assertFalse(breaker.allow())
+
+    def test_one_trial_request_after_reset_timeout(self):
+        breaker = CircuitBreaker(failure_threshold=1, reset_timeout=60)
+        breaker.record_failure()
+        breaker.opened_at -= 60
+        self.assertTrue(breaker.allow())
+        self.assertFalse(breaker.allow())
+        # a failed trial opens the circuit again
+        breaker.record_failure()
+        breaker.opened_at -= 60
+        self.assertTrue(breaker.allow())
+        breaker.record_success()
+        self.assertFalse(breaker.is_open)
+        self.assertTrue(breaker.allow())
+
+
+class ZarinpalClientTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.gateway = FakeZarinpalGateway()
+        cls.server, cls.base_url = start_fake_gateway(cls.gateway)
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.server.shutdown()
+        cls.server.server_close()
+        super().tearDownClass()
+
+    def setUp(self):
+        self.client = ZarinpalClient(base_url=self.base_url, merchant='merchant', timeout=(1, 1))
+        self.user = User.objects.create_user(username='buyer', password='secret')
+
+    def checkout(self, amount=50000):
+        response = self.client.request_payment(amount)
+        self.assertTrue(response['status'])
+        self.assertTrue(response['url'].endswith(response['authority']))
+        return Transaction.objects.create(user=self.user, authority=response['authority'], pay_price=amount,
+                                          pay_status=PENDING)
+
+    def test_repeated_verification_calls_the_gateway_once(self):
+        transaction = self.checkout()
+        verify_count = self.gateway.verify_count
+
+        _, result, verified_now = verify_transaction(transaction.authority, self.client)
+        self.assertTrue(result['status'] and verified_now)
+        _, retry, verified_now = verify_transaction(transaction.authority, self.client)
+        self.assertFalse(verified_now)
+        self.assertEqual(str(retry['RefID']), str(result['RefID']))
+        self.assertEqual(self.gateway.verify_count, verify_count + 1)
+
+        transaction.refresh_from_db()
+        self.assertEqual(transaction.pay_status, SUCCESS)
+        self.assertEqual(verify_transaction('unknown', self.client), (None, None, False))
+
+    def test_rejected_verification_fails_the_transaction(self):
+        transaction = self.checkout()
+        Transaction.objects.filter(id=transaction.id).update(pay_price=1)
+        _, result, _ = verify_transaction(transaction.authority, self.client)
+        self.assertEqual(result, {'status': False, 'code': '-11'})
+        transaction.refresh_from_db()
+        self.assertEqual(transaction.pay_status, 'Failed')
+
+    def test_unreachable_gateway_keeps_the_transaction_pending(self):
+        transaction = self.checkout()
+        server, base_url = start_fake_gateway(FakeZarinpalGateway(latency=0.5))
+        try:
+            slow = ZarinpalClient(base_url=base_url, timeout=(1, 0.1), breaker=CircuitBreaker(failure_threshold=2))
+            self.assertEqual(slow.request_payment(1000), {'status': False, 'code': 'timeout'})
+            _, result, _ = verify_transaction(transaction.authority, slow)
+            self.assertEqual(result['code'], 'timeout')
+            # open now, refused without waiting for the gateway
+            self.assertEqual(slow.verify(transaction.authority, 50000), {'status': False, 'code': 'unavailable'})
+        finally:
+            server.shutdown()
+            server.server_close()
+        transaction.refresh_from_db()
+        self.assertEqual(transaction.pay_status, PENDING)
+
+
+class CheckoutTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.server, base_url = start_fake_gateway()
+        cls.client_before, gateway._client = gateway._client, ZarinpalClient(base_url=base_url, timeout=(1, 1))
+
+    @classmethod
+    def tearDownClass(cls):
+        gateway._client = cls.client_before
+        cls.server.shutdown()
+        cls.server.server_close()
+        super().tearDownClass()
+
+    def setUp(self):
+        self.user = User.objects.create_user(username='buyer', password='secret')
+        self.course = Course.objects.create(title='course', english_title='course', price=90000, installment_count=3,
+                                            progress=0, status=1)
+        self.api = APIClient()
+        self.api.force_authenticate(self.user)
+
+    def test_installments_are_counted_once_per_payment(self):
+        for number in (1, 2, 3):
+            response = self.api.post('/payment/BuyCourse/', {'course_id': self.course.id, 'is_full': False},
+                                     format='json')
+            self.assertEqual(response.status_code, 200)
+            transaction = get_transaction(response.data['authority'])
+            self.assertEqual(transaction.pay_price, 30000)
+            for _ in range(2):
+                response = APIClient().post('/payment/VerifyBuyCourse/', {'authority': transaction.authority},
+                                            format='json')
+                self.assertEqual(response.status_code, 200)
+            course_user = CourseUser.objects.get(user=self.user, course=self.course)
+            self.assertEqual(course_user.paid_installments, number)
+        self.assertTrue(course_user.is_completed)
+        self.assertEqual(course_user.transaction_course_user.filter(pay_status=SUCCESS).count(), 3)
+
+    def test_failed_credit_keeps_the_transaction_pending(self):
+        response = self.api.post('/payment/BuyCourse/', {'course_id': self.course.id, 'is_full': True},
+                                 format='json')
+        authority = response.data['authority']
+        with mock.patch('payment.views.buy_course_api.CourseUser.save', side_effect=DatabaseError('gone')):
+            with self.assertRaises(DatabaseError):
+                APIClient().post('/payment/VerifyBuyCourse/', {'authority': authority}, format='json')
+        self.assertEqual(get_transaction(authority).pay_status, PENDING)
+
+        # the retried callback is verified again (already verified for zarinpal) and credits the course
+        response = APIClient().post('/payment/VerifyBuyCourse/', {'authority': authority}, format='json')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(get_transaction(authority).pay_status, SUCCESS)
+        self.assertTrue(CourseUser.objects.get(user=self.user, course=self.course).is_completed)
 
-# Create your tests here.
+    def test_backfill_links_listed_transactions(self):
+        transactions = [Transaction.objects.create(user=self.user, authority=f'A{i}', pay_price=1000,
+                                                   pay_status=PENDING) for i in range(3)]
+        course_user = CourseUser.objects.create(course=self.course, user=self.user, is_full=False,
+                                                transactions=[transaction.id for transaction in transactions[:2]])
+        call_command('backfill_transaction_course_users', batch_size=1, stdout=StringIO())
+        self.assertEqual(get_transaction('A1').course_user, course_user)
+        self.assertIsNone(get_transaction('A2').course_user)
+        with self.assertNumQueries(1):
+            self.assertEqual(get_transaction('A0').course_user.course.title, 'course')
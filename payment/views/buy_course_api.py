@@ -3,7 +3,6 @@ import time
 from django.shortcuts import render
 
 # Create your views here.
-from django.utils import timezone
 from drf_spectacular.utils import extend_schema, OpenApiResponse
 from rest_framework import status
 from rest_framework.permissions import AllowAny
@@ -11,9 +10,10 @@ from rest_framework.response import Response
 from rest_framework.views import APIView
 
 from course.models import Course, CourseUser
+from payment.gateway import verify_transaction, get_transaction, SUCCESS
 from payment.models import Transaction
 from payment.serializers import BuyCourseRequestSerializer, BuyCourseResponseSerializer
-from payment.views import send_request, verify
+from payment.views import send_request
 
 
 class BuyCourseView(APIView):
@@ -56,11 +56,15 @@ class BuyCourseView(APIView):
                 return Response({'message': "دوره در حال حاضر برای کاربر فعال است"}, status=status.HTTP_400_BAD_REQUEST)
         if is_full:
             pay_request_response = send_request(request, course.price, course_id)
+            if not pay_request_response['status']:
+                return Response({'message': "درگاه پرداخت در دسترس نیست، لطفا دوباره تلاش کنید", **pay_request_response},
+                                status=status.HTTP_503_SERVICE_UNAVAILABLE)
             new_transaction = Transaction(
                 user=user,
                 authority=pay_request_response.get('authority'),
                 pay_price=course.price,
-                pay_status="pending"
+                pay_status="pending",
+                course_user=course_user
             )
             new_transaction.save()
             print(new_transaction)
@@ -79,18 +83,25 @@ class BuyCourseView(APIView):
                     transactions=[new_transaction.id],  # Add the transaction ID to a new list
                 )
                 course_user.save()
+                new_transaction.course_user = course_user
+                new_transaction.save(update_fields=['course_user'])
 
             return Response(pay_request_response, status=status.HTTP_200_OK)
         # not full
         else:
-            installment_price = course.price / course.installment_count
+            # the gateway takes whole rials, the same amount is stored to be verified
+            installment_price = course.price // course.installment_count
             pay_request_response = send_request(request, installment_price, course_id)
+            if not pay_request_response['status']:
+                return Response({'message': "درگاه پرداخت در دسترس نیست، لطفا دوباره تلاش کنید", **pay_request_response},
+                                status=status.HTTP_503_SERVICE_UNAVAILABLE)
             if course_user:
                 new_transaction = Transaction(
                     user=user,
                     authority=pay_request_response.get('authority'),
-                    pay_price=course.price / course.installment_count,
-                    pay_status="pending"
+                    pay_price=installment_price,
+                    pay_status="pending",
+                    course_user=course_user
                 )
                 new_transaction.save()
                 course_user.transactions.append(new_transaction.id)
@@ -101,7 +112,7 @@ class BuyCourseView(APIView):
                 new_transaction = Transaction(
                     user=user,
                     authority=pay_request_response.get('authority'),
-                    pay_price=course.price / course.installment_count,
+                    pay_price=installment_price,
                     pay_status="pending"
                 )
                 new_transaction.save()
@@ -115,10 +126,27 @@ class BuyCourseView(APIView):
                     transactions=[new_transaction.id],  # Add the transaction ID to a new list
                 )
                 course_user.save()
+                new_transaction.course_user = course_user
+                new_transaction.save(update_fields=['course_user'])
 
                 return Response(pay_request_response, status=status.HTTP_200_OK)
 
 
+def credit_course_user(transaction):
+    """
+    Credits the enrollment of a verified transaction: the whole course, or one more installment.
+    """
+    # installments of the course may be verified at the same time
+    course_user = CourseUser.objects.select_for_update().select_related('course').get(id=transaction.course_user_id)
+    if course_user.is_full:
+        course_user.is_completed = True
+    else:
+        course_user.paid_installments += 1
+        if course_user.paid_installments >= course_user.course.installment_count:
+            course_user.is_completed = True
+    course_user.save()
+
+
 class VerifyBuyCourseView(APIView):
     permission_classes = [AllowAny]
 
@@ -130,59 +158,29 @@ class VerifyBuyCourseView(APIView):
         description="Buy Initial request"
     )
     def post(self, request):
-        user = request.user
         authority = request.data.get("authority")
 
-        try:
-            transaction = Transaction.objects.get(authority=authority)
-        except Transaction.DoesNotExist:
+        transaction = get_transaction(authority)
+        if transaction is None:
             return Response({'message': "تراکنش یافت نشد."}, status=status.HTTP_400_BAD_REQUEST)
 
-        try:
-            course_user = CourseUser.objects.get(transactions__contains=transaction.id)
-        except CourseUser.DoesNotExist:
+        course_user = transaction.course_user
+        if course_user is None:
             return Response({'message': "دوره برای کاربر ایجاد نشد."}, status=status.HTTP_400_BAD_REQUEST)
-        if course_user.is_completed:
+        if course_user.is_completed and transaction.pay_status != SUCCESS:
             return Response({'message': "دوره در حال حاضر برای کاربر فعال است"}, status=status.HTTP_400_BAD_REQUEST)
 
+        # a repeated callback of the same authority gets the first result, the gateway is verified once and the
+        # course is credited in the same database transaction as the Success status
+        transaction, verify_response, _ = verify_transaction(authority, on_success=credit_course_user)
+        if not verify_response['status']:
+            return Response({'message': f"تراکنش تایید نشد کد {verify_response['code']}"},
+                            status=status.HTTP_400_BAD_REQUEST)
+
+        course_user.refresh_from_db()
         if course_user.is_full:
-            verify_response = verify(authority=authority, amount=transaction.pay_price)
-            print(verify_response)
-            if verify_response['status']:
-                transaction.pay_status = 'Success'
-                transaction.ref_id = verify_response['RefID']
-                transaction.pay_time = timezone.now()
-                transaction.save()
-
-                course_user.is_completed = True
-                course_user.save()
-                return Response(
-                    {'message': f"دوره {course_user.course.title} برای کاربر {request.user.full_name} خریداری شد!"},
-                    status=status.HTTP_400_BAD_REQUEST)
-            else:
-                transaction.status = 'Failed'
-                transaction.pay_time = timezone.now()
-                transaction.save()
-                return ({'message': f"تراکنش تایید نشد کد {str(verify_response['status'])}"})
-        # installment
+            message = f"دوره {course_user.course.title} برای کاربر {course_user.user.full_name} خریداری شد!"
         else:
-            verify_response = verify(authority=authority, amount=transaction.pay_price)
-            if verify_response['status']:
-                transaction.pay_status = 'Success'
-                transaction.ref_id = verify_response['RefID']
-                transaction.pay_time = timezone.now()
-                transaction.save()
-
-                course_user.paid_installments += 1
-                if course_user.paid_installments == course_user.course.installment_count:
-                    course_user.is_completed = True
-                    course_user.save()
-                    return Response(
-                        {
-                            'message': f"قسط {course_user.paid_installments} دوره {course_user.course.title} برای کاربر {request.user.full_name} خریداری شد!"},
-                        status=status.HTTP_400_BAD_REQUEST)
-            else:
-                transaction.status = 'Failed'
-                transaction.pay_time = timezone.now()
-                transaction.save()
-                return ({'message': f"تراکنش تایید نشد کد {str(verify_response['status'])}"})
+            message = (f"قسط {course_user.paid_installments} دوره {course_user.course.title} "
+                       f"برای کاربر {course_user.user.full_name} خریداری شد!")
+        return Response({'message': message, 'ref_id': transaction.ref_id}, status=status.HTTP_200_OK)
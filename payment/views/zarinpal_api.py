@@ -1,73 +1,17 @@
-
-import requests
-import json
-
-# ? sandbox merchant
 from django.utils.decorators import method_decorator
 from django.views.decorators.csrf import csrf_exempt
 
-from Sahand import settings
+from payment.gateway import get_gateway_client
 
-if settings.SANDBOX:
-    sandbox = 'www'
-else:
-    sandbox = 'www'
+# the gateway address, timeouts and callback url are set in the payment region of the settings
 
-ZP_API_REQUEST = f"https://{sandbox}.zarinpal.com/pg/rest/WebGate/PaymentRequest.json"
-ZP_API_VERIFY = f"https://{sandbox}.zarinpal.com/pg/rest/WebGate/PaymentVerification.json"
-ZP_API_STARTPAY = f"https://{sandbox}.zarinpal.com/pg/StartPay/"
-
-# amount = 1000  # Rial / Required
-description = "توضیحات مربوط به تراکنش را در این قسمت وارد کنید"  # Required
-phone = 'YOUR_PHONE_NUMBER'  # Optional
-# Important: need to edit for realy server.
-CallbackURL = 'http://localhost:3000/PayMent'
 
 @method_decorator(csrf_exempt, name='dispatch')
 def send_request(request, amount, course):
-    data = {
-        "MerchantID": settings.MERCHANT,
-        "Amount": amount,
-        "Description": description,
-        "Phone": phone,
-        "CallbackURL": CallbackURL,
-    }
-    data = json.dumps(data)
-    # set content length by data
-    headers = {'content-type': 'application/json', 'content-length': str(len(data))}
-    try:
-        response = requests.post(ZP_API_REQUEST, data=data, headers=headers, timeout=10)
-        if response.status_code == 200:
-            response = response.json()
-            print(response)
-            if response['Status'] == 100:
-                return {'status': True, 'url': ZP_API_STARTPAY + str(response['Authority']),
-                        'authority': response['Authority'], "course": course}
-            else:
-                return {'status': False, 'code': str(response['Status']), "course": course}
-        return response
-
-    except requests.exceptions.Timeout:
-        return {'status': False, 'code': 'timeout'}
-    except requests.exceptions.ConnectionError:
-        return {'status': False, 'code': 'connection error'}
+    response = get_gateway_client().request_payment(amount)
+    response['course'] = course
+    return response
 
 
 def verify(authority, amount):
-    data = {
-        "MerchantID": settings.MERCHANT,
-        "Amount": amount,
-        "Authority": authority,
-    }
-    data = json.dumps(data)
-    # set content length by data
-    headers = {'content-type': 'application/json', 'content-length': str(len(data))}
-    response = requests.post(ZP_API_VERIFY, data=data, headers=headers)
-
-    if response.status_code == 200:
-        response = response.json()
-        if response['Status'] == 100:
-            return {'status': True, 'RefID': response['RefID']}
-        else:
-            return {'status': False, 'code': str(response['Status'])}
-    return response
+    return get_gateway_client().verify(authority, amount)
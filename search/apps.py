@@ -0,0 +1,12 @@
+from django.apps import AppConfig
+
+
+class SearchConfig(AppConfig):
+    default_auto_field = 'django.db.models.BigAutoField'
+    name = 'search'
+
+    def ready(self):
+        from search.signals import connect_search_signals
+
+        # the index is kept up to date on save of the indexed models and their ContentManager bodies
+        connect_search_signals()
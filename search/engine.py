@@ -0,0 +1,160 @@
+import math
+import re
+from collections import Counter
+
+from django.apps import apps
+from django.db import transaction
+from django.db.models import Count, Sum, Case, When, Value, IntegerField
+from django.utils.html import strip_tags
+
+from Sahand import settings
+
+# object types of ItemOperation/Comment: (model, {field: weight}), 'content' is the body of the ContentManager
+INDEXED_MODELS = {
+    1: ('course.Course', {'title': 4, 'english_title': 2, 'tags': 3, 'abstract': 2, 'description': 2, 'content': 1}),
+    2: ('cms.Blog', {'title': 4, 'english_title': 2, 'keywords': 3, 'abstract': 2, 'content': 1}),
+    3: ('cms.WorkSample', {'title': 4, 'english_title': 2, 'tags': 3, 'abstract': 2, 'content': 1}),
+    4: ('cms.Post', {'title': 4, 'english_title': 2, 'hashtag': 3, 'content': 1}),
+    6: ('cms.Service', {'title': 4, 'english_title': 2, 'description': 2, 'content': 1}),
+}
+
+MAX_RESULTS = getattr(settings, 'SEARCH_MAX_RESULTS', 500)
+MAX_CANDIDATES = getattr(settings, 'SEARCH_MAX_CANDIDATES', 5000)
+MAX_QUERY_TERMS = 8
+MAX_TERM_LENGTH = 64
+
+# Arabic code points typed on Arabic keyboards or pasted from other sites, mapped to their Persian form
+CHARACTER_MAP = str.maketrans({
+    'ي': 'ی', 'ى': 'ی', 'ئ': 'ی',
+    'ك': 'ک',
+    'ة': 'ه', 'ۀ': 'ه',
+    'أ': 'ا', 'إ': 'ا', 'ٱ': 'ا',
+    'ؤ': 'و',
+    '۰': '0', '۱': '1', '۲': '2', '۳': '3', '۴': '4', '۵': '5', '۶': '6', '۷': '7', '۸': '8', '۹': '9',
+    '٠': '0', '١': '1', '٢': '2', '٣': '3', '٤': '4', '٥': '5', '٦': '6', '٧': '7', '٨': '8', '٩': '9',
+    '\u200c': ' ',  # zero-width non-joiner, 'می‌شود' is indexed as 'می' and 'شود'
+})
+# harakat, superscript alef and tatweel
+DIACRITICS_PATTERN = re.compile('[\u064b-\u065f\u0670\u0640]')
+TOKEN_PATTERN = re.compile(r'\w+')
+STOP_WORDS = {'و', 'در', 'به', 'از', 'که', 'را', 'با', 'این', 'آن', 'است', 'برای', 'تا', 'یا', 'هم', 'می'}
+
+
+def normalize(text):
+    return DIACRITICS_PATTERN.sub('', str(text).translate(CHARACTER_MAP)).lower()
+
+
+def tokenize(text):
+    return [token[:MAX_TERM_LENGTH] for token in TOKEN_PATTERN.findall(normalize(text))
+            if len(token) > 1 and token not in STOP_WORDS]
+
+
+def get_object_type(model):
+    for object_type, (label, _) in INDEXED_MODELS.items():
+        if model._meta.label == label:
+            return object_type
+    return None
+
+
+def field_text(instance, field):
+    if field == 'content':
+        return strip_tags(instance.content.content or '') if instance.content else ''
+    value = getattr(instance, field, None)
+    if isinstance(value, (list, tuple)):
+        return ' '.join(str(item) for item in value)
+    return value or ''
+
+
+def build_terms(instance, fields):
+    # {term: weight}, the frequency of a term is dampened so long bodies don't outrank a matching title
+    frequencies = Counter()
+    for field, weight in fields.items():
+        for token in tokenize(field_text(instance, field)):
+            frequencies[token] += weight
+    return {term: 1 + math.log(frequency) for term, frequency in frequencies.items()}
+
+
+def index_document(object_type, related_id):
+    from search.models import SearchTerm
+
+    label, fields = INDEXED_MODELS[object_type]
+    instance = apps.get_model(label).objects.select_related('content').filter(id=related_id).first()
+    with transaction.atomic():
+        SearchTerm.objects.filter(object_type=object_type, related_id=related_id).delete()
+        if instance is None or instance.is_deleted:
+            return 0
+        terms = build_terms(instance, fields)
+        SearchTerm.objects.bulk_create(
+            [SearchTerm(object_type=object_type, related_id=related_id, term=term, weight=weight)
+             for term, weight in terms.items()]
+        )
+    return len(terms)
+
+
+def remove_document(object_type, related_id):
+    from search.models import SearchTerm
+
+    SearchTerm.objects.filter(object_type=object_type, related_id=related_id).delete()
+
+
+def content_owners(content_id):
+    # (object_type, id) of the indexed documents whose body is this ContentManager
+    for object_type, (label, _) in INDEXED_MODELS.items():
+        for related_id in apps.get_model(label).objects.filter(content_id=content_id).values_list('id', flat=True):
+            yield object_type, related_id
+
+
+def rebuild_search_index():
+    from search.models import SearchTerm
+
+    SearchTerm.objects.all().delete()
+    count = 0
+    for object_type, (label, _) in INDEXED_MODELS.items():
+        for related_id in apps.get_model(label).objects.filter(is_deleted=False).values_list('id', flat=True):
+            index_document(object_type, related_id)
+            count += 1
+    return count
+
+
+def search_ids(object_type, query, limit=MAX_RESULTS):
+    """
+    Ids of the documents containing every term of the query, the most relevant first. None when the query
+    has no searchable term.
+    """
+    from search.models import SearchTerm
+
+    terms = list(dict.fromkeys(tokenize(query)))[:MAX_QUERY_TERMS]
+    if not terms:
+        return None
+    postings = SearchTerm.objects.filter(object_type=object_type)
+    if len(terms) == 1:
+        return list(postings.filter(term=terms[0]).order_by('-weight', '-related_id')
+                    .values_list('related_id', flat=True)[:limit])
+
+    # the rarest term bounds the candidates, only its best postings are looked up in the other terms.
+    # frequencies are counted up to MAX_CANDIDATES, past that any of the common terms will do
+    frequencies = {term: postings.filter(term=term).values('id')[:MAX_CANDIDATES].count() for term in terms}
+    if not all(frequencies.values()):
+        return []
+    rarest = min(terms, key=frequencies.get)
+    candidates = postings.filter(term=rarest).order_by('-weight').values('related_id')[:MAX_CANDIDATES]
+    rows = postings.filter(term__in=terms, related_id__in=candidates).values('related_id').annotate(
+        matched=Count('id'), rank=Sum('weight')
+    ).filter(matched=len(terms)).order_by('-rank', '-related_id')[:limit]
+    return [row['related_id'] for row in rows]
+
+
+def search_queryset(queryset, query):
+    """
+    Filters the queryset to the documents matching `query` and annotates `search_rank`, 0 being the most
+    relevant, so the caller can order by relevance or keep its own order. Only the MAX_RESULTS most relevant
+    documents are kept, the count of the listing is capped the same way. A query without a searchable term
+    (only stop words or single letters) matches nothing.
+    """
+    ids = search_ids(get_object_type(queryset.model), query)
+    if ids is None:
+        return queryset.none().annotate(search_rank=Value(0, output_field=IntegerField()))
+    return queryset.filter(id__in=ids).annotate(search_rank=Case(
+        *[When(id=related_id, then=Value(rank)) for rank, related_id in enumerate(ids)],
+        default=Value(len(ids)), output_field=IntegerField()
+    ))
@@ -0,0 +1,13 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from search.engine import rebuild_search_index
+
+
+class Command(BaseCommand):
+    help = "Recompute the search index of courses, blogs, work samples, posts and services"
+
+    def handle(self, *args, **options):
+        with transaction.atomic():
+            count = rebuild_search_index()
+        self.stdout.write(self.style.SUCCESS(f"{count} document(s) indexed"))
@@ -0,0 +1,28 @@
+from django.db import models
+
+
+class SearchTerm(models.Model):
+    """
+    Inverted index of the public content: one row per (document, normalized term) with the weighted
+    frequency of the term in the document. Documents are addressed like ItemOperation (object_type, related_id).
+    """
+    OBJECT_TYPE_CHOICES = [
+        (1, 'Course'),
+        (2, 'Blog'),
+        (3, 'WorkSample'),
+        (4, 'Post'),
+        (6, 'Service')
+    ]
+    object_type = models.IntegerField(choices=OBJECT_TYPE_CHOICES)
+    related_id = models.BigIntegerField()
+    term = models.CharField(max_length=64)
+    weight = models.FloatField()
+
+    class Meta:
+        db_table = 'search_term'
+        indexes = [
+            # postings of a term by relevance, and lookups of a term in given documents, both without the table
+            models.Index(fields=['object_type', 'term', '-weight', 'related_id'], name='search_term_rank_idx'),
+            models.Index(fields=['object_type', 'term', 'related_id', 'weight'], name='search_term_lookup_idx'),
+            models.Index(fields=['object_type', 'related_id'], name='search_term_document_idx'),
+        ]
@@ -0,0 +1,34 @@
+from django.apps import apps
+from django.db import transaction
+from django.db.models.signals import post_save, post_delete
+
+from search.engine import INDEXED_MODELS, get_object_type, index_document, remove_document, content_owners
+
+
+def document_saved(sender, instance, **kwargs):
+    object_type, related_id = get_object_type(sender), instance.id
+    transaction.on_commit(lambda: index_document(object_type, related_id))
+
+
+def document_deleted(sender, instance, **kwargs):
+    object_type, related_id = get_object_type(sender), instance.id
+    transaction.on_commit(lambda: remove_document(object_type, related_id))
+
+
+def content_saved(sender, instance, **kwargs):
+    content_id = instance.id
+
+    def reindex_owners():
+        for object_type, related_id in content_owners(content_id):
+            index_document(object_type, related_id)
+
+    transaction.on_commit(reindex_owners)
+
+
+def connect_search_signals():
+    for label, _ in INDEXED_MODELS.values():
+        model = apps.get_model(label)
+        post_save.connect(document_saved, sender=model, dispatch_uid=f'search_save_{label}')
+        post_delete.connect(document_deleted, sender=model, dispatch_uid=f'search_delete_{label}')
+    post_save.connect(content_saved, sender=apps.get_model('content_manager.ContentManager'),
+                      dispatch_uid='search_content_save')
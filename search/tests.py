@@ -0,0 +1,60 @@
+from django.test import TestCase
+from rest_framework.test import APIClient
+
+from cms.models import Blog
+from content_manager.models import ContentManager
+from search.engine import normalize, search_ids, rebuild_search_index
+from search.models import SearchTerm
+
+
+class SearchIndexTest(TestCase):
+    def setUp(self):
+        self.body = ContentManager.objects.create(content='<p>آموزش کامل زبان برنامه‌نویسی پايتون</p>')
+        # committed at the end of each block so the on_commit indexing runs
+        with self.captureOnCommitCallbacks(execute=True):
+            self.python = Blog.objects.create(title='آموزش پایتون', english_title='python', time=5, status=1,
+                                              content=self.body)
+            self.django = Blog.objects.create(title='آموزش جنگو', english_title='django', time=5, status=1,
+                                              abstract='فریم ورک وب بر پایه پایتون')
+            Blog.objects.create(title='طراحی سایت', english_title='design', time=5, status=1)
+
+    def test_normalization(self):
+        self.assertEqual(normalize('كتاب عربي'), normalize('کتاب عربی'))
+        self.assertEqual(search_ids(2, 'پايتون'), search_ids(2, 'پایتون'))
+
+    def test_ranking_and_all_terms_required(self):
+        # the title match outranks the abstract match
+        self.assertEqual(search_ids(2, 'پایتون'), [self.python.id, self.django.id])
+        self.assertEqual(search_ids(2, 'آموزش جنگو'), [self.django.id])
+        self.assertEqual(search_ids(2, 'کاتلین'), [])
+        self.assertIsNone(search_ids(2, ' ؟ '))
+
+    def test_body_updates_are_indexed(self):
+        self.assertEqual(search_ids(2, 'زبان'), [self.python.id])
+        with self.captureOnCommitCallbacks(execute=True):
+            self.body.content = 'راهنمای نصب'
+            self.body.save()
+        self.assertEqual(search_ids(2, 'زبان'), [])
+        self.assertEqual(search_ids(2, 'نصب'), [self.python.id])
+
+    def test_deleted_documents_leave_the_index(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            self.django.is_deleted = True
+            self.django.save()
+            self.python.delete()
+        self.assertEqual(search_ids(2, 'پایتون'), [])
+        self.assertEqual(rebuild_search_index(), 1)
+        self.assertFalse(SearchTerm.objects.filter(related_id__in=[self.python.id, self.django.id]).exists())
+
+    def test_blog_list_is_ranked(self):
+        response = APIClient().post('/Content/BlogList/', {'search': 'پايتون', 'page': 0, 'pageCount': 10},
+                                    format='json')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual([blog['id'] for blog in response.data['blogPaginationData']['blogs']],
+                         [self.python.id, self.django.id])
+
+    def test_query_without_searchable_terms_matches_nothing(self):
+        response = APIClient().post('/Content/BlogList/', {'search': 'و از ب', 'page': 0, 'pageCount': 10},
+                                    format='json')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['blogPaginationData']['blogs'], [])
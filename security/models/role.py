@@ -1,4 +1,4 @@
-from django.db import models
+from django.db import models, transaction
 
 class Role(models.Model):
     name = models.CharField(max_length=300, null=True, blank=True)
@@ -11,4 +11,32 @@ class Role(models.Model):
     status = models.IntegerField()
 
     class Meta:
-        db_table = 'security_role'
\ No newline at end of file
+        db_table = 'security_role'
+
+    def save(self, *args, **kwargs):
+        super().save(*args, **kwargs)
+        # covers Operation.update_related_roles too, which saves every role it rewrites
+        self.invalidate_permissions()
+        self.refresh_navigation()
+
+    def delete(self, *args, **kwargs):
+        from security.role_navigation import invalidate_role_navigation
+
+        role_id = self.id
+        result = super().delete(*args, **kwargs)
+        self.invalidate_permissions(role_id)
+        transaction.on_commit(lambda: invalidate_role_navigation(role_id))
+        return result
+
+    def invalidate_permissions(self, role_id=None):
+        from security.role_permissions import invalidate_role_permissions
+
+        role_id = role_id or self.id
+        # wait for the surrounding transaction, otherwise a concurrent request could cache the old features
+        transaction.on_commit(lambda: invalidate_role_permissions(role_id))
+
+    def refresh_navigation(self):
+        from security.role_navigation import store_role_navigation
+
+        # the panel menu of the new update_row_date is built once here instead of on the next panel request
+        transaction.on_commit(lambda: store_role_navigation(self))
@@ -1,10 +1,11 @@
 from django.db import models
+from django.utils import timezone
 
 class UserLog(models.Model):
     method = models.CharField(max_length=10)
     path = models.CharField(max_length=255)
     status_code = models.IntegerField()
-    timestamp = models.DateTimeField(auto_now_add=True)
+    timestamp = models.DateTimeField(default=timezone.now)  # set by the middleware, rows are written later in batches
     user = models.ForeignKey("security.User", on_delete=models.SET_NULL, null=True, blank=True, related_name='security_log_user')
     ip_address = models.GenericIPAddressField(null=True, blank=True)
     headers = models.TextField()
@@ -0,0 +1,114 @@
+from django.core.cache import cache
+
+from Sahand import settings
+from Sahand.cache_backend import is_shared_cache
+from search.engine import normalize
+
+CACHE_KEY = 'role_navigation:{}'
+CACHE_TIMEOUT = getattr(settings, 'ROLE_NAVIGATION_CACHE_TIMEOUT', 24 * 60 * 60)
+GRAM_SIZE = 3
+
+
+def build_feature_tree(features):
+    # nested menu of the panel, features whose parent is not in the menu (e.g. a sub menu) are left out
+    features = [feature for feature in features if feature.get('id') is not None]
+    nodes = {feature['id']: {**feature, 'children': []} for feature in features}
+    tree = []
+    for feature in features:
+        if feature.get('parent') is None:
+            tree.append(nodes[feature['id']])
+        elif feature['parent'] in nodes:
+            nodes[feature['parent']]['children'].append(nodes[feature['id']])
+    return tree
+
+
+def grams(text):
+    return {text[i:i + GRAM_SIZE] for i in range(len(text) - GRAM_SIZE + 1)}
+
+
+def build_search_index(features):
+    """
+    The searchable features (all but operation_type 2) with their normalized titles, and {trigram: [position]}
+    over the titles so a query only checks the titles sharing all its trigrams.
+    """
+    searchable = [feature for feature in features if feature.get('operation_type') != 2]
+    titles = [normalize(feature.get('title') or '') for feature in searchable]
+    index = {}
+    for position, title in enumerate(titles):
+        for gram in grams(title):
+            index.setdefault(gram, []).append(position)
+    return {'features': searchable, 'titles': titles, 'grams': index}
+
+
+def build_role_navigation(role):
+    features = [feature for feature in (role.features_selected or []) if isinstance(feature, dict)]
+    return {
+        'version': role.update_row_date.isoformat() if role.update_row_date else None,
+        'tree': build_feature_tree([feature for feature in features if not feature.get('isSubMenu', False)]),
+        'search': build_search_index(features),
+    }
+
+
+def store_role_navigation(role):
+    """
+    Caches the navigation of a saved role. An entry of a newer update_row_date is kept, so a request that read the
+    role before the save can't put the old menu back.
+    """
+    navigation = build_role_navigation(role)
+    current = cache.get(CACHE_KEY.format(role.id))
+    if current is None or (current['version'] or '') <= (navigation['version'] or ''):
+        cache.set(CACHE_KEY.format(role.id), navigation, CACHE_TIMEOUT)
+    return navigation
+
+
+def get_role_navigation(role_id):
+    """
+    {'version', 'tree', 'search'} of the role, None for an unknown role. The entry is shared, callers must not
+    change it. With a shared cache it is refreshed when the role is saved and a hit is a single cache read, on the
+    per-process default cache a save only reaches the process that made it, so the version is checked against
+    the role's update_row_date on every read.
+    """
+    from security.models import Role
+
+    try:
+        role_id = int(role_id)
+    except (TypeError, ValueError):
+        return None
+    navigation = cache.get(CACHE_KEY.format(role_id))
+    if is_shared_cache():
+        if navigation is not None:
+            return navigation
+    else:
+        current = Role.objects.filter(id=role_id).values('update_row_date').first()
+        if current is None:
+            return None
+        version = current['update_row_date'].isoformat() if current['update_row_date'] else None
+        if navigation is not None and navigation['version'] == version:
+            return navigation
+
+    role = Role.objects.filter(id=role_id).only('features_selected', 'update_row_date').first()
+    if role is None:
+        return None
+    return store_role_navigation(role)
+
+
+def invalidate_role_navigation(role_id):
+    cache.delete(CACHE_KEY.format(role_id))
+
+
+def search_navigation(navigation, query):
+    # features whose normalized title contains the normalized query, in menu order
+    search = navigation['search']
+    query = normalize(query).strip()
+    if not query:
+        return []
+    positions = range(len(search['titles']))
+    if len(query) >= GRAM_SIZE:
+        candidates = None
+        for gram in grams(query):
+            postings = set(search['grams'].get(gram, ()))
+            candidates = postings if candidates is None else candidates & postings
+            if not candidates:
+                return []
+        positions = sorted(candidates)
+    return [search['features'][position] for position in positions if query in search['titles'][position]]
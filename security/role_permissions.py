@@ -0,0 +1,173 @@
+import re
+import threading
+import time
+from collections import OrderedDict
+
+from django.core.cache import cache
+
+from Sahand import settings
+from Sahand.cache_backend import is_shared_cache
+
+# permission bits of a single feature, built from the flags stored in Role.features_selected
+IS_VIEW_LIST = 1
+IS_VIEW = 2
+IS_ADD = 4
+IS_EDIT = 8
+IS_DELETE = 16
+IS_SOFT_DELETE = 32
+IS_HARD_DELETE = 64
+IS_UN_DELETE = 128
+
+FEATURE_FLAGS = {
+    'isViewList': IS_VIEW_LIST,
+    'isView': IS_VIEW,
+    'isAdd': IS_ADD,
+    'isEdit': IS_EDIT,
+    'isDelete': IS_DELETE,
+    'isSoftDelete': IS_SOFT_DELETE,
+    'isHardDelete': IS_HARD_DELETE,
+    'isUnDelete': IS_UN_DELETE,
+}
+
+API_NAME_PATTERN = re.compile(r'^(.*?)(List|Get|AddOrUpdate|Delete|UnDelete)$')
+
+CACHE_KEY = 'role_permissions:{}'
+CACHE_TIMEOUT = getattr(settings, 'ROLE_PERMISSIONS_CACHE_TIMEOUT', 60 * 60)
+# how long a process trusts its local copy before re-reading the shared cache (CACHE_REDIS_URL)
+LOCAL_TTL = getattr(settings, 'ROLE_PERMISSIONS_LOCAL_TTL', 5)
+LOCAL_MAX_SIZE = getattr(settings, 'ROLE_PERMISSIONS_LOCAL_MAX_SIZE', 256)
+
+
+def build_permission_index(features_selected):
+    # {feature url: permission bits}, the first feature wins when a url is selected twice
+    index = {}
+    for feature in features_selected or []:
+        if not isinstance(feature, dict) or feature.get('url') in index:
+            continue
+        bits = 0
+        for flag, bit in FEATURE_FLAGS.items():
+            if feature.get(flag):
+                bits |= bit
+        index[feature.get('url')] = bits
+    return index
+
+
+class PermissionIndexCache:
+    """
+    Process-local LRU of role permission indexes, backed by the django cache when it is shared by the workers.
+    On the per-process default cache a saved role is only invalidated in the process that saved it, so there
+    every hit is checked against the update_row_date of the role instead.
+    """
+
+    def __init__(self, max_size, local_ttl):
+        self.max_size = max_size
+        self.local_ttl = local_ttl
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, role_id):
+        if not is_shared_cache():
+            return self._get_checked(role_id)
+
+        with self._lock:
+            entry = self._entries.get(role_id)
+            if entry and entry[0] > time.monotonic():
+                self._entries.move_to_end(role_id)
+                return entry[2]
+
+        cached = cache.get(CACHE_KEY.format(role_id))
+        if cached is None:
+            cached = self._load(role_id)
+            if cached is None:
+                return None
+            cache.set(CACHE_KEY.format(role_id), cached, CACHE_TIMEOUT)
+        self._remember(role_id, *cached)
+        return cached[1]
+
+    def _get_checked(self, role_id):
+        from security.models import Role
+
+        version = Role.objects.filter(id=role_id).values_list('update_row_date', flat=True).first()
+        if version is None:
+            self.invalidate(role_id)
+            return None
+        with self._lock:
+            entry = self._entries.get(role_id)
+            if entry and entry[1] == version:
+                self._entries.move_to_end(role_id)
+                return entry[2]
+
+        loaded = self._load(role_id)
+        if loaded is None:
+            return None
+        self._remember(role_id, *loaded)
+        return loaded[1]
+
+    def _remember(self, role_id, version, index):
+        with self._lock:
+            self._entries[role_id] = (time.monotonic() + self.local_ttl, version, index)
+            self._entries.move_to_end(role_id)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+
+    def invalidate(self, role_id):
+        cache.delete(CACHE_KEY.format(role_id))
+        with self._lock:
+            self._entries.pop(role_id, None)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def _load(self, role_id):
+        # (update_row_date, index)
+        from security.models import Role
+
+        role = Role.objects.filter(id=role_id).only('features_selected', 'update_row_date').first()
+        if role is None:
+            return None
+        return role.update_row_date, build_permission_index(role.features_selected)
+
+
+permission_index_cache = PermissionIndexCache(LOCAL_MAX_SIZE, LOCAL_TTL)
+
+
+def get_role_permissions(role_id):
+    return permission_index_cache.get(role_id)
+
+
+def invalidate_role_permissions(role_id):
+    permission_index_cache.invalidate(role_id)
+
+
+def split_api_path(path):
+    # 'cms/Blog/List/' -> ('cms/Blog/', 'List'), paths without an api name are returned unchanged
+    match = API_NAME_PATTERN.search(path.rstrip('/'))
+    if match:
+        return match.group(1), match.group(2)
+    return path, None
+
+
+def has_permission(bits, api_name, request_data):
+    if api_name == 'List':
+        return bool(bits & IS_VIEW_LIST)
+    if api_name == 'Get':
+        return bool(bits & IS_VIEW)
+    if api_name == 'Delete':
+        if not bits & IS_DELETE:
+            return False
+        delete_type = request_data.get('type')
+        # type 1, 2 => soft-delete
+        if delete_type in (1, 2) and not bits & IS_SOFT_DELETE:
+            return False
+        # type 3,4 => hard-delete
+        if delete_type in (3, 4) and not bits & IS_HARD_DELETE:
+            return False
+        return True
+    if api_name == 'UnDelete':
+        return bool(bits & IS_UN_DELETE)
+    if api_name == 'AddOrUpdate':
+        if request_data.get('id') == 0:
+            return bool(bits & IS_ADD)
+        return bool(bits & IS_EDIT)
+    return True
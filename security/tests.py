@@ -1,3 +1,162 @@
-from django.test import TestCase
+from unittest import mock
 
-# Create your tests here.
+from django.core.cache import cache
+from django.test import TestCase, TransactionTestCase
+from django.utils import timezone
+from rest_framework.response import Response
+from rest_framework.test import APIClient, APIRequestFactory, force_authenticate
+from rest_framework.views import APIView
+
+from Sahand.user_log_buffer import UserLogBuffer
+from security.models import Role, User, UserLog
+from security.role_navigation import get_role_navigation, search_navigation
+from security.role_permissions import permission_index_cache
+from utils import role_decorator
+
+
+def feature(id, title, parent=None, **kwargs):
+    return {'id': id, 'title': title, 'parent': parent, 'operation_type': 1, **kwargs}
+
+
+class BlogView(APIView):
+    @role_decorator
+    def post(self, request):
+        return Response({'message': 'ok'})
+
+
+class RolePermissionTest(TestCase):
+    def setUp(self):
+        cache.clear()
+        permission_index_cache.clear()
+        self.role = Role.objects.create(name='author', status=1, features_selected=[
+            {'id': 1, 'url': '/cms/Blog/', 'isViewList': True, 'isAdd': True, 'isDelete': True, 'isSoftDelete': True},
+        ])
+        self.user = User.objects.create_user(username='author', password='secret', roles=[self.role.id])
+
+    def post(self, path, data=None, user=None, role_id=None, token='Bearer token'):
+        headers = {'HTTP_AUTHORIZATION': token} if token else {}
+        request = APIRequestFactory().post(path, data or {}, format='json',
+                                           HTTP_ROLEID=str(role_id or self.role.id), **headers)
+        force_authenticate(request, user or self.user)
+        return BlogView.as_view()(request).status_code
+
+    def test_permission_bits(self):
+        self.assertEqual(self.post('/cms/Blog/List/'), 200)
+        self.assertEqual(self.post('/cms/Blog/Get/'), 403)
+        self.assertEqual(self.post('/cms/Blog/AddOrUpdate/', {'id': 0}), 200)
+        self.assertEqual(self.post('/cms/Blog/AddOrUpdate/', {'id': 5}), 403)
+        self.assertEqual(self.post('/cms/Blog/Delete/', {'type': 1}), 200)
+        self.assertEqual(self.post('/cms/Blog/Delete/', {'type': 3}), 403)
+        self.assertEqual(self.post('/cms/Post/List/'), 403)
+
+    def test_token_role_and_superuser(self):
+        self.assertEqual(self.post('/cms/Blog/List/', token=None), 401)
+        other = Role.objects.create(name='other', status=1, features_selected=[])
+        self.assertEqual(self.post('/cms/Blog/List/', role_id=other.id), 403)
+        admin = User.objects.create_superuser(username='admin', password='secret')
+        self.assertEqual(self.post('/cms/Post/List/', user=admin), 200)
+
+    def test_role_changed_by_another_process(self):
+        self.assertEqual(self.post('/cms/Blog/List/'), 200)
+        # no save() in this process, so nothing was invalidated here
+        Role.objects.filter(id=self.role.id).update(features_selected=[{'id': 1, 'url': '/cms/Blog/'}],
+                                                    update_row_date=timezone.now())
+        self.assertEqual(self.post('/cms/Blog/List/'), 403)
+        Role.objects.filter(id=self.role.id).delete()
+        self.assertEqual(self.post('/cms/Blog/List/'), 403)
+
+    def test_shared_cache_is_invalidated_on_commit(self):
+        with mock.patch('security.role_permissions.is_shared_cache', return_value=True):
+            self.assertEqual(self.post('/cms/Blog/List/'), 200)
+            with self.assertNumQueries(0):
+                self.assertEqual(self.post('/cms/Blog/List/'), 200)
+            self.role.features_selected = [{'id': 1, 'url': '/cms/Blog/'}]
+            with self.captureOnCommitCallbacks(execute=True):
+                self.role.save()
+            self.assertEqual(self.post('/cms/Blog/List/'), 403)
+
+
+class RoleNavigationTest(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.role = Role.objects.create(name='editor', status=1, features_selected=[
+            feature(1, 'مدیریت محتوا'),
+            feature(2, 'بلاگ ها', parent=1),
+            feature(3, 'دسته بندی بلاگ', parent=1, isSubMenu=True),
+            feature(4, 'ویرایش', parent=3),
+            feature(5, 'کاربران'),
+            feature(6, 'حذف کاربر', parent=5, operation_type=2),
+        ])
+
+    def test_tree_is_built_once(self):
+        with mock.patch('security.role_navigation.is_shared_cache', return_value=True):
+            with self.assertNumQueries(1):
+                navigation = get_role_navigation(self.role.id)
+            with self.assertNumQueries(0):
+                self.assertEqual(get_role_navigation(str(self.role.id)), navigation)
+        tree = navigation['tree']
+        self.assertEqual([(node['id'], [child['id'] for child in node['children']]) for node in tree],
+                         [(1, [2]), (5, [6])])
+        self.assertIsNone(get_role_navigation('x'))
+
+    def test_saved_role_replaces_the_cached_version(self):
+        with mock.patch('security.role_navigation.is_shared_cache', return_value=True):
+            get_role_navigation(self.role.id)
+            self.role.features_selected = [feature(7, 'تیکت ها'), {'title': 'بدون شناسه'}]
+            with self.captureOnCommitCallbacks(execute=True):
+                self.role.save()
+            with self.assertNumQueries(0):
+                navigation = get_role_navigation(self.role.id)
+        self.assertEqual([node['id'] for node in navigation['tree']], [7])
+        self.assertEqual(navigation['version'], self.role.update_row_date.isoformat())
+
+    def test_version_is_checked_on_a_per_process_cache(self):
+        navigation = get_role_navigation(self.role.id)
+        with self.assertNumQueries(1):
+            self.assertEqual(get_role_navigation(self.role.id), navigation)
+        # saved by another worker, whose cache this process does not see
+        Role.objects.filter(id=self.role.id).update(features_selected=[feature(7, 'تیکت ها')],
+                                                    update_row_date=timezone.now())
+        self.assertEqual([node['id'] for node in get_role_navigation(self.role.id)['tree']], [7])
+        Role.objects.filter(id=self.role.id).delete()
+        self.assertIsNone(get_role_navigation(self.role.id))
+
+    def test_search_is_normalized(self):
+        navigation = get_role_navigation(self.role.id)
+        # arabic yeh and kaf as typed on an arabic keyboard
+        self.assertEqual([item['id'] for item in search_navigation(navigation, 'بلاگ')], [2, 3])
+        self.assertEqual([item['id'] for item in search_navigation(navigation, 'كاربر')], [5])
+        self.assertEqual([item['id'] for item in search_navigation(navigation, 'ها')], [2])
+        self.assertEqual(search_navigation(navigation, 'تیکت'), [])
+
+    def test_panel_info_menu(self):
+        client = APIClient()
+        client.force_authenticate(User.objects.create_user(username='editor', password='secret'))
+        response = client.post('/Main/GetPanelInfo/', format='json', HTTP_ROLEID=str(self.role.id))
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual([node['id'] for node in response.data['features_selected']], [1, 5])
+
+    def test_search_endpoint(self):
+        client = APIClient()
+        client.force_authenticate(User.objects.create_user(username='editor', password='secret'))
+        response = client.post('/Main/SearchPanelMenu/', {'title': 'ويرايش'}, format='json',
+                               HTTP_ROLEID=str(self.role.id))
+        self.assertEqual([item['id'] for item in response.data], [4])
+        response = client.post('/Main/SearchPanelMenu/', {'title': 'بلاگ'}, format='json', HTTP_ROLEID='0')
+        self.assertEqual(response.status_code, 400)
+
+
+class UserLogBufferTest(TransactionTestCase):
+    def entry(self, path, user_id=None):
+        return dict(method='GET', path=path, status_code=200, timestamp=timezone.now(), user_id=user_id,
+                    ip_address='127.0.0.1', headers={})
+
+    def test_bad_row_does_not_drop_the_batch(self):
+        user = User.objects.create_user(username='reader', password='secret')
+        buffer = UserLogBuffer(batch_size=10, start_thread=False)
+        for path in ('/a/', '/b/', '/c/'):
+            buffer.add(self.entry(path, user.id if path != '/b/' else user.id + 1000))
+        self.assertEqual(buffer.flush(), 3)
+        written = UserLog.objects.filter(path__in=['/a/', '/b/', '/c/']).order_by('id')
+        self.assertEqual(list(written.values_list('path', 'user_id')),
+                         [('/a/', user.id), ('/b/', None), ('/c/', user.id)])
@@ -4,3 +4,9 @@ from django.apps import AppConfig
 class TaskManagerConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'task_manager'
+
+    def ready(self):
+        from task_manager.signals import connect_notification_signals
+
+        # the recipient rows and unread counters follow the saved notifications
+        connect_notification_signals()
@@ -0,0 +1,66 @@
+import json
+from urllib.parse import parse_qs
+
+from channels.db import database_sync_to_async
+from channels.generic.websocket import AsyncWebsocketConsumer
+
+from task_manager.notifications import get_notification_sync, notification_group, InvalidCursor
+
+
+def get_query_cursor(scope):
+    cursor = parse_qs(scope.get('query_string', b'').decode('utf-8')).get('cursor')
+    return cursor[0] if cursor else None
+
+
+class NotificationConsumer(AsyncWebsocketConsumer):
+    """
+    Notifications of the logged in user, pushed by task_manager.notifications as they are delivered together with
+    the unread count, instead of polling the panel. A reconnecting client passes the cursor of the last
+    notification it received (?cursor=... or {"type": "resume", "cursor": ...}) and gets the ones it missed.
+    """
+
+    async def connect(self):
+        self.user = self.scope.get('user')
+        if self.user is None or not self.user.is_authenticated:
+            await self.close()
+            return
+        self.group_name = notification_group(self.user.id)
+        # joined before the missed notifications are read, a notification delivered in between may come twice
+        # and is told apart by its cursor
+        await self.channel_layer.group_add(self.group_name, self.channel_name)
+        await self.accept()
+        await self.send_sync(get_query_cursor(self.scope))
+
+    async def disconnect(self, code):
+        if hasattr(self, 'group_name'):
+            await self.channel_layer.group_discard(self.group_name, self.channel_name)
+
+    async def receive(self, text_data=None, bytes_data=None):
+        try:
+            frame = json.loads(text_data or '{}')
+        except ValueError:
+            return
+        if frame.get('type') == 'resume':
+            await self.send_sync(frame.get('cursor'))
+
+    async def send_sync(self, cursor):
+        try:
+            sync = await database_sync_to_async(get_notification_sync)(self.user.id, cursor)
+        except InvalidCursor as e:
+            await self.send(text_data=json.dumps({'type': 'error', 'message': str(e)}))
+            return
+        except Exception as e:
+            print(f"Error fetching notifications: {e}")
+            return
+        await self.send(text_data=json.dumps(sync))
+
+    async def notifications_pushed(self, event):
+        if event['notifications']:
+            await self.send(text_data=json.dumps({
+                'type': 'notifications',
+                'notifications': event['notifications'],
+                'cursor': event['notifications'][-1]['cursor']
+            }))
+        if event['delta']:
+            # count is recounted once the change is committed, delta is what the change did
+            await self.send(text_data=json.dumps({'type': 'unread', 'count': event['unread'], 'delta': event['delta']}))
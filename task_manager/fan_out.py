@@ -0,0 +1,61 @@
+from django.db import transaction, connection
+from django.db.models import Count
+
+from security.models import User
+from task_manager.models import Notification, FanOutJob
+from task_manager.notifications import deliver_notifications
+from utilities.sms import enqueue_sms_bulk, NEW_TASK_TEMPLATE, PENDING, SENT, FAILED
+
+
+def fan_out_task_assignment(task_request, user=None):
+    """
+    Tells the todo_users of a new task: one Notification each, and an SMS each when the task requires it. The
+    recipients are read with one query and the rows written in bulk, the SMS are sent by the outbox workers
+    after the commit. Returns the FanOutJob the caller polls for the delivery progress.
+    """
+    recipient_ids = [int(member) for member in (task_request.todo_users or []) if str(member).isdigit()]
+    recipients = list(User.objects.filter(id__in=recipient_ids).only('id', 'phone_number', 'sex', 'full_name'))
+    project_title = task_request.task_project.title if task_request.task_project else ''
+
+    with transaction.atomic():
+        notifications = [
+            Notification(title=task_request.title, description=project_title, send_to=[recipient.id],
+                         related_section='task_request', link=str(task_request.id), status=1)
+            for recipient in recipients
+        ]
+        if connection.features.can_return_rows_from_bulk_insert:
+            deliver_notifications(Notification.objects.bulk_create(notifications))
+        else:
+            # post_save creates the recipient rows
+            for notification in notifications:
+                notification.save()
+        outbox = []
+        if task_request.requires_sms:
+            outbox = enqueue_sms_bulk([
+                (recipient.phone_number, NEW_TASK_TEMPLATE, None,
+                 [recipient.sex, recipient.full_name, task_request.title, project_title])
+                for recipient in recipients if recipient.phone_number
+            ])
+        return FanOutJob.objects.create(
+            task_request=task_request, user=user, recipients=[recipient.id for recipient in recipients],
+            notification_count=len(recipients), sms_outbox_ids=[row.id for row in outbox], status=1
+        )
+
+
+def get_fan_out_progress(job):
+    from communicating.models import SmsOutbox
+
+    counts = dict(SmsOutbox.objects.filter(id__in=job.sms_outbox_ids).values_list('delivery_status')
+                  .annotate(count=Count('id')).order_by())
+    total = len(job.sms_outbox_ids)
+    return {
+        'id': job.id,
+        'taskRequest': job.task_request_id,
+        'recipients': job.recipients,
+        'notificationCount': job.notification_count,
+        'smsTotal': total,
+        'smsPending': counts.get(PENDING, 0),
+        'smsSent': counts.get(SENT, 0),
+        'smsFailed': counts.get(FAILED, 0),
+        'isDone': counts.get(PENDING, 0) == 0,
+    }
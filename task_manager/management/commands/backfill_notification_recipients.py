@@ -0,0 +1,41 @@
+from django.core.cache import cache
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from security.models import User
+from task_manager.models import Notification, NotificationRecipient
+from task_manager.notifications import get_recipient_ids, unread_cache_key
+
+
+class Command(BaseCommand):
+    help = ("Create the NotificationRecipient rows of the existing notifications from their send_to, read when the "
+            "notification was marked as read. Rows that exist are left as they are so the command can be run again")
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=1000)
+
+    def handle(self, *args, **options):
+        batch_size = options['batch_size']
+        created = 0
+        last_id = 0
+        while True:
+            notifications = list(Notification.objects.filter(id__gt=last_id).order_by('id')
+                                 .only('id', 'send_to', 'is_read', 'is_deleted')[:batch_size])
+            if not notifications:
+                break
+            last_id = notifications[-1].id
+            existing = set(NotificationRecipient.objects.filter(notification__in=notifications)
+                           .values_list('notification_id', 'user_id'))
+            users = set(User.objects.filter(
+                id__in={user_id for notification in notifications for user_id in get_recipient_ids(notification.send_to)}
+            ).values_list('id', flat=True))
+            rows = [NotificationRecipient(notification=notification, user_id=user_id, is_read=notification.is_read,
+                                          is_deleted=notification.is_deleted, status=1)
+                    for notification in notifications for user_id in get_recipient_ids(notification.send_to)
+                    if user_id in users and (notification.id, user_id) not in existing]
+            with transaction.atomic():
+                NotificationRecipient.objects.bulk_create(rows, batch_size=batch_size)
+            # the cached counters of these users are counted again on the next read
+            cache.delete_many([unread_cache_key(user_id) for user_id in {row.user_id for row in rows}])
+            created += len(rows)
+        self.stdout.write(self.style.SUCCESS(f"{created} notification recipient(s) created"))
@@ -1,4 +1,6 @@
 from .task_done import TaskDone
 from .task_project import TaskProject
 from .task_request import TaskRequest
-from .notification import Notification
\ No newline at end of file
+from .notification import Notification
+from .fan_out_job import FanOutJob
+from .notification_recipient import NotificationRecipient
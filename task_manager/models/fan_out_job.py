@@ -0,0 +1,23 @@
+from django.db import models
+
+
+class FanOutJob(models.Model):
+    STATUS_CHOICES = [
+        (1, 'Active'),
+        (2, 'Inactive')
+    ]
+    task_request = models.ForeignKey('task_manager.TaskRequest', on_delete=models.CASCADE,
+                                     related_name='fan_out_job_task_request')
+    user = models.ForeignKey('security.User', on_delete=models.SET_NULL, null=True, blank=True,
+                             related_name='fan_out_job_user')
+    recipients = models.JSONField(default=list)
+    notification_count = models.PositiveIntegerField(default=0)
+    # communicating.SmsOutbox rows of the job, their delivery_status is the progress of the job
+    sms_outbox_ids = models.JSONField(default=list)
+    create_row_date = models.DateTimeField(auto_now_add=True)
+    update_row_date = models.DateTimeField(auto_now=True)
+    is_deleted = models.BooleanField(default=False)
+    status = models.PositiveIntegerField(choices=STATUS_CHOICES, null=True, blank=True)
+
+    class Meta:
+        db_table = 'task_manager_fan_out_job'
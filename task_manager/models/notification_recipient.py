@@ -0,0 +1,30 @@
+from django.db import models
+
+
+class NotificationRecipient(models.Model):
+    STATUS_CHOICES = [
+        (1, 'Active'),
+        (2, 'Inactive')
+    ]
+    # one row per user in Notification.send_to, kept in step by task_manager.notifications
+    notification = models.ForeignKey('task_manager.Notification', on_delete=models.CASCADE,
+                                     related_name='notification_recipient_notification')
+    user = models.ForeignKey('security.User', on_delete=models.CASCADE, related_name='notification_recipient_user')
+    is_read = models.BooleanField(default=False)
+    read_date = models.DateTimeField(null=True, blank=True)
+    create_row_date = models.DateTimeField(auto_now_add=True)
+    update_row_date = models.DateTimeField(auto_now=True)
+    # follows Notification.is_deleted
+    is_deleted = models.BooleanField(default=False)
+    status = models.PositiveIntegerField(choices=STATUS_CHOICES, null=True, blank=True)
+
+    class Meta:
+        db_table = 'task_manager_notification_recipient'
+        constraints = [
+            models.UniqueConstraint(fields=['notification', 'user'], name='notification_recipient_unique_user'),
+        ]
+        indexes = [
+            models.Index(fields=['user', 'is_read'], name='notification_unread_idx'),
+            # the notifications after a resume cursor
+            models.Index(fields=['user', 'id'], name='notification_resume_idx'),
+        ]
@@ -0,0 +1,275 @@
+import uuid
+from collections import Counter, defaultdict
+
+from asgiref.sync import async_to_sync
+from channels.layers import get_channel_layer
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import Count
+from django.utils import timezone
+
+from Sahand import settings
+from Sahand.cache_backend import is_shared_cache
+
+UNREAD_CACHE_TIMEOUT = getattr(settings, 'NOTIFICATION_UNREAD_CACHE_TIMEOUT', 300)
+RESUME_PAGE_SIZE = getattr(settings, 'NOTIFICATION_RESUME_PAGE_SIZE', 50)
+
+
+class InvalidCursor(Exception):
+    pass
+
+
+def unread_cache_key(user_id):
+    return f"notifications:unread:{user_id}"
+
+
+def unread_version_key(user_id):
+    return f"notifications:unread:version:{user_id}"
+
+
+def notification_group(user_id):
+    # channel layer group of the notification sockets of a user
+    return f"notifications_{user_id}"
+
+
+def get_recipient_ids(send_to):
+    # send_to is a list of user ids, it defaults to a dict on rows nobody filled in
+    if not isinstance(send_to, (list, tuple)):
+        return []
+    return list(dict.fromkeys(int(member) for member in send_to if str(member).isdigit()))
+
+
+def count_unread(user_ids):
+    # {user_id: unread notifications}, one grouped query over the (user, is_read) index
+    from task_manager.models import NotificationRecipient
+
+    counts = dict.fromkeys(user_ids, 0)
+    rows = NotificationRecipient.objects.filter(user_id__in=user_ids, is_read=False, is_deleted=False).values(
+        'user_id').annotate(count=Count('id')).order_by()
+    counts.update({row['user_id']: row['count'] for row in rows})
+    return counts
+
+
+def get_unread_count(user_id):
+    """
+    Unread notifications of the user. Counted live on the per-process default cache, otherwise cached as
+    (version, count): every committed change gives the user a new version (refresh_unread_counts), so a count
+    made before the change is never taken for the current one.
+    """
+    if not is_shared_cache():
+        return count_unread([user_id])[user_id]
+
+    version_key, key = unread_version_key(user_id), unread_cache_key(user_id)
+    cached = cache.get_many([version_key, key])
+    version = cached.get(version_key)
+    if version is None:
+        cache.add(version_key, uuid.uuid4().hex, None)
+        version = cache.get(version_key)
+    entry = cached.get(key)
+    if version is not None and entry is not None and entry[0] == version:
+        return entry[1]
+    count = count_unread([user_id])[user_id]
+    if version is not None:
+        cache.set(key, (version, count), UNREAD_CACHE_TIMEOUT)
+    return count
+
+
+def refresh_unread_counts(user_ids):
+    """
+    Counts the unread notifications of the users after a committed change and caches them under a new
+    version. Returns {user_id: count}.
+    """
+    user_ids = list(user_ids)
+    if not is_shared_cache():
+        return count_unread(user_ids)
+    versions = {user_id: uuid.uuid4().hex for user_id in user_ids}
+    # the new versions first, a reader counting before the change can only cache it under an old one
+    cache.set_many({unread_version_key(user_id): version for user_id, version in versions.items()}, None)
+    counts = count_unread(user_ids)
+    cache.set_many({unread_cache_key(user_id): (versions[user_id], count) for user_id, count in counts.items()},
+                   UNREAD_CACHE_TIMEOUT)
+    return counts
+
+
+async def _group_send_all(channel_layer, events):
+    for user_id, event in events.items():
+        await channel_layer.group_send(notification_group(user_id), event)
+
+
+def push_notifications(deltas, created, counts):
+    """
+    One event per user to the notification sockets (task_manager.consumers.NotificationConsumer): the new
+    notifications and the unread count. Best effort, a socket that missed it catches up with its resume cursor.
+    """
+    channel_layer = get_channel_layer()
+    if channel_layer is None:
+        return
+    events = {
+        user_id: {
+            'type': 'notifications_pushed',
+            'notifications': created.get(user_id, []),
+            'unread': counts.get(user_id),
+            'delta': deltas.get(user_id, 0),
+        }
+        for user_id in set(deltas) | set(created)
+    }
+    try:
+        async_to_sync(_group_send_all)(channel_layer, events)
+    except Exception as e:
+        print(f"Error pushing notifications: {e}")
+
+
+def adjust_unread_counts(deltas, created=None):
+    """
+    Once the change is committed, recounts the unread notifications of the users of {user_id: delta} and pushes
+    them with the {user_id: [notification payload, ...]} of the new recipient rows to the connected users.
+    """
+    deltas = {user_id: delta for user_id, delta in deltas.items() if delta}
+    created = created or {}
+    if deltas or created:
+        transaction.on_commit(
+            lambda: push_notifications(deltas, created, refresh_unread_counts(set(deltas) | set(created)))
+        )
+
+
+def notification_payload(recipient, notification=None):
+    notification = notification or recipient.notification
+    return {
+        'cursor': recipient.id,
+        'id': notification.id,
+        'title': notification.title,
+        'description': notification.description,
+        'link': notification.link,
+        'photo': notification.photo_id,
+        'relatedSection': notification.related_section,
+        'isRead': recipient.is_read,
+        'createRowDate': notification.create_row_date.isoformat() if notification.create_row_date else None,
+    }
+
+
+def created_payloads(rows, notifications):
+    # {user_id: [payload, ...]} of new recipient rows, for the notifications that are not deleted
+    created = defaultdict(list)
+    for row in rows:
+        notification = notifications[row.notification_id]
+        if not notification.is_deleted:
+            created[row.user_id].append(notification_payload(row, notification))
+    return dict(created)
+
+
+def deliver_notifications(notifications):
+    """
+    Creates the recipient rows of new notifications, e.g. after a bulk_create that sent no post_save.
+    """
+    from security.models import User
+    from task_manager.models import NotificationRecipient
+
+    user_ids = {user_id for notification in notifications for user_id in get_recipient_ids(notification.send_to)}
+    users = set(User.objects.filter(id__in=user_ids).values_list('id', flat=True))
+    rows = [NotificationRecipient(notification=notification, user_id=user_id, is_deleted=notification.is_deleted,
+                                  status=1)
+            for notification in notifications for user_id in get_recipient_ids(notification.send_to)
+            if user_id in users]
+    rows = NotificationRecipient.objects.bulk_create(rows)
+    adjust_unread_counts(Counter(row.user_id for row in rows if not row.is_deleted),
+                         created_payloads(rows, {notification.id: notification for notification in notifications}))
+    return rows
+
+
+def sync_recipients(notification):
+    """
+    Brings the recipient rows of a saved notification in line with its send_to and is_deleted.
+    """
+    from security.models import User
+    from task_manager.models import NotificationRecipient
+
+    recipients = NotificationRecipient.objects.filter(notification=notification)
+    # user_id: (is_read, is_deleted)
+    current = {user_id: (is_read, is_deleted)
+               for user_id, is_read, is_deleted in recipients.values_list('user_id', 'is_read', 'is_deleted')}
+    wanted = set(get_recipient_ids(notification.send_to))
+    deltas = Counter()
+    rows = []
+
+    removed = [user_id for user_id in current if user_id not in wanted]
+    if removed:
+        recipients.filter(user_id__in=removed).delete()
+        deltas.subtract(user_id for user_id in removed if current[user_id] == (False, False))
+
+    toggled = [user_id for user_id in current if user_id in wanted and current[user_id][1] != notification.is_deleted]
+    if toggled:
+        recipients.filter(user_id__in=toggled).update(is_deleted=notification.is_deleted,
+                                                      update_row_date=timezone.now())
+        unread = Counter(user_id for user_id in toggled if not current[user_id][0])
+        if notification.is_deleted:
+            deltas.subtract(unread)
+        else:
+            deltas.update(unread)
+
+    added = wanted - set(current)
+    if added:
+        users = User.objects.filter(id__in=added).values_list('id', flat=True)
+        rows = NotificationRecipient.objects.bulk_create([
+            NotificationRecipient(notification=notification, user_id=user_id, is_deleted=notification.is_deleted,
+                                  status=1)
+            for user_id in users
+        ])
+        if not notification.is_deleted:
+            deltas.update(row.user_id for row in rows)
+    adjust_unread_counts(deltas, created_payloads(rows, {notification.id: notification}))
+
+
+def forget_recipients(notification):
+    # the rows go with the notification (CASCADE), only the counters are left to update
+    from task_manager.models import NotificationRecipient
+
+    unread = NotificationRecipient.objects.filter(notification=notification, is_read=False, is_deleted=False)
+    adjust_unread_counts({user_id: -1 for user_id in unread.values_list('user_id', flat=True)})
+
+
+def mark_read(user_id, notification_ids=None):
+    """
+    Marks the notifications of the user as read, all of them without `notification_ids`. A notification already
+    read is not counted twice, also under concurrent requests. Returns the number of notifications marked.
+    """
+    from task_manager.models import NotificationRecipient
+
+    now = timezone.now()
+    recipients = NotificationRecipient.objects.filter(user_id=user_id, is_read=False, is_deleted=False)
+    if notification_ids is not None:
+        recipients = recipients.filter(notification_id__in=notification_ids)
+    with transaction.atomic():
+        marked = recipients.update(is_read=True, read_date=now, update_row_date=now)
+        adjust_unread_counts({user_id: -marked})
+    return marked
+
+
+def get_notification_sync(user_id, cursor=None, limit=RESUME_PAGE_SIZE):
+    """
+    The frame a notification socket starts with. With the cursor of the last notification the client has seen,
+    the ones delivered since then, oldest first and `limit` at a time. Without one only the current cursor.
+    """
+    from task_manager.models import NotificationRecipient
+
+    recipients = NotificationRecipient.objects.filter(user_id=user_id, is_deleted=False)
+    notifications = []
+    has_more = False
+    if cursor is None or cursor == '':
+        cursor = recipients.order_by('-id').values_list('id', flat=True).first() or 0
+    else:
+        try:
+            cursor = int(cursor)
+        except (TypeError, ValueError):
+            raise InvalidCursor('cursor نامعتبر است.')
+        rows = list(recipients.filter(id__gt=cursor).select_related('notification').order_by('id')[:limit + 1])
+        has_more = len(rows) > limit
+        notifications = [notification_payload(row) for row in rows[:limit]]
+        if notifications:
+            cursor = notifications[-1]['cursor']
+    return {
+        'type': 'sync',
+        'notifications': notifications,
+        'cursor': cursor,
+        'hasMore': has_more,
+        'unread': get_unread_count(user_id),
+    }
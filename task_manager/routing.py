@@ -0,0 +1,7 @@
+from django.urls import re_path
+
+from task_manager.consumers import NotificationConsumer
+
+websocket_urlpatterns = [
+    re_path(r'ws/notifications/$', NotificationConsumer.as_asgi()),
+]
@@ -154,6 +154,18 @@ class TaskDoneListSerializer(serializers.Serializer):
 # endregion
 # region
 
+class FanOutJobSerializer(serializers.Serializer):
+    id = serializers.IntegerField()
+    taskRequest = serializers.IntegerField()
+    recipients = serializers.ListField(child=serializers.IntegerField())
+    notificationCount = serializers.IntegerField()
+    smsTotal = serializers.IntegerField()
+    smsPending = serializers.IntegerField()
+    smsSent = serializers.IntegerField()
+    smsFailed = serializers.IntegerField()
+    isDone = serializers.BooleanField()
+
+
 class NotificationSerializer(serializers.ModelSerializer):
     id = serializers.IntegerField()
     send_to_detail = serializers.SerializerMethodField()
@@ -193,6 +205,17 @@ class NotificationListSerializer(serializers.Serializer):
     propertiesAttribute = serializers.ListField(child=ListPropertiesAttributeSerializer())
 
 
+class NotificationMarkReadRequestSerializer(serializers.Serializer):
+    ids = serializers.ListField(child=serializers.IntegerField(), required=False,
+                                help_text="can be empty to mark all notifications of the user as read")
+
+
+class NotificationMarkReadResponseSerializer(serializers.Serializer):
+    message = serializers.CharField()
+    marked = serializers.IntegerField()
+    countNotReadMessage = serializers.IntegerField()
+
+
 # endregion
 class TaskProjectIdSerializer(serializers.Serializer):
     page = serializers.IntegerField(required=False)
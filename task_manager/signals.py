@@ -0,0 +1,17 @@
+from django.db.models.signals import post_save, pre_delete
+
+from task_manager.models import Notification
+from task_manager.notifications import sync_recipients, forget_recipients
+
+
+def notification_saved(sender, instance, **kwargs):
+    sync_recipients(instance)
+
+
+def notification_deleted(sender, instance, **kwargs):
+    forget_recipients(instance)
+
+
+def connect_notification_signals():
+    post_save.connect(notification_saved, sender=Notification, dispatch_uid='task_manager_notification_save')
+    pre_delete.connect(notification_deleted, sender=Notification, dispatch_uid='task_manager_notification_delete')
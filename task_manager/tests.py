@@ -1,3 +1,205 @@
-from django.test import TestCase
+from unittest import mock
 
-# Create your tests here.
+from channels.db import database_sync_to_async
+from channels.routing import URLRouter
+from channels.testing import WebsocketCommunicator
+from django.core.cache import cache
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from rest_framework.test import APIClient
+from rest_framework_simplejwt.tokens import AccessToken
+
+from chat.middleware import JWTAuthMiddlewareStack
+
+from communicating.models import SmsOutbox
+from security.models import User
+from task_manager.models import TaskProject, Notification, NotificationRecipient
+from task_manager.notifications import get_unread_count, mark_read, unread_cache_key, unread_version_key
+from task_manager.routing import websocket_urlpatterns
+from utilities import sms
+
+
+class TaskAssignmentFanOutTest(TestCase):
+    def setUp(self):
+        self.admin = User.objects.create_superuser(username='admin', password='secret')
+        self.members = [User.objects.create_user(username=f'member{i}', phone_number=f'0912000000{i}',
+                                                 full_name=f'member {i}', sex='آقای') for i in range(6)]
+        self.task_project = TaskProject.objects.create(title='project')
+        self.client = APIClient()
+        self.client.force_authenticate(self.admin)
+
+    def create_task(self, members, requires_sms=True):
+        return self.client.post('/taskManager/TaskRequestAddOrUpdate/', {
+            'id': 0, 'title': 'task', 'todo_users': [member.id for member in members],
+            'task_project': self.task_project.id, 'requires_sms': requires_sms,
+        }, format='json', HTTP_AUTHORIZATION='Bearer token')
+
+    def fan_out_query_count(self, members):
+        with mock.patch.object(sms, 'submit_sms'), CaptureQueriesContext(connection) as queries:
+            response = self.create_task(members)
+        self.assertEqual(response.status_code, 200)
+        return len(queries.captured_queries), response
+
+    def test_fan_out_is_bulk_and_pollable(self):
+        few, _ = self.fan_out_query_count(self.members[:2])
+        many, response = self.fan_out_query_count(self.members)
+        self.assertEqual(many, few)
+
+        self.assertEqual(Notification.objects.filter(send_to=[self.members[5].id]).count(), 1)
+        self.assertEqual(SmsOutbox.objects.filter(phone=self.members[5].phone_number).count(), 1)
+
+        job = self.client.post('/taskManager/TaskRequestFanOutJob/', {'id': response.data['jobId']},
+                               format='json').data
+        self.assertEqual((job['smsTotal'], job['smsPending'], job['isDone']), (6, 6, False))
+
+        provider = sms.FakeSmsProvider()
+        sms.deliver_due_sms(provider)
+        job = self.client.post('/taskManager/TaskRequestFanOutJob/', {'id': response.data['jobId']},
+                               format='json').data
+        self.assertEqual((job['smsSent'], job['isDone']), (6, True))
+        # with the 2 messages of the first task
+        self.assertEqual(len(provider.sent), 8)
+
+    def test_job_of_another_user_is_hidden(self):
+        _, response = self.fan_out_query_count(self.members[:1])
+        client = APIClient()
+        client.force_authenticate(self.members[0])
+        response = client.post('/taskManager/TaskRequestFanOutJob/', {'id': response.data['jobId']}, format='json')
+        self.assertEqual(response.status_code, 400)
+
+
+class NotificationRecipientTest(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.users = [User.objects.create_user(username=f'user{i}', password='secret') for i in range(2)]
+
+    def notify(self, users, **kwargs):
+        with self.captureOnCommitCallbacks(execute=True):
+            return Notification.objects.create(title='notification', related_section='test',
+                                               send_to=[user.id for user in users], **kwargs)
+
+    def unread(self, user):
+        with CaptureQueriesContext(connection) as queries:
+            count = get_unread_count(user.id)
+        return count, len(queries.captured_queries)
+
+    def test_counter_is_kept_without_counting_again(self):
+        first, second = self.users
+        with mock.patch('task_manager.notifications.is_shared_cache', return_value=True):
+            self.notify(self.users)
+            self.assertEqual(self.unread(first), (1, 0))
+            self.notify([first])
+            self.assertEqual(self.unread(first), (2, 0))
+
+            with self.captureOnCommitCallbacks(execute=True):
+                self.assertEqual(mark_read(first.id), 2)
+                self.assertEqual(mark_read(first.id), 0)
+            self.assertEqual(self.unread(first), (0, 0))
+            # read per recipient
+            self.assertEqual(self.unread(second), (1, 0))
+
+            # expired, counted again
+            cache.delete(unread_cache_key(second.id))
+            self.assertEqual(self.unread(second), (1, 1))
+            self.assertEqual(self.unread(second), (1, 0))
+
+    def test_count_made_before_a_change_is_not_kept(self):
+        first = self.users[0]
+        with mock.patch('task_manager.notifications.is_shared_cache', return_value=True):
+            self.assertEqual(self.unread(first), (0, 1))
+            version = cache.get(unread_version_key(first.id))
+            self.notify([first])
+            # a reader that counted before the commit stores its count once the change is in
+            cache.set(unread_cache_key(first.id), (version, 0))
+            self.assertEqual(self.unread(first), (1, 1))
+
+    def test_counted_live_on_a_per_process_cache(self):
+        first = self.users[0]
+        self.notify([first])
+        self.assertEqual(self.unread(first), (1, 1))
+        # e.g. marked read by another worker, whose cache this process does not see
+        NotificationRecipient.objects.filter(user=first).update(is_read=True)
+        self.assertEqual(self.unread(first), (0, 1))
+
+    def test_deleted_and_removed_recipients_are_not_counted(self):
+        first, second = self.users
+        with mock.patch('task_manager.notifications.is_shared_cache', return_value=True):
+            notification = self.notify(self.users)
+            self.assertEqual((self.unread(first)[0], self.unread(second)[0]), (1, 1))
+
+            notification.is_deleted = True
+            with self.captureOnCommitCallbacks(execute=True):
+                notification.save()
+            self.assertEqual(self.unread(first), (0, 0))
+
+            notification.is_deleted = False
+            notification.send_to = [first.id]
+            with self.captureOnCommitCallbacks(execute=True):
+                notification.save()
+            self.assertEqual((self.unread(first)[0], self.unread(second)[0]), (1, 0))
+            self.assertEqual(NotificationRecipient.objects.filter(notification=notification).count(), 1)
+
+            with self.captureOnCommitCallbacks(execute=True):
+                notification.delete()
+            self.assertEqual(self.unread(first), (0, 0))
+
+    def test_mark_read_endpoint(self):
+        notifications = [self.notify(self.users) for _ in range(3)]
+        # the badge the panel has shown
+        self.assertEqual(get_unread_count(self.users[0].id), 3)
+        client = APIClient()
+        client.force_authenticate(self.users[0])
+        with self.captureOnCommitCallbacks(execute=True):
+            response = client.post('/taskManager/NotificationMarkRead/', {'ids': [notifications[0].id]}, format='json')
+        self.assertEqual(response.data['marked'], 1)
+        self.assertEqual(get_unread_count(self.users[0].id), 2)
+        with self.captureOnCommitCallbacks(execute=True):
+            response = client.post('/taskManager/NotificationMarkRead/', {}, format='json')
+        self.assertEqual(response.data['marked'], 2)
+        self.assertEqual(get_unread_count(self.users[0].id), 0)
+
+
+@override_settings(CHANNEL_LAYERS={'default': {'BACKEND': 'channels.layers.InMemoryChannelLayer'}})
+class NotificationConsumerTest(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.application = JWTAuthMiddlewareStack(URLRouter(websocket_urlpatterns))
+        self.user = User.objects.create_user(username='member', password='secret')
+        self.token = str(AccessToken.for_user(self.user))
+
+    def notify(self, title):
+        with self.captureOnCommitCallbacks(execute=True):
+            Notification.objects.create(title=title, related_section='test', send_to=[self.user.id])
+
+    async def connect(self, query=''):
+        communicator = WebsocketCommunicator(self.application, f'/ws/notifications/?token={self.token}{query}')
+        connected, _ = await communicator.connect()
+        self.assertTrue(connected)
+        return communicator, await communicator.receive_json_from()
+
+    async def test_rejects_anonymous(self):
+        connected, _ = await WebsocketCommunicator(self.application, '/ws/notifications/').connect()
+        self.assertFalse(connected)
+
+    async def test_push_and_resume(self):
+        await database_sync_to_async(self.notify)('before')
+        communicator, sync = await self.connect()
+        self.assertEqual((sync['type'], sync['notifications'], sync['unread']), ('sync', [], 1))
+
+        await database_sync_to_async(self.notify)('live')
+        pushed = await communicator.receive_json_from()
+        self.assertEqual([notification['title'] for notification in pushed['notifications']], ['live'])
+        self.assertGreater(pushed['cursor'], sync['cursor'])
+        self.assertEqual(await communicator.receive_json_from(), {'type': 'unread', 'count': 2, 'delta': 1})
+        await communicator.disconnect()
+
+        for title in ('missed 1', 'missed 2'):
+            await database_sync_to_async(self.notify)(title)
+        communicator, sync = await self.connect(f'&cursor={pushed["cursor"]}')
+        self.assertEqual([notification['title'] for notification in sync['notifications']], ['missed 1', 'missed 2'])
+        self.assertEqual((sync['hasMore'], sync['unread']), (False, 4))
+
+        await communicator.send_json_to({'type': 'resume', 'cursor': 'x'})
+        self.assertEqual((await communicator.receive_json_from())['type'], 'error')
+        await communicator.disconnect()
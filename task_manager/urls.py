@@ -7,9 +7,9 @@ from task_manager.views import (TaskProjectAddOrUpdateView, TaskProjectGetListVi
                                 TaskDoneUndeleteView, TaskRequestAddOrUpdateView, TaskRequestGetListView,
                                 TaskRequestGetView, TaskRequestDeleteView, TaskRequestUndeleteView,
                                 NotificationAddOrUpdateView, NotificationGetListView, NotificationGetView, \
-                                NotificationDeleteView, NotificationUndeleteView)
+                                NotificationDeleteView, NotificationUndeleteView, NotificationMarkReadView)
 from task_manager.views.task_project_api import IsUserTaskProjectManagerrView
-from task_manager.views.task_request_api import MyTasksGetView, TaskRequestNoteListView
+from task_manager.views.task_request_api import MyTasksGetView, TaskRequestNoteListView, TaskRequestFanOutJobGetView
 
 urlpatterns = [
     # task_project
@@ -35,6 +35,7 @@ urlpatterns = [
     path('TaskRequestUnDelete/', TaskRequestUndeleteView.as_view(), name="task_req_undelete"),
     path('MyTaskGet/', MyTasksGetView.as_view(), name="get_my_tasks"),
     path('TaskRequestNoteList/', TaskRequestNoteListView.as_view(), name="task_note_list"),
+    path('TaskRequestFanOutJob/', TaskRequestFanOutJobGetView.as_view(), name="task_req_fan_out_job"),
 
     # notification
     path('NotificationAddOrUpdate/', NotificationAddOrUpdateView.as_view(), name="notification_add_or_update"),
@@ -42,5 +43,6 @@ urlpatterns = [
     path('NotificationGet/', NotificationGetView.as_view(), name="notification_get"),
     path('NotificationDelete/', NotificationDeleteView.as_view(), name="notification_delete"),
     path('NotificationUnDelete/', NotificationUndeleteView.as_view(), name="notification_undelete"),
+    path('NotificationMarkRead/', NotificationMarkReadView.as_view(), name="notification_mark_read"),
 
 ]
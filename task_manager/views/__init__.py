@@ -5,4 +5,4 @@ from .task_request_api import TaskRequestAddOrUpdateView, TaskRequestGetListView
 from .task_project_api import TaskProjectAddOrUpdateView, TaskProjectGetListView, TaskProjectGetView, \
     TaskProjectDeleteView, TaskProjectUndeleteView
 from .notification_api import NotificationAddOrUpdateView, NotificationGetListView, NotificationGetView, \
-    NotificationDeleteView, NotificationUndeleteView
+    NotificationDeleteView, NotificationUndeleteView, NotificationMarkReadView
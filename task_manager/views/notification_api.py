@@ -7,7 +7,9 @@ from rest_framework import status
 
 from serializers import MessageAndIdSerializer, ListRequestSerializer, DeleteSerializer, UrlSerializer
 from task_manager.models import Notification
-from task_manager.serializers import NotificationSerializer, NotificationGetSerializer, NotificationListSerializer
+from task_manager.notifications import mark_read, get_unread_count
+from task_manager.serializers import NotificationSerializer, NotificationGetSerializer, NotificationListSerializer, \
+    NotificationMarkReadRequestSerializer, NotificationMarkReadResponseSerializer
 from utils import role_decorator
 
 
@@ -102,7 +104,7 @@ class NotificationGetListView(APIView):
 
         notifications = Notification.objects.filter(query)
         if user_id is not None:
-            notifications = notifications.filter(send_to__contains=[user_id])
+            notifications = notifications.filter(notification_recipient_notification__user_id=user_id)
 
         # Sorting
         if sort:
@@ -876,3 +878,22 @@ class NotificationUndeleteView(APIView):
         else:
             # If the cms was not soft-deleted
             return Response({"message": "اعلان مورد نظر حذف نشده است."}, status=status.HTTP_400_BAD_REQUEST)
+
+
+class NotificationMarkReadView(APIView):
+
+    @extend_schema(
+        request=NotificationMarkReadRequestSerializer,
+        responses={200: OpenApiResponse(response=NotificationMarkReadResponseSerializer)},
+        description="Mark notifications of the current user as read"
+    )
+    def post(self, request):
+        serializer = NotificationMarkReadRequestSerializer(data=request.data)
+        if not serializer.is_valid():
+            return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+        marked = mark_read(request.user.id, serializer.validated_data.get('ids'))
+        return Response({
+            'message': "اعلان ها خوانده شدند.",
+            'marked': marked,
+            'countNotReadMessage': get_unread_count(request.user.id)
+        }, status=status.HTTP_200_OK)
@@ -5,12 +5,11 @@ from rest_framework.views import APIView
 from rest_framework.response import Response
 from rest_framework import status
 
-from security.models import User
 from serializers import MessageAndIdSerializer, ListRequestSerializer, DeleteSerializer, UrlSerializer, IdSerializer
-from task_manager.models import TaskRequest, TaskProject
+from task_manager.fan_out import fan_out_task_assignment, get_fan_out_progress
+from task_manager.models import TaskRequest, TaskProject, FanOutJob
 from task_manager.serializers import TaskRequestSerializer, TaskRequestGetSerializer, TaskRequestListSerializer, \
-    TaskProjectIdSerializer
-from utilities.sms import send_sms_new_task
+    TaskProjectIdSerializer, FanOutJobSerializer
 from utils import role_decorator
 
 
@@ -31,12 +30,10 @@ class TaskRequestAddOrUpdateView(APIView):
             if serializer.is_valid():
                 task_request = serializer.save()
 
-                if task_request.requires_sms:
-                    for member in task_request.todo_users:
-                        user = User.objects.get(id=member)
-                        send_sms_new_task(user.phone_number, user.sex, user.full_name, task_request.title,
-                                          task_request.task_project.title)
-                return Response({"message": "درخواست تسک با موفقیت ایجاد شد!", "id": serializer.instance.id},
+                # notifications and SMS of the members are delivered in the background, see jobId
+                job = fan_out_task_assignment(task_request, request.user)
+                return Response({"message": "درخواست تسک با موفقیت ایجاد شد!", "id": serializer.instance.id,
+                                 "jobId": job.id},
                                 status=status.HTTP_200_OK)
 
             return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
@@ -57,6 +54,20 @@ class TaskRequestAddOrUpdateView(APIView):
         return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
 
 
+class TaskRequestFanOutJobGetView(APIView):
+
+    @extend_schema(
+        request=IdSerializer,
+        responses={200: OpenApiResponse(response=FanOutJobSerializer)},
+        description="Delivery progress of the notifications of a new task"
+    )
+    def post(self, request):
+        job = FanOutJob.objects.filter(id=request.data.get('id', 0), is_deleted=False).first()
+        if job is None or (job.user_id != request.user.id and not request.user.is_superuser):
+            return Response({'message': 'عملیات مورد نظر یافت نشد.'}, status=status.HTTP_400_BAD_REQUEST)
+        return Response(get_fan_out_progress(job), status=status.HTTP_200_OK)
+
+
 class TaskRequestPagination(PageNumberPagination):
     page_size = 10
     max_page_size = 100
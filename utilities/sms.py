@@ -1,79 +1,227 @@
 import json
+import random
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
+
 import requests
+from django.db import transaction, close_old_connections
+from django.utils import timezone
+from requests.adapters import HTTPAdapter
+
+from Sahand import settings
 
 api_key = '39eeadfb9773068680aa733a485f7098'
 url = "https://api.msgway.com/send"
 
+PENDING = 1
+SENT = 2
+FAILED = 3
+
+MAX_ATTEMPTS = getattr(settings, 'SMS_MAX_ATTEMPTS', 5)
+RETRY_BACKOFF = getattr(settings, 'SMS_RETRY_BACKOFF', 2.0)
+# longer than the provider timeout, a row still claimed after that was left by a dead worker
+CLAIM_TIMEOUT = 60
+
+
+class SmsProviderError(Exception):
+    pass
+
+
+class MsgwayProvider:
+    """
+    Sends through msgway over one keep-alive session, shared by the outbox workers.
+    """
+
+    def __init__(self, timeout=(3, 10), pool_size=10):
+        self.timeout = timeout
+        self.session = requests.Session()
+        self.session.headers.update({
+            "apiKey": api_key,
+            "accept-language": "fa",
+            "Content-Type": "application/json"
+        })
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=pool_size)
+        self.session.mount('https://', adapter)
+
+    def send(self, body):
+        try:
+            response = self.session.post(url, data=json.dumps(body), timeout=self.timeout)
+        except requests.RequestException as e:
+            raise SmsProviderError(str(e))
+        if response.status_code >= 400:
+            raise SmsProviderError(f"{response.status_code}: {response.text[:500]}")
+        return response.text
+
+
+class FakeSmsProvider:
+    """
+    Keeps the messages in memory instead of sending them, with an optional delay and failure rate, for tests,
+    local development and benchmarks.
+    """
+
+    def __init__(self, latency=0.0, failure_rate=0.0):
+        self.latency = latency
+        self.failure_rate = failure_rate
+        self.sent = []
+        self._lock = threading.Lock()
+
+    def send(self, body):
+        if self.latency:
+            time.sleep(self.latency)
+        if self.failure_rate and random.random() < self.failure_rate:
+            raise SmsProviderError("fake provider failure")
+        with self._lock:
+            self.sent.append(body)
+        return 'ok'
+
+
+_provider = None
+_executor = None
+_lock = threading.Lock()
+
+
+def get_sms_provider():
+    global _provider
+    if _provider is None:
+        with _lock:
+            if _provider is None:
+                if getattr(settings, 'SMS_PROVIDER', 'msgway') == 'fake':
+                    _provider = FakeSmsProvider()
+                else:
+                    _provider = MsgwayProvider(timeout=getattr(settings, 'SMS_TIMEOUT', (3, 10)),
+                                               pool_size=getattr(settings, 'SMS_WORKERS', 4))
+    return _provider
+
+
+def get_executor():
+    global _executor
+    if _executor is None:
+        with _lock:
+            if _executor is None:
+                _executor = ThreadPoolExecutor(max_workers=getattr(settings, 'SMS_WORKERS', 4),
+                                               thread_name_prefix='sms-outbox')
+    return _executor
+
+
+def submit_sms(outbox_id, delay=0):
+    if delay:
+        timer = threading.Timer(delay, submit_sms, args=(outbox_id,))
+        timer.daemon = True
+        timer.start()
+        return
+    get_executor().submit(run_delivery, outbox_id)
+
+
+def run_delivery(outbox_id):
+    try:
+        deliver_sms(outbox_id)
+    except Exception as e:
+        print(f"SMS {outbox_id} delivery failed: {e}")
+    finally:
+        close_old_connections()
+
+
+def enqueue_sms(phone, template_id, code=None, params=None):
+    """
+    Stores the message in the outbox and hands it to the worker pool once the surrounding transaction is
+    committed, the caller never waits for the provider.
+    """
+    from communicating.models import SmsOutbox
+
+    outbox = SmsOutbox.objects.create(phone=str(phone), template_id=template_id, code=code, params=params or [],
+                                      next_attempt_date=timezone.now(), status=1)
+    transaction.on_commit(lambda: submit_sms(outbox.id))
+    return outbox
+
+
+def enqueue_sms_bulk(messages):
+    """
+    enqueue_sms for many messages, [(phone, template_id, code, params), ...], with one insert.
+    """
+    from django.db import connection
+    from communicating.models import SmsOutbox
+
+    now = timezone.now()
+    rows = [SmsOutbox(phone=str(phone), template_id=template_id, code=code, params=params or [],
+                      next_attempt_date=now, status=1)
+            for phone, template_id, code, params in messages]
+    if connection.features.can_return_rows_from_bulk_insert:
+        rows = SmsOutbox.objects.bulk_create(rows)
+    else:
+        for row in rows:
+            row.save()
+    ids = [row.id for row in rows]
+    transaction.on_commit(lambda: [submit_sms(outbox_id) for outbox_id in ids])
+    return rows
+
+
+def deliver_sms(outbox_id, provider=None):
+    """
+    One delivery attempt of a pending outbox row. A failed attempt is retried after RETRY_BACKOFF * 2^n
+    seconds, the row is marked as failed after MAX_ATTEMPTS.
+    """
+    from communicating.models import SmsOutbox
+
+    outbox = SmsOutbox.objects.filter(id=outbox_id, delivery_status=PENDING).first()
+    if outbox is None:
+        return None
+    # claimed for the attempt, send_pending_sms skips it meanwhile and a second worker gets 0 rows
+    claimed = SmsOutbox.objects.filter(
+        id=outbox.id, delivery_status=PENDING, next_attempt_date=outbox.next_attempt_date
+    ).update(next_attempt_date=timezone.now() + timedelta(seconds=CLAIM_TIMEOUT))
+    if not claimed:
+        return None
+
+    try:
+        (provider or get_sms_provider()).send(outbox.body())
+    except Exception as e:
+        outbox.attempts += 1
+        outbox.last_error = str(e)
+        if outbox.attempts >= MAX_ATTEMPTS:
+            outbox.delivery_status = FAILED
+            outbox.next_attempt_date = None
+            print(f"SMS {outbox.id} to {outbox.phone} failed: {e}")
+        else:
+            delay = RETRY_BACKOFF * 2 ** (outbox.attempts - 1)
+            outbox.next_attempt_date = timezone.now() + timedelta(seconds=delay)
+            if provider is None:
+                submit_sms(outbox.id, delay)
+        outbox.save()
+        return outbox.delivery_status
+
+    outbox.attempts += 1
+    outbox.delivery_status = SENT
+    outbox.sent_date = timezone.now()
+    outbox.next_attempt_date = None
+    outbox.last_error = None
+    outbox.save()
+    return SENT
+
+
+def deliver_due_sms(provider=None):
+    # pending rows left behind by a restarted process
+    from communicating.models import SmsOutbox
+
+    due = SmsOutbox.objects.filter(delivery_status=PENDING, next_attempt_date__lte=timezone.now())
+    return [deliver_sms(outbox_id, provider) for outbox_id in due.values_list('id', flat=True)]
+
 
 def send_sms_login(phone, code):
-    headers = {
-        "apiKey": api_key,
-        "accept-language": "fa",
-        "Content-Type": "application/json"
-    }
-    body = {
-        "mobile": str(phone),
-        "method": "sms",
-        "code": str(code),
-        "templateID": 3157,
-        # "params": [
-        #     "راه پیام",
-        #     "msgway.com"
-        # ]
-    }
-    response = requests.post(url, headers=headers, data=json.dumps(body))
+    return enqueue_sms(phone, 3157, code=code)
+
+
+NEW_TASK_TEMPLATE = 13398
+
 
 def send_sms_new_task(phone, sex, full_name, task, task_proj):
-    headers = {
-        "apiKey": api_key,
-        "accept-language": "fa",
-        "Content-Type": "application/json"
-    }
-    body = {
-        "mobile": str(phone),
-        "method": "sms",
-        "templateID": 13398,
-        "params": [
-            sex,
-            full_name,
-            task,
-            task_proj
-        ]
-    }
-    response = requests.post(url, headers=headers, data=json.dumps(body))
+    return enqueue_sms(phone, NEW_TASK_TEMPLATE, params=[sex, full_name, task, task_proj])
+
 
 def send_sms_author(phone, course, episode, user):
-    headers = {
-        "apiKey": api_key,
-        "accept-language": "fa",
-        "Content-Type": "application/json"
-    }
-    body = {
-        "mobile": str(phone),
-        "method": "sms",
-        "templateID": 13469,
-        "params": [
-            course,
-            episode,
-            user
-        ]
-    }
-    response = requests.post(url, headers=headers, data=json.dumps(body))
+    return enqueue_sms(phone, 13469, params=[course, episode, user])
+
 
 def send_sms_user(phone, user, course, episode):
-    headers = {
-        "apiKey": api_key,
-        "accept-language": "fa",
-        "Content-Type": "application/json"
-    }
-    body = {
-        "mobile": str(phone),
-        "method": "sms",
-        "templateID": 13470,
-        "params": [
-            user,
-            course,
-            episode,
-        ]
-    }
-    response = requests.post(url, headers=headers, data=json.dumps(body))
\ No newline at end of file
+    return enqueue_sms(phone, 13470, params=[user, course, episode])
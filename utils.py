@@ -1,14 +1,10 @@
-import re
-
-import jwt
 from django.core.exceptions import FieldDoesNotExist
 from functools import wraps
 
 from rest_framework import status
 from rest_framework.response import Response
 
-from Sahand import settings
-from security.models import Role, User
+from security.role_permissions import get_role_permissions, split_api_path, has_permission
 
 
 # def role_decorator(func):
@@ -29,23 +25,15 @@ def role_decorator(func):
         if not auth_header or not auth_header.startswith("Bearer "):
             return Response({"error": "Authorization token missing or invalid."}, status=401)
 
-        token = auth_header.split(" ")[1]
-
-        try:
-            # Decode the JWT
-            decoded_token = jwt.decode(token, settings.SECRET_KEY, algorithms=["HS256"])
-
-            # Check if the user is a superuser
-            user_id = decoded_token.get('user_id')
-            is_superuser = User.objects.get(id=user_id).is_superuser
+        # the JWT is already decoded and the user loaded by the view's JWTAuthentication
+        user = request.user
+        if not user or not user.is_authenticated:
+            return Response({"error": "Invalid token."}, status=status.HTTP_401_UNAUTHORIZED)
 
-            if is_superuser:
-                return func(view, request, *args, **kwargs)
+        # Check if the user is a superuser
+        if user.is_superuser:
+            return func(view, request, *args, **kwargs)
 
-        except jwt.ExpiredSignatureError:
-            return Response({"error": "Token has expired."}, status=status.HTTP_401_UNAUTHORIZED)
-        except jwt.InvalidTokenError:
-            return Response({"error": "Invalid token."}, status=status.HTTP_401_UNAUTHORIZED)
         if role_id is None:
             return Response({"message": "request closed, invalid role!"}, status=status.HTTP_403_FORBIDDEN)
         try:
@@ -53,71 +41,18 @@ def role_decorator(func):
         except Exception:
             return Response({"message": "request closed, invalid role!!"}, status=status.HTTP_403_FORBIDDEN)
 
-        if int(role_id) not in request.user.roles:
+        if role_id not in user.roles:
             return Response({"message": "request closed, user has no such role!"}, status=status.HTTP_403_FORBIDDEN)
 
-        # Your original code with trailing slash handling
-        pattern = r'^(.*?)(List|Get|AddOrUpdate|Delete|UnDelete)$'
-
-        # Strip the trailing slash if present for proper matching
-        path_without_trailing_slash = path.rstrip('/')
+        new_path, api_name = split_api_path(path)
 
-        match = re.search(pattern, path_without_trailing_slash)
-
-        if match:
-            # Extract path and API name based on the regex match
-            new_path = match.group(1)  # Path in lowercase
-            api_name = match.group(2)  # Extracted API name
-        else:
-            # Default case if no match, return path as is and no API name
-            new_path = path
-            api_name = None
-
-        print(f"New Path: {new_path}")
-        print(f"API Name: {api_name}")
-
-        role = Role.objects.get(id=role_id)
-        features_selected = role.features_selected
-
-        # Check if new_path exists in any of the selected URLs
-        url_exists = any(feature['url'] == new_path for feature in features_selected)
-        feature = next((feature for feature in features_selected if feature['url'] == new_path), None)
-
-        if not url_exists:
+        # {feature url: permission bits}, cached per role and invalidated when the role is saved
+        permissions = get_role_permissions(role_id)
+        if permissions is None or new_path not in permissions:
             return Response({"message": "request closed1"}, status=status.HTTP_403_FORBIDDEN)
-        # List
-        if api_name == 'List':
-            if not feature.get('isViewList'):
-                return Response({"message": "request closed"}, status=status.HTTP_403_FORBIDDEN)
-        # Get
-        elif api_name == 'Get':
-            if not feature.get('isView'):
-                return Response({"message": "request closed"}, status=status.HTTP_403_FORBIDDEN)
-        # Delete (soft & hard)
-        elif api_name == 'Delete':
-            if not feature.get('isDelete'):
-                return Response({"message": "request closed"}, status=status.HTTP_403_FORBIDDEN)
-            delete_type = request.data.get('type')
-            # type 1, 2 => soft-delete
-            if delete_type == 1 or delete_type == 2:
-                if not feature.get('isSoftDelete'):
-                    return Response({"message": "request closed"}, status=status.HTTP_403_FORBIDDEN)
-            # type 3,4 => hard-delete
-            if delete_type == 3 or delete_type == 4:
-                if not feature.get('isHardDelete'):
-                    return Response({"message": "request closed"}, status=status.HTTP_403_FORBIDDEN)
-        # UnDelete
-        elif api_name == 'UnDelete':
-            if not feature.get('isUnDelete'):
-                return Response({"message": "request closed"}, status=status.HTTP_403_FORBIDDEN)
-        elif api_name == 'AddOrUpdate':
-            object_id = request.data.get('id')
-            if object_id == 0:
-                if not feature.get('isAdd'):
-                    return Response({"message": "request closed"}, status=status.HTTP_403_FORBIDDEN)
-            else:
-                if not feature.get('isEdit'):
-                    return Response({"message": "request closed"}, status=status.HTTP_403_FORBIDDEN)
+
+        if not has_permission(permissions[new_path], api_name, request.data):
+            return Response({"message": "request closed"}, status=status.HTTP_403_FORBIDDEN)
 
         return func(view, request, *args, **kwargs)
 